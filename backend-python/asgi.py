@@ -0,0 +1,156 @@
+"""
+ASGI entry point
+
+The job endpoints run natively on the server's event loop through the async
+LLM pipeline, so one process can hold many LLM requests in flight without a
+thread per request. Everything else (admin, cache, code routes, streamed and
+background job responses) is served by the Flask app through asgiref's WSGI
+adapter.
+
+Usage:
+    uvicorn asgi:application --host 0.0.0.0 --port 3102
+"""
+import json
+
+from asgiref.wsgi import WsgiToAsgi
+
+from app import app
+from routes.jobs_routes import validate_batch_request
+from services.llm_service import (
+    process_leetcode_async, process_test_cases_async, process_code_modification_async, process_batch_async
+)
+from services.rag_service import rag_service
+
+flask_app = WsgiToAsgi(app)
+
+
+def _job_response(result):
+    """Same status codes and envelope as the Flask job routes"""
+    if result.get('success'):
+        return 200, {'success': True, 'result': result}
+    return 500, {'success': False, 'error': result.get('error', 'Unknown error')}
+
+
+async def _leetcode(body, api_key):
+    return _job_response(await process_leetcode_async(
+        body.get('problem_number', ''), api_key, body.get('custom_prompt', None)
+    ))
+
+
+async def _test_cases(body, api_key):
+    return _job_response(await process_test_cases_async(body.get('code', ''), api_key))
+
+
+async def _code_modification(body, api_key):
+    return _job_response(await process_code_modification_async(body.get('prompt', ''), body.get('code', ''), api_key))
+
+
+async def _batch(body, api_key):
+    error = validate_batch_request(body)
+    if error:
+        return 400, {'success': False, 'error': error}
+    return 200, await process_batch_async(body['items'], api_key, body.get('concurrency'))
+
+
+# Handlers return (status, payload)
+JOB_HANDLERS = {
+    '/api/jobs/leetcode': _leetcode,
+    '/api/jobs/test-cases': _test_cases,
+    '/api/jobs/code-modification': _code_modification,
+    '/api/jobs/batch': _batch,
+}
+
+
+async def _read_body(receive):
+    body = b''
+    while True:
+        message = await receive()
+        body += message.get('body', b'')
+        if not message.get('more_body'):
+            return body
+
+
+async def _send_json(send, status, payload):
+    body = json.dumps(payload).encode()
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [
+            (b'content-type', b'application/json'),
+            (b'content-length', str(len(body)).encode()),
+            (b'access-control-allow-origin', b'*'),
+        ]
+    })
+    await send({'type': 'http.response.body', 'body': body})
+
+
+def _query_flag(scope, name):
+    query = scope.get('query_string', b'').decode().lower()
+    return any(part in (f'{name}=1', f'{name}=true') for part in query.split('&'))
+
+
+def _wants_stream(scope, headers, body):
+    """Mirror of jobs_routes._wants_stream; streamed responses are left to Flask"""
+    if _query_flag(scope, 'stream') or body.get('stream') is True:
+        return True
+    return headers.get('accept', '').startswith('text/event-stream')
+
+
+def _wants_async(scope, headers, body):
+    """Mirror of jobs_routes._wants_async; background jobs are left to Flask's job queue"""
+    if _query_flag(scope, 'async') or body.get('async') is True:
+        return True
+    return 'respond-async' in headers.get('prefer', '')
+
+
+async def _replay(body):
+    """receive() for handing an already-read request body to the Flask app"""
+    sent = False
+
+    async def receive():
+        nonlocal sent
+        if sent:
+            return {'type': 'http.disconnect'}
+        sent = True
+        return {'type': 'http.request', 'body': body, 'more_body': False}
+
+    return receive
+
+
+async def _lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            # Load the vector store before the first request instead of during it
+            rag_service.open()
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            rag_service.close()
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+
+async def application(scope, receive, send):
+    if scope['type'] == 'lifespan':
+        return await _lifespan(receive, send)
+
+    handler = JOB_HANDLERS.get(scope['path']) if scope['type'] == 'http' else None
+    if handler is None or scope['method'] != 'POST':
+        return await flask_app(scope, receive, send)
+
+    raw_body = await _read_body(receive)
+    headers = {name.decode().lower(): value.decode() for name, value in scope['headers']}
+    try:
+        body = json.loads(raw_body or b'{}')
+    except ValueError:
+        body = {}
+
+    if not isinstance(body, dict) or _wants_stream(scope, headers, body) or _wants_async(scope, headers, body):
+        return await flask_app(scope, await _replay(raw_body), send)
+
+    api_key = body.get('google_api_key') or headers.get('x-google-api-key')
+    if not api_key:
+        return await _send_json(send, 400, {'success': False, 'error': 'No Google API key provided'})
+
+    status, payload = await handler(body, api_key)
+    return await _send_json(send, status, payload)
@@ -0,0 +1,150 @@
+"""
+Prompt Cache Compression Benchmark - Compare raw TEXT vs compressed storage
+
+Fills two throwaway cache databases with the same synthetic entries built from
+the real prompt templates (one with compression disabled, one enabled), then
+reports on-disk size and exact-hit read latency straight from SQLite (the
+memory tier is disabled so every read hits the database).
+
+Usage:
+    python benchmark_cache_compression.py [entries] [reads]
+"""
+
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+from prompts.loader import PromptLoader
+from services.cache_service import PromptCache
+from services.sqlite_pool import get_pool
+
+prompts = PromptLoader()
+
+RAG_NOTES = [
+    "Use a hash map to store complements while iterating once over the array.",
+    "Two pointers work on sorted input; move the left pointer when the sum is too small.",
+    "Sliding window problems track a running count and shrink from the left when invalid.",
+    "Binary search on the answer when the predicate is monotonic over the search space.",
+    "Dynamic programming: define dp[i] as the best answer for the prefix ending at i.",
+]
+
+
+def _solution(problem_number):
+    """A plausible generated solution with per-problem variation"""
+    with open('default_problem.py', 'r') as f:
+        code = f.read()
+    return (
+        f'"""\nLeetCode #{problem_number}\n\nTime Complexity: O(n)\nSpace Complexity: O(n)\n"""\n\n'
+        + code.replace('two_sum', f'solve_{problem_number}')
+        + f"\n# verified against {problem_number % 7 + 3} sample cases\n"
+    )
+
+
+def build_entries(count, seed=42):
+    """Synthetic (prompt, operation_type, response, metadata) tuples from the live templates"""
+    rng = random.Random(seed)
+    with open('default_problem.py', 'r') as f:
+        code = f.read()
+
+    entries = []
+    for i in range(count):
+        problem_number = i + 1
+        kind = i % 3
+        if kind == 0:
+            prompt = prompts.get('leetcode_solve', problem_number=problem_number)
+            operation_type = 'leetcode_solve'
+            metadata = {'problem_number': str(problem_number), 'model': 'gemini-2.5-flash'}
+        elif kind == 1:
+            prompt = prompts.get('test_case_generation', code=code.replace('two_sum', f'fn_{i}'))
+            operation_type = 'test_case_generation'
+            metadata = {'model': 'gemini-2.5-flash'}
+        else:
+            prompt = prompts.get('code_modification', code=code, prompt=f'add input validation variant {i}')
+            operation_type = 'code_modification'
+            metadata = {'model': 'gemini-2.5-flash'}
+
+        if rng.random() < 0.5:
+            notes = rng.sample(RAG_NOTES, 3)
+            prompt += "\n\n## RELEVANT CONTEXT:\n" + "".join(f"\n[{n}]\n{note}\n" for n, note in enumerate(notes, 1))
+
+        entries.append((prompt, operation_type, _solution(problem_number), metadata))
+    return entries
+
+
+def _db_size(db_path):
+    """Database size after folding the WAL back into the main file"""
+    with get_pool(db_path).connection() as (conn, cursor):
+        cursor.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+    return os.path.getsize(db_path)
+
+
+def measure(db_path, entries, reads, compress):
+    prompt_cache = PromptCache(db_path=db_path, memory_max_entries=0, compress=compress)
+
+    start = time.perf_counter()
+    for prompt, operation_type, response, metadata in entries:
+        prompt_cache.set(prompt, operation_type, response, metadata=metadata, model='gemini-2.5-flash',
+                         use_cache=True, model_aware_cache=True)
+    write_ms = (time.perf_counter() - start) * 1000
+
+    rng = random.Random(7)
+    latencies = []
+    for _ in range(reads):
+        prompt, operation_type, _, _ = rng.choice(entries)
+        start = time.perf_counter()
+        result = prompt_cache.get(prompt, operation_type, 'gemini-2.5-flash', use_cache=True, model_aware_cache=True)
+        latencies.append((time.perf_counter() - start) * 1000)
+        assert result is not None
+    latencies.sort()
+
+    return {
+        'compressed': compress,
+        'db_bytes': _db_size(db_path),
+        'stored_bytes': prompt_cache.get_budget_stats()['total_bytes'],
+        'write_total_ms': round(write_ms, 2),
+        'read_avg_ms': round(sum(latencies) / len(latencies), 4),
+        'read_p50_ms': round(latencies[len(latencies) // 2], 4),
+        'read_p99_ms': round(latencies[int(len(latencies) * 0.99) - 1], 4),
+    }
+
+
+def run_benchmark(entry_count=2000, reads=5000):
+    print("=" * 80)
+    print("PROMPT CACHE COMPRESSION BENCHMARK")
+    print("=" * 80)
+    print(f"Entries: {entry_count} | Reads: {reads}")
+
+    entries = build_entries(entry_count)
+    raw_text_bytes = sum(len(p.encode()) + len(r.encode()) for p, _, r, _ in entries)
+    print(f"Raw prompt+response text: {raw_text_bytes / 1024:.1f} KiB")
+
+    results = {"timestamp": time.strftime("%Y-%m-%d %H:%M:%S"), "entries": entry_count, "reads": reads}
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for compress in (False, True):
+            label = 'compressed' if compress else 'raw'
+            results[label] = measure(os.path.join(tmp_dir, f'{label}.db'), entries, reads, compress)
+
+    raw, compressed = results['raw'], results['compressed']
+    print("\n" + "-" * 80)
+    print(f"{'':<24}{'raw':>16}{'compressed':>16}")
+    for key in ('db_bytes', 'stored_bytes', 'write_total_ms', 'read_avg_ms', 'read_p50_ms', 'read_p99_ms'):
+        print(f"{key:<24}{raw[key]:>16}{compressed[key]:>16}")
+    print("-" * 80)
+    print(f"Database size reduction: {1 - compressed['db_bytes'] / raw['db_bytes']:.1%}")
+    print(f"Stored column bytes reduction: {1 - compressed['stored_bytes'] / raw['stored_bytes']:.1%}")
+
+    os.makedirs("data/benchmark_results", exist_ok=True)
+    results_file = f"data/benchmark_results/cache_compression_{time.strftime('%Y%m%d_%H%M%S')}.json"
+    with open(results_file, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"Results saved to: {results_file}")
+
+    return results
+
+
+if __name__ == "__main__":
+    args = [int(arg) for arg in sys.argv[1:3]]
+    run_benchmark(*args)
@@ -0,0 +1,103 @@
+"""
+Chunking Benchmark - chunks/sec inline vs. process pool by worker count
+
+Chunks the same synthetic editorial notes inline on one thread and then
+through the chunking process pool with 1, 2, 4... workers (up to the CPU
+count, or the counts given), and reports documents/sec and chunks/sec.
+Pool startup is excluded: each pool is warmed up before it is timed.
+
+Usage:
+    python benchmark_chunking.py [documents] [worker counts, e.g. 1,2,4,8]
+"""
+
+import json
+import os
+import random
+import sys
+import time
+
+from benchmark_test_cases import doc1, doc2, doc3, doc4, doc5, doc6
+from services.chunk_pool import ChunkPool
+from services.config_service import config
+from services.rag_service import RAGService
+
+
+def build_documents(count, seed=42):
+    """Notes of varied length assembled from the RAG benchmark documents"""
+    rng = random.Random(seed)
+    paragraphs = [p.strip() for doc in (doc1, doc2, doc3, doc4, doc5, doc6) for p in doc.split('\n\n') if p.strip()]
+    return [
+        f"Editorial note {i}\n\n" + "\n\n".join(rng.choice(paragraphs) for _ in range(rng.randint(2, 12)))
+        for i in range(count)
+    ]
+
+
+def measure(pool, documents, workers):
+    config.set_chunking_workers(workers, inline_max_chars=0)
+    if workers:
+        pool.chunk_many(documents[:workers * 2])  # start the workers before timing
+
+    start = time.perf_counter()
+    results = pool.chunk_many(documents)
+    seconds = time.perf_counter() - start
+
+    chunks = sum(len(doc_chunks) for doc_chunks in results)
+    return {
+        'workers': workers,
+        'seconds': round(seconds, 3),
+        'chunks': chunks,
+        'documents_per_second': round(len(documents) / seconds, 1),
+        'chunks_per_second': round(chunks / seconds, 1),
+    }
+
+
+def run_benchmark(document_count=2000, worker_counts=None):
+    cpus = os.cpu_count() or 1
+    if worker_counts is None:
+        worker_counts = [1]
+        while worker_counts[-1] * 2 <= cpus:
+            worker_counts.append(worker_counts[-1] * 2)
+
+    print("=" * 80)
+    print("CHUNKING BENCHMARK")
+    print("=" * 80)
+    documents = build_documents(document_count)
+    total_chars = sum(len(doc) for doc in documents)
+    print(f"Documents: {document_count} | Characters: {total_chars} | CPUs: {cpus}")
+
+    pool = ChunkPool(RAGService.CHUNK_SIZE, RAGService.CHUNK_OVERLAP)
+    results = {"timestamp": time.strftime("%Y-%m-%d %H:%M:%S"), "documents": document_count, "cpus": cpus,
+               "runs": []}
+    try:
+        for workers in [0] + worker_counts:
+            run = measure(pool, documents, workers)
+            results["runs"].append(run)
+            if workers:
+                # Each size gets a fresh pool
+                pool.shutdown()
+    finally:
+        pool.shutdown()
+
+    inline = results["runs"][0]
+    print("\n" + "-" * 80)
+    print(f"{'mode':<16}{'seconds':>12}{'docs/sec':>14}{'chunks/sec':>14}{'speedup':>12}")
+    for run in results["runs"]:
+        mode = f"{run['workers']} worker{'s' if run['workers'] > 1 else ''}" if run['workers'] else "inline"
+        speedup = run['chunks_per_second'] / inline['chunks_per_second']
+        print(f"{mode:<16}{run['seconds']:>12}{run['documents_per_second']:>14}"
+              f"{run['chunks_per_second']:>14}{speedup:>11.2f}x")
+    print("-" * 80)
+
+    os.makedirs("data/benchmark_results", exist_ok=True)
+    results_file = f"data/benchmark_results/chunking_{time.strftime('%Y%m%d_%H%M%S')}.json"
+    with open(results_file, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"Results saved to: {results_file}")
+
+    return results
+
+
+if __name__ == "__main__":
+    document_count = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    worker_counts = [int(n) for n in sys.argv[2].split(',')] if len(sys.argv) > 2 else None
+    run_benchmark(document_count, worker_counts)
@@ -30,6 +30,9 @@ load_dotenv()
 from services.rag_service import rag_service
 from benchmark_test_cases import TEST_CASES, doc1, doc2, doc3, doc4, doc5, doc6, doc7, doc8, doc9, doc10, doc11, doc12
 
+# Embeddings need a key; with LLM_PROVIDER=stub the benchmark runs offline and any value works
+API_KEY = os.getenv('GOOGLE_API_KEY', 'stub')
+
 
 def setup_test_documents():
     """Add test documents that expose chunking weaknesses"""
@@ -40,7 +43,7 @@ def setup_test_documents():
     print("Adding test documents...")
     doc_ids = []
     for i, doc in enumerate([doc1, doc2, doc3, doc4, doc5, doc6, doc7, doc8, doc9, doc10, doc11, doc12], 1):
-        doc_id = rag_service.add_document(doc)
+        doc_id = rag_service.add_document(doc, API_KEY)
         doc_ids.append(doc_id)
         print(f"  Added doc {i}/12 with ID: {doc_id}")
 
@@ -55,7 +58,7 @@ def measure_context_completeness(query: str, expected_keywords: List[str]) -> Di
     Measure if retrieved context contains all necessary information
     Returns: dict with completeness score and details
     """
-    retrieved = rag_service.retrieve(query, top_k=20, min_similarity=0.5)
+    retrieved = rag_service.retrieve(query, API_KEY, top_k=20, min_similarity=0.5)
     print(f"  [DEBUG] Retrieved {len(retrieved)} documents for completeness check")
     if retrieved:
         for i, doc in enumerate(retrieved):
@@ -89,7 +92,7 @@ def measure_retrieval_precision_recall(query: str, relevant_doc_ids: List[int],
       entire document were retrieved, regardless of whether they're all relevant to the query.
     Returns dict with both metrics and metadata
     """
-    retrieved = rag_service.retrieve(query, top_k=k, min_similarity=0.5)
+    retrieved = rag_service.retrieve(query, API_KEY, top_k=k, min_similarity=0.5)
 
     # Get total count of chunks belonging to expected parent documents
     total_relevant_chunks = 0
@@ -165,7 +168,7 @@ def measure_avg_similarity_score(query: str) -> float:
     Measure average similarity of retrieved chunks
     Higher = more confident matches
     """
-    retrieved = rag_service.retrieve(query, top_k=20, min_similarity=0.5)
+    retrieved = rag_service.retrieve(query, API_KEY, top_k=20, min_similarity=0.5)
 
     if not retrieved:
         return 0.0
@@ -178,10 +181,14 @@ def measure_retrieval_latency(queries: List[str]) -> float:
     """
     Measure average retrieval time in milliseconds
     """
+    # Warm-up so the first query doesn't carry the store's one-time open
+    if queries:
+        rag_service.retrieve(queries[0], API_KEY, top_k=20)
+
     start = time.time()
 
     for query in queries:
-        rag_service.retrieve(query, top_k=20)
+        rag_service.retrieve(query, API_KEY, top_k=20)
 
     elapsed = (time.time() - start) * 1000  # convert to ms
     avg_latency = elapsed / len(queries) if queries else 0
@@ -271,7 +278,8 @@ def run_benchmark():
         "avg_precision": sum(precision_scores) / len(precision_scores),
         "avg_chunk_retrieval_rate": sum(chunk_retrieval_scores) / len(chunk_retrieval_scores),
         "avg_similarity": sum(similarity_scores) / len(similarity_scores),
-        "avg_latency_ms": avg_latency
+        "avg_latency_ms": avg_latency,
+        "chroma": rag_service.store.get_stats()
     }
 
     print("\n" + "=" * 80)
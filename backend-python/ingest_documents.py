@@ -0,0 +1,74 @@
+"""
+Bulk-load documents into the RAG store
+
+Streams a directory of text files (.md, .txt, .rst, .py) or a JSONL file
+(one string or {"content": ...} object per line) through the ingestion
+pipeline, printing progress with docs/sec and chunks/sec.
+
+Progress is checkpointed after every write. If a run fails, rerun the same
+command to resume where it stopped; documents already stored are skipped by
+content hash either way.
+
+Usage:
+    python ingest_documents.py notes/
+    python ingest_documents.py notes.jsonl --checkpoint data/notes.checkpoint.json
+
+Set GOOGLE_API_KEY, or LLM_PROVIDER=stub to try it offline.
+"""
+import argparse
+import json
+import os
+import sys
+
+from dotenv import load_dotenv
+
+# Load environment variables from .env file
+load_dotenv()
+
+from services.config_service import config
+from services.rag_ingest import ingest_path
+
+
+def print_progress(report):
+    print(f"  {report['position']} read, {report['documents']} added ({report['chunks']} chunks), "
+          f"{report['duplicates']} duplicates | {report['documents_per_second']} docs/sec, "
+          f"{report['chunks_per_second']} chunks/sec", flush=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk-load documents into the RAG store")
+    parser.add_argument('source', help="Directory of text files or a JSONL file")
+    parser.add_argument('--checkpoint', default='data/ingest_checkpoint.json',
+                        help="Checkpoint file used to resume after a failure")
+    parser.add_argument('--api-key', default=os.getenv('GOOGLE_API_KEY'),
+                        help="Embedding API key (defaults to GOOGLE_API_KEY; not needed with LLM_PROVIDER=stub)")
+    parser.add_argument('--queue-size', type=int, default=64, help="Capacity of each queue between stages")
+    parser.add_argument('--quiet', action='store_true', help="Only print the final report")
+    args = parser.parse_args()
+
+    api_key = args.api_key
+    if not api_key:
+        if config.get_llm_provider() != 'stub':
+            parser.error("No API key: set GOOGLE_API_KEY or pass --api-key (or use LLM_PROVIDER=stub offline)")
+        # The stub provider ignores the key, but the pipeline still requires one
+        api_key = 'stub'
+
+    print(f"Ingesting {args.source}...")
+    report = ingest_path(
+        args.source, api_key, checkpoint_path=args.checkpoint,
+        progress=None if args.quiet else print_progress, queue_size=args.queue_size
+    )
+
+    print()
+    print(f"Added {report['documents']} documents ({report['chunks']} chunks) in {report['seconds']}s")
+    print(f"Skipped {report['duplicates']} duplicates and {report['empty']} empty documents")
+    print(f"Throughput: {report['documents_per_second']} docs/sec, {report['chunks_per_second']} chunks/sec")
+    if not report['success']:
+        print(f"Stopped at record {report['position']}: {report['error']}")
+        print(f"Rerun the same command to resume from {args.checkpoint}")
+        print(json.dumps(report, indent=2))
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,11 @@
+import json
 from flask import Blueprint, request, jsonify
-from services import logger, cache
+from services import logger, cache, config
 from services.rag_service import rag_service
+from services.llm_service import get_pipeline_stats
+from services.providers import get_provider, providers
+from services.job_queue import job_queue, QueueFull
+from services.rag_ingest import BulkIngestor, document_content
 from prompts.loader import prompts
 from utils import route_error_handler
 
@@ -22,6 +27,26 @@ def get_summary():
     return {'summary': logger.get_summary_stats()}
 
 
+@admin_bp.route('/api/observability/latency', methods=['GET'])
+@route_error_handler
+def get_latency():
+    """Get latency percentiles per operation and model over a window (minutes)"""
+    window = request.args.get('window', 60, type=int)
+    if window < 1 or window > logger.latency.retention_minutes:
+        return jsonify({
+            'success': False,
+            'error': f'window must be between 1 and {logger.latency.retention_minutes} minutes'
+        })
+    return {'latency': logger.get_latency_stats(window_minutes=window)}
+
+
+@admin_bp.route('/api/observability/pipeline', methods=['GET'])
+@route_error_handler
+def get_pipeline():
+    """Get LLM pipeline counters (request coalescing, background jobs etc.)"""
+    return {'pipeline': {**get_pipeline_stats(), 'jobs': job_queue.get_stats()}}
+
+
 @admin_bp.route('/api/observability/call/<int:call_id>', methods=['GET'])
 @route_error_handler
 def get_call_details(call_id):
@@ -52,6 +77,26 @@ def set_current_model_route():
     return {'model': cache.get_current_model()}
 
 
+@admin_bp.route('/api/llm-provider', methods=['GET'])
+@route_error_handler
+def get_llm_provider_route():
+    """Get the generation/embedding provider and its stats"""
+    return {'provider': config.get_llm_provider(), 'stats': get_provider().get_stats()}
+
+
+@admin_bp.route('/api/llm-provider', methods=['POST'])
+@route_error_handler
+def set_llm_provider_route():
+    """Select the provider ('gemini' or 'stub'); 'stub_settings' reconfigures the stub"""
+    data = request.json or {}
+    provider = data.get('provider')
+    if provider:
+        config.set_llm_provider(provider)
+    if data.get('stub_settings'):
+        providers['stub'].configure(**data['stub_settings'])
+    return {'provider': config.get_llm_provider(), 'stats': get_provider().get_stats()}
+
+
 @admin_bp.route('/api/prompts', methods=['GET'])
 @route_error_handler
 def list_prompts():
@@ -115,6 +160,52 @@ def add_rag_document():
         return jsonify({'success': False, 'error': 'Failed to add document'})
 
 
+def _bulk_ingest(documents, api_key):
+    """Background job body: an ingestion that stops early fails the job"""
+    report = BulkIngestor().run(documents, api_key)
+    if not report['success']:
+        raise RuntimeError(f"{report['error']} ({report['documents']} documents added before stopping)")
+    return report
+
+
+@admin_bp.route('/api/rag/documents/bulk', methods=['POST'])
+@route_error_handler
+def bulk_add_rag_documents():
+    """
+    Add many documents as a background job (poll GET /api/jobs/<job_id>).
+
+    Send {"documents": [...]} as JSON, or an application/x-ndjson body with
+    one document per line. A document is a string or {"content": ...}.
+    Documents already stored are skipped, so a failed upload can be resent.
+    """
+    if request.mimetype == 'application/x-ndjson':
+        body = {}
+        documents = [json.loads(line) for line in request.get_data(as_text=True).splitlines() if line.strip()]
+    else:
+        body = request.json or {}
+        documents = body.get('documents') or []
+    api_key = body.get('google_api_key') or request.headers.get('X-Google-API-Key')
+
+    if not documents:
+        return jsonify({'success': False, 'error': 'No documents provided'})
+
+    if not api_key:
+        return jsonify({'success': False, 'error': 'No Google API key provided'})
+
+    documents = [(str(i), document_content(document)) for i, document in enumerate(documents)]
+    try:
+        job_id = job_queue.submit('rag_bulk_ingest', _bulk_ingest, documents, api_key)
+    except QueueFull as e:
+        return jsonify({'success': False, 'error': str(e)}), 503
+
+    return jsonify({
+        'success': True,
+        'job_id': job_id,
+        'state': 'PENDING',
+        'status': f'Ingesting {len(documents)} documents'
+    }), 202
+
+
 @admin_bp.route('/api/rag/documents/<int:doc_id>', methods=['DELETE'])
 @route_error_handler
 def delete_rag_document(doc_id):
@@ -89,3 +89,27 @@ get_semantic_cache_enabled, set_semantic_cache_enabled = create_cache_setting_ro
     cache.set_semantic_cache_enabled,
     default_value=False
 )
+
+get_cache_eviction_policy, set_cache_eviction_policy = create_cache_setting_routes(
+    '/api/cache/eviction-policy',
+    'eviction_policy',
+    cache.get_eviction_policy,
+    cache.set_eviction_policy,
+    default_value='lru'
+)
+
+get_cache_max_bytes, set_cache_max_bytes = create_cache_setting_routes(
+    '/api/cache/max-bytes',
+    'max_bytes',
+    cache.get_max_bytes,
+    cache.set_max_bytes,
+    default_value=None
+)
+
+get_cache_max_entries, set_cache_max_entries = create_cache_setting_routes(
+    '/api/cache/max-entries',
+    'max_entries',
+    cache.get_max_entries,
+    cache.set_max_entries,
+    default_value=None
+)
@@ -1,7 +1,7 @@
 import io
 from contextlib import redirect_stdout
 from flask import Blueprint, request, jsonify
-from google import genai
+from services.providers import get_provider
 
 code_bp = Blueprint('code', __name__)
 
@@ -29,9 +29,7 @@ def list_models():
         if not api_key:
             return jsonify({'success': False, 'error': 'No Google API key provided'}), 400
 
-        client = genai.Client(api_key=api_key)
-        models = client.models.list()
-        model_names = [model.name for model in models]
+        model_names = get_provider().list_models(api_key)
         return jsonify({'success': True, 'models': model_names})
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)})
@@ -1,15 +1,84 @@
 """
-Synchronous job processing routes.
+Job processing routes.
+
+Jobs run synchronously by default. Each job endpoint can also:
+- stream its response as Server-Sent Events: pass `stream: true` in the JSON
+  body, `?stream=true`, or `Accept: text/event-stream`. The stream carries
+  `chunk` events ({"text": ...}) followed by a single `done` event with the
+  job result, or an `error` event.
+- run in the background: pass `async: true`, `?async=true`, or
+  `Prefer: respond-async`. The response is 202 with a `job_id`; poll
+  `GET /api/jobs/<job_id>` for its state and result.
 """
-from flask import Blueprint, request, jsonify
-from services.llm_service import process_leetcode, process_test_cases, process_code_modification
+import json
+from flask import Blueprint, Response, request, jsonify, stream_with_context
+from services.config_service import config
+from services.job_queue import job_queue, QueueFull
+from services.llm_service import (
+    process_leetcode, process_test_cases, process_code_modification, process_batch,
+    stream_leetcode, stream_test_cases, stream_code_modification
+)
 
 jobs_bp = Blueprint('jobs', __name__)
 
 
+def _wants_stream():
+    """Whether the client asked for a Server-Sent Events response"""
+    if request.args.get('stream', '').lower() in ('1', 'true'):
+        return True
+    if (request.json or {}).get('stream') is True:
+        return True
+    return request.accept_mimetypes.best == 'text/event-stream'
+
+
+def _wants_async():
+    """Whether the client asked for the job to run in the background"""
+    if request.args.get('async', '').lower() in ('1', 'true'):
+        return True
+    if (request.json or {}).get('async') is True:
+        return True
+    return 'respond-async' in request.headers.get('Prefer', '')
+
+
+def _run_job(process, *args):
+    """Run an LLM service call as a background job; an unsuccessful result fails the job"""
+    result = process(*args)
+    if result.get('success') is False:
+        raise RuntimeError(result.get('error', 'Unknown error'))
+    return result
+
+
+def _submit_job(job_type, process, *args):
+    """Queue a job and answer 202 with its id (503 when the queue is full)"""
+    try:
+        job_id = job_queue.submit(job_type, _run_job, process, *args)
+    except QueueFull as e:
+        return jsonify({'success': False, 'error': str(e)}), 503
+
+    return jsonify({
+        'success': True,
+        'job_id': job_id,
+        'state': 'PENDING',
+        'status': 'Job submitted for processing'
+    }), 202
+
+
+def _event_stream(events):
+    """Wrap (event, data) pairs from the LLM service in an SSE response"""
+    def generate():
+        for event, data in events:
+            yield f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+
 @jobs_bp.route('/api/jobs/leetcode', methods=['POST'])
 def submit_leetcode_job():
-    """Process a LeetCode problem synchronously"""
+    """Process a LeetCode problem (synchronously unless streamed or async)"""
     problem_number = request.json.get('problem_number', '')
     custom_prompt = request.json.get('custom_prompt', None)
     api_key = request.json.get('google_api_key') or request.headers.get('X-Google-API-Key')
@@ -20,6 +89,12 @@ def submit_leetcode_job():
             'error': 'No Google API key provided'
         }), 400
 
+    if _wants_stream():
+        return _event_stream(stream_leetcode(problem_number, api_key, custom_prompt))
+
+    if _wants_async():
+        return _submit_job('leetcode', process_leetcode, problem_number, api_key, custom_prompt)
+
     # Process synchronously
     result = process_leetcode(problem_number, api_key, custom_prompt)
 
@@ -37,7 +112,7 @@ def submit_leetcode_job():
 
 @jobs_bp.route('/api/jobs/test-cases', methods=['POST'])
 def submit_test_case_job():
-    """Generate test cases synchronously"""
+    """Generate test cases (synchronously unless streamed or async)"""
     code = request.json.get('code', '')
     api_key = request.json.get('google_api_key') or request.headers.get('X-Google-API-Key')
 
@@ -47,6 +122,12 @@ def submit_test_case_job():
             'error': 'No Google API key provided'
         }), 400
 
+    if _wants_stream():
+        return _event_stream(stream_test_cases(code, api_key))
+
+    if _wants_async():
+        return _submit_job('test-cases', process_test_cases, code, api_key)
+
     # Process synchronously
     result = process_test_cases(code, api_key)
 
@@ -64,7 +145,7 @@ def submit_test_case_job():
 
 @jobs_bp.route('/api/jobs/code-modification', methods=['POST'])
 def submit_code_modification_job():
-    """Modify code synchronously"""
+    """Modify code (synchronously unless streamed or async)"""
     prompt = request.json.get('prompt', '')
     code = request.json.get('code', '')
     api_key = request.json.get('google_api_key') or request.headers.get('X-Google-API-Key')
@@ -75,6 +156,12 @@ def submit_code_modification_job():
             'error': 'No Google API key provided'
         }), 400
 
+    if _wants_stream():
+        return _event_stream(stream_code_modification(prompt, code, api_key))
+
+    if _wants_async():
+        return _submit_job('code-modification', process_code_modification, prompt, code, api_key)
+
     # Process synchronously
     result = process_code_modification(prompt, code, api_key)
 
@@ -88,3 +175,64 @@ def submit_code_modification_job():
             'success': False,
             'error': result.get('error', 'Unknown error')
         }), 500
+
+
+def validate_batch_request(body):
+    """Error message for a malformed batch request body, or None if it is acceptable"""
+    items = body.get('items')
+    if not isinstance(items, list) or not items:
+        return 'items must be a non-empty list'
+    if len(items) > config.get_batch_max_items():
+        return f'Batch too large: {len(items)} items (max {config.get_batch_max_items()})'
+    concurrency = body.get('concurrency')
+    if concurrency is not None and (not isinstance(concurrency, int) or concurrency < 1):
+        return 'concurrency must be a positive integer'
+    return None
+
+
+@jobs_bp.route('/api/jobs/batch', methods=['POST'])
+def submit_batch_job():
+    """
+    Process a batch of jobs (synchronously unless async).
+
+    Body: {"items": [{"type": "leetcode", "problem_number": "1"},
+                     {"type": "test-cases", "code": "..."},
+                     {"type": "code-modification", "prompt": "...", "code": "..."}],
+           "concurrency": 4}
+    Identical items run once; cache hits are answered without taking a
+    concurrency slot. Results come back per item, in request order.
+    """
+    body = request.json or {}
+    api_key = body.get('google_api_key') or request.headers.get('X-Google-API-Key')
+
+    if not api_key:
+        return jsonify({
+            'success': False,
+            'error': 'No Google API key provided'
+        }), 400
+
+    error = validate_batch_request(body)
+    if error:
+        return jsonify({'success': False, 'error': error}), 400
+
+    if _wants_async():
+        return _submit_job('batch', process_batch, body['items'], api_key, body.get('concurrency'))
+
+    return jsonify(process_batch(body['items'], api_key, body.get('concurrency'))), 200
+
+
+@jobs_bp.route('/api/jobs/<job_id>', methods=['GET'])
+def get_job_status(job_id):
+    """Check the status of a background job (results are kept for a limited time)"""
+    job = job_queue.get(job_id)
+    if job is None:
+        # FAILURE is terminal, so pollers stop asking about jobs that are gone
+        return jsonify({
+            'success': False,
+            'job_id': job_id,
+            'state': 'FAILURE',
+            'status': 'Job not found',
+            'error': 'Job not found (unknown id, or its result has expired)'
+        }), 404
+
+    return jsonify({'success': True, **job})
@@ -0,0 +1,139 @@
+"""
+Write-behind accumulator for cache hit bookkeeping
+
+Cache hits record (access_count, accessed_at) updates here instead of issuing
+an UPDATE on the request path. Updates for the same entry are coalesced in
+memory and flushed in one batched transaction by a background thread, when
+the pending set grows past `max_pending`, and at interpreter shutdown.
+"""
+import atexit
+import logging
+import threading
+import time
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+
+class AccessTracker:
+    """Coalesces prompt_cache access updates and flushes them in batches"""
+
+    def __init__(self, pool, flush_interval=2.0, max_pending=1000):
+        self._pool = pool
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+
+        self._pending = {}  # prompt_hash -> [hit_count, last_accessed_at]
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+        self._recorded = 0
+        self._flushed_rows = 0
+        self._flushes = 0
+        self._last_flush_ms = 0.0
+
+        atexit.register(self.close)
+
+    def _ensure_started(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(
+                target=self._run, name='cache-access-flusher', daemon=True
+            )
+            self._thread.start()
+
+    def record(self, prompt_hash):
+        """Note a cache hit; the row is updated on the next flush"""
+        now = datetime.utcnow().isoformat()
+        with self._lock:
+            pending = self._pending.get(prompt_hash)
+            if pending is None:
+                self._pending[prompt_hash] = [1, now]
+            else:
+                pending[0] += 1
+                pending[1] = now
+            self._recorded += 1
+            backlog = len(self._pending)
+            if not self._stop.is_set():
+                self._ensure_started()
+
+        if backlog >= self.max_pending:
+            self._wake.set()
+
+    def discard(self, prompt_hashes=None):
+        """Drop pending updates for deleted rows (all of them when no hashes are given)"""
+        with self._lock:
+            if prompt_hashes is None:
+                self._pending.clear()
+            else:
+                for prompt_hash in prompt_hashes:
+                    self._pending.pop(prompt_hash, None)
+
+    def flush(self):
+        """Write all pending updates in a single transaction; returns rows written"""
+        with self._flush_lock:
+            with self._lock:
+                batch, self._pending = self._pending, {}
+
+            if not batch:
+                return 0
+
+            start = time.perf_counter()
+            try:
+                with self._pool.connection() as (conn, cursor):
+                    cursor.executemany('''
+                        UPDATE prompt_cache
+                        SET accessed_at = ?, access_count = access_count + ?
+                        WHERE prompt_hash = ?
+                    ''', [
+                        (accessed_at, count, prompt_hash)
+                        for prompt_hash, (count, accessed_at) in batch.items()
+                    ])
+            except Exception as e:
+                logger.error(f"Failed to flush {len(batch)} cache access updates: {e}")
+                self._requeue(batch)
+                return 0
+
+            with self._lock:
+                self._flushes += 1
+                self._flushed_rows += len(batch)
+                self._last_flush_ms = (time.perf_counter() - start) * 1000
+            return len(batch)
+
+    def _requeue(self, batch):
+        with self._lock:
+            for prompt_hash, (count, accessed_at) in batch.items():
+                pending = self._pending.get(prompt_hash)
+                if pending is None:
+                    self._pending[prompt_hash] = [count, accessed_at]
+                else:
+                    pending[0] += count
+                    pending[1] = max(pending[1], accessed_at)
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            self.flush()
+
+    def close(self):
+        """Stop the background thread and flush whatever is still pending"""
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout=5)
+        self.flush()
+
+    def get_stats(self):
+        with self._lock:
+            return {
+                'pending_entries': len(self._pending),
+                'pending_hits': sum(count for count, _ in self._pending.values()),
+                'recorded_hits': self._recorded,
+                'flushed_rows': self._flushed_rows,
+                'flushes': self._flushes,
+                'last_flush_ms': round(self._last_flush_ms, 2),
+                'flush_interval_seconds': self.flush_interval
+            }
@@ -0,0 +1,96 @@
+"""
+Background event loop for running the async LLM pipeline from sync code
+
+Flask handlers (and other sync callers) submit coroutines to one long-lived
+event loop running on a daemon thread and block until the result is ready.
+All in-flight requests share that loop, so waiting on the network costs no
+thread. Blocking work inside the coroutines (SQLite, Chroma) goes to the
+loop's bounded default executor.
+"""
+import asyncio
+import atexit
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+
+
+class AsyncRuntime:
+    """A daemon thread running an asyncio event loop, started on first use"""
+
+    def __init__(self, max_workers=32):
+        self.max_workers = max_workers
+        self._loop = None
+        self._thread = None
+        self._executor = None
+        self._lock = threading.Lock()
+
+        atexit.register(self.shutdown)
+
+    def _ensure_loop(self):
+        with self._lock:
+            if self._loop is not None and self._thread.is_alive():
+                return self._loop
+
+            self._loop = asyncio.new_event_loop()
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='llm-io')
+            self._loop.set_default_executor(self._executor)
+            ready = threading.Event()
+
+            def run():
+                asyncio.set_event_loop(self._loop)
+                self._loop.call_soon(ready.set)
+                self._loop.run_forever()
+
+            self._thread = threading.Thread(target=run, name='llm-event-loop', daemon=True)
+            self._thread.start()
+            ready.wait()
+            return self._loop
+
+    def run(self, coro, timeout=None):
+        """
+        Run a coroutine on the background loop and wait for its result.
+
+        Args:
+            coro: Coroutine to run
+            timeout: Seconds to wait before cancelling it (None waits indefinitely)
+
+        Returns:
+            The coroutine's result (its exception is re-raised)
+        """
+        loop = self._ensure_loop()
+        if threading.current_thread() is self._thread:
+            coro.close()
+            raise RuntimeError("AsyncRuntime.run() called from the event loop thread; await the coroutine instead")
+
+        future = asyncio.run_coroutine_threadsafe(coro, loop)
+        try:
+            return future.result(timeout)
+        except FutureTimeoutError:
+            future.cancel()
+            raise
+
+    def shutdown(self):
+        """Stop the loop and its executor"""
+        with self._lock:
+            loop, thread, executor = self._loop, self._thread, self._executor
+            self._loop = self._thread = self._executor = None
+
+        if loop is None:
+            return
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join(timeout=5)
+        if not loop.is_running():
+            loop.close()
+        executor.shutdown(wait=False)
+
+    def get_stats(self):
+        with self._lock:
+            running = self._loop is not None and self._thread.is_alive()
+            return {
+                'running': running,
+                'tasks': len(asyncio.all_tasks(self._loop)) if running else 0,
+                'executor_workers': self.max_workers
+            }
+
+
+# Global runtime shared by the sync wrappers in llm_service
+async_runtime = AsyncRuntime()
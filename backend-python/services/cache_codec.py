@@ -0,0 +1,135 @@
+"""
+Transparent compression for prompt cache text columns
+
+Prompts and responses are stored as raw-deflate BLOBs compressed against a
+preset dictionary built from the prompt templates in prompts/defaults plus
+boilerplate that recurs in responses. Cached prompts are mostly those
+templates with a few substituted values, so the dictionary lets even short
+entries compress well.
+
+Every dictionary ever used is kept in the `compression_dictionaries` table and
+each BLOB is tagged with the id of the dictionary it was written with, so
+editing the templates never strands existing rows. Legacy TEXT values are
+passed through unchanged on read.
+"""
+import logging
+import os
+import struct
+import zlib
+
+logger = logging.getLogger(__name__)
+
+FORMAT_TAG = b'Z'
+HEADER = struct.Struct('>cH')  # format tag, dictionary id
+NO_DICTIONARY = 0
+
+# Zlib only looks back 32 KB, and the end of the dictionary is cheapest to reference
+MAX_DICTIONARY_BYTES = 32 * 1024
+
+RESPONSE_BOILERPLATE = [
+    '## RELEVANT CONTEXT:\n',
+    'class Solution:\n    def ',
+    '(self, nums: List[int], target: int) -> List[int]:\n',
+    'from typing import List, Optional, Dict\n',
+    '"""\n    Time Complexity: O(n)\n    Space Complexity: O(n)\n    """\n',
+    'Time complexity: O(n log n)\nSpace complexity: O(1)\n',
+    "if __name__ == '__main__':\n",
+    'def test_',
+    'assert ',
+    '        return ',
+    '        for i in range(len(',
+    '        while left < right:\n',
+    '```python\n',
+]
+
+
+def build_dictionary(templates_dir):
+    """Concatenate boilerplate and template files, most common material last"""
+    parts = list(RESPONSE_BOILERPLATE)
+    if templates_dir and os.path.isdir(templates_dir):
+        for filename in sorted(os.listdir(templates_dir)):
+            if filename.endswith('.txt'):
+                with open(os.path.join(templates_dir, filename), 'r') as f:
+                    parts.append(f.read())
+    return ''.join(parts).encode()[-MAX_DICTIONARY_BYTES:]
+
+
+class CacheCodec:
+    """Encodes/decodes prompt_cache text columns"""
+
+    def __init__(self, templates_dir=None, enabled=True, level=6):
+        self.templates_dir = templates_dir
+        self.enabled = enabled
+        self.level = level
+        self._dictionaries = {NO_DICTIONARY: b''}
+        self._current_id = NO_DICTIONARY
+
+    @staticmethod
+    def create_schema(cursor):
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS compression_dictionaries (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                dictionary BLOB NOT NULL,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+
+    def load(self, cursor):
+        """Load stored dictionaries and register the one built from the current templates"""
+        cursor.execute('SELECT id, dictionary FROM compression_dictionaries ORDER BY id')
+        for dict_id, dictionary in cursor.fetchall():
+            self._dictionaries[dict_id] = bytes(dictionary)
+
+        if not self.enabled:
+            return
+
+        current = build_dictionary(self.templates_dir)
+        for dict_id, dictionary in self._dictionaries.items():
+            if dict_id != NO_DICTIONARY and dictionary == current:
+                self._current_id = dict_id
+                return
+
+        cursor.execute('INSERT INTO compression_dictionaries (dictionary) VALUES (?)', (current,))
+        self._current_id = cursor.lastrowid
+        self._dictionaries[self._current_id] = current
+        logger.info(f"Registered cache compression dictionary {self._current_id} ({len(current)} bytes)")
+
+    def encode(self, text):
+        """Compress text for storage; returns it unchanged when compression is disabled"""
+        if not self.enabled or text is None:
+            return text
+
+        dictionary = self._dictionaries[self._current_id]
+        if dictionary:
+            compressor = zlib.compressobj(self.level, zlib.DEFLATED, -15, zdict=dictionary)
+        else:
+            compressor = zlib.compressobj(self.level, zlib.DEFLATED, -15)
+        payload = compressor.compress(text.encode()) + compressor.flush()
+        return HEADER.pack(FORMAT_TAG, self._current_id) + payload
+
+    def decode(self, value):
+        """Decompress a stored value; TEXT values from before compression pass through"""
+        if value is None or isinstance(value, str):
+            return value
+
+        value = bytes(value)
+        tag, dict_id = HEADER.unpack_from(value)
+        if tag != FORMAT_TAG:
+            raise ValueError(f"Unknown cache compression format {tag!r}")
+
+        dictionary = self._dictionaries.get(dict_id)
+        if dictionary is None:
+            raise ValueError(f"Unknown cache compression dictionary {dict_id}")
+
+        if dictionary:
+            decompressor = zlib.decompressobj(-15, zdict=dictionary)
+        else:
+            decompressor = zlib.decompressobj(-15)
+        return (decompressor.decompress(value[HEADER.size:]) + decompressor.flush()).decode()
+
+    def decode_row(self, row):
+        """Decode the compressed columns of a prompt_cache row dict in place"""
+        for column in ('prompt', 'response_text'):
+            if column in row:
+                row[column] = self.decode(row[column])
+        return row
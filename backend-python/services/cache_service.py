@@ -4,23 +4,59 @@ import json
 import time
 import os
 import logging
+import threading
 from datetime import datetime, timedelta
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
-import numpy as np
-from utils import cache_error_handler, sqlite_connection, parse_metadata_json
+from utils import cache_error_handler, parse_metadata_json
 from services.config_service import config
+from services.sqlite_pool import get_pool
+from services.memory_tier import MemoryTier
+from services.semantic_index import SemanticIndex
+from services.access_tracker import AccessTracker
+from services.cache_codec import CacheCodec
+from prompts.loader import prompts
 
 logger = logging.getLogger(__name__)
 
+# Rough generation time per token (prompt + response), used to put entries that
+# only recorded a token count on the same milliseconds scale as measured latency
+COST_MS_PER_TOKEN_ESTIMATE = 5
+
+# ORDER BY clauses ranking eviction victims first. 'cost' keeps entries that were
+# slow to produce and are reused often, per byte of storage. Cost is measured in
+# milliseconds: the recorded latency, else one estimated from the token count.
+EVICTION_POLICIES = {
+    'lru': 'accessed_at ASC',
+    'lfu': 'access_count ASC, accessed_at ASC',
+    'cost': f'(COALESCE(cost_latency_ms, cost_tokens * {COST_MS_PER_TOKEN_ESTIMATE}, 0) + 1) '
+            '* access_count * 1.0 / MAX(size_bytes, 1) ASC, accessed_at ASC',
+}
+
+# Evict down to this fraction of the budget so inserts don't evict one row at a time
+EVICTION_LOW_WATERMARK = 0.9
+
+MIGRATION_BATCH_SIZE = 500
+
 class PromptCache:
-    def __init__(self, db_path='data/llm_cache.db', ttl_hours=24):
+    def __init__(self, db_path='data/llm_cache.db', ttl_hours=24, memory_max_entries=512, compress=True):
         self.db_path = db_path
         self.ttl_hours = ttl_hours
+        self._pool = get_pool(db_path)
+        # prompt/response_text are stored as dictionary-compressed BLOBs
+        self._codec = CacheCodec(templates_dir=prompts.defaults_dir, enabled=compress)
+        # L1 tier: exact-hash hits served from memory, SQLite stays the source of truth
+        self._memory = MemoryTier(max_entries=memory_max_entries)
+        # Pre-RAG key -> (prompt_hash, rag_chunks) so hits can skip retrieval
+        self._aliases = MemoryTier(max_entries=memory_max_entries)
+        self._semantic_index = SemanticIndex(self._pool, decode=self._codec.decode)
+        # Hit bookkeeping is written behind so cache reads stay reads
+        self._access_tracker = AccessTracker(self._pool)
+        self._budget_lock = threading.Lock()
+        self._evictions = 0
         self._init_database()
+        self._sync_budget_totals()
 
     def _init_database(self):
-        with sqlite_connection(self.db_path) as (conn, cursor):
+        with self._pool.connection() as (conn, cursor):
             cursor.execute('''
                 CREATE TABLE IF NOT EXISTS prompt_cache (
                     id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -32,10 +68,31 @@ class PromptCache:
                     metadata TEXT,
                     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                     accessed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    access_count INTEGER DEFAULT 1
+                    access_count INTEGER DEFAULT 1,
+                    size_bytes INTEGER,
+                    cost_latency_ms REAL,
+                    cost_tokens INTEGER
                 )
             ''')
 
+            # Budget columns for databases created before eviction support
+            cursor.execute('PRAGMA table_info(prompt_cache)')
+            columns = {row[1] for row in cursor.fetchall()}
+            for column, column_type in (('size_bytes', 'INTEGER'), ('cost_latency_ms', 'REAL'), ('cost_tokens', 'INTEGER')):
+                if column not in columns:
+                    cursor.execute(f'ALTER TABLE prompt_cache ADD COLUMN {column} {column_type}')
+
+            CacheCodec.create_schema(cursor)
+            self._codec.load(cursor)
+            self._compress_legacy_rows(cursor)
+
+            cursor.execute('''
+                UPDATE prompt_cache
+                SET size_bytes = length(CAST(prompt AS BLOB)) + length(CAST(response_text AS BLOB))
+                    + COALESCE(length(CAST(metadata AS BLOB)), 0)
+                WHERE size_bytes IS NULL
+            ''')
+
             cursor.execute('''
                 CREATE INDEX IF NOT EXISTS idx_prompt_hash ON prompt_cache(prompt_hash)
             ''')
@@ -44,6 +101,56 @@ class PromptCache:
                 CREATE INDEX IF NOT EXISTS idx_created_at ON prompt_cache(created_at)
             ''')
 
+            cursor.execute('''
+                CREATE INDEX IF NOT EXISTS idx_accessed_at ON prompt_cache(accessed_at)
+            ''')
+
+            cursor.execute('''
+                CREATE INDEX IF NOT EXISTS idx_access_count ON prompt_cache(access_count, accessed_at)
+            ''')
+
+            SemanticIndex.create_schema(cursor)
+
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS prompt_cache_aliases (
+                    alias_hash TEXT PRIMARY KEY,
+                    prompt_hash TEXT NOT NULL,
+                    rag_chunks TEXT,
+                    created_at TIMESTAMP NOT NULL
+                )
+            ''')
+
+            cursor.execute('''
+                CREATE INDEX IF NOT EXISTS idx_alias_prompt_hash ON prompt_cache_aliases(prompt_hash)
+            ''')
+
+    def _compress_legacy_rows(self, cursor):
+        """Rewrite rows stored as plain TEXT with the current codec"""
+        if not self._codec.enabled:
+            return
+
+        migrated = 0
+        while True:
+            cursor.execute('''
+                SELECT id, prompt, response_text FROM prompt_cache
+                WHERE typeof(prompt) = 'text' OR typeof(response_text) = 'text'
+                LIMIT ?
+            ''', (MIGRATION_BATCH_SIZE,))
+            rows = cursor.fetchall()
+            if not rows:
+                break
+
+            cursor.executemany('''
+                UPDATE prompt_cache SET prompt = ?, response_text = ?, size_bytes = NULL WHERE id = ?
+            ''', [
+                (self._codec.encode(self._codec.decode(prompt)), self._codec.encode(self._codec.decode(response_text)), row_id)
+                for row_id, prompt, response_text in rows
+            ])
+            migrated += len(rows)
+
+        if migrated:
+            logger.info(f"Compressed {migrated} legacy prompt cache rows")
+
     def _hash_prompt(self, prompt, operation_type, model=None, model_aware_cache=None):
         # Use provided model_aware_cache setting, or fall back to config setting
         use_model_aware = model_aware_cache if model_aware_cache is not None else config.is_model_aware_cache()
@@ -57,6 +164,12 @@ class PromptCache:
             content = f"{operation_type}:{prompt}"
         return hashlib.sha256(content.encode()).hexdigest()
 
+    def _memory_expiry(self, created_at):
+        """Absolute expiry for an L1 entry, matching the SQLite TTL check"""
+        if isinstance(created_at, str):
+            created_at = datetime.fromisoformat(created_at)
+        return created_at + timedelta(hours=self.ttl_hours)
+
     def get(self, prompt, operation_type, model=None, use_cache=None, model_aware_cache=None, metadata=None):
         # Use provided use_cache setting, or fall back to config setting
         should_use_cache = use_cache if use_cache is not None else config.is_cache_enabled()
@@ -66,9 +179,28 @@ class PromptCache:
 
         # Try exact hash match first
         prompt_hash = self._hash_prompt(prompt, operation_type, model, model_aware_cache)
+        result = self._get_exact(prompt_hash)
+        if result:
+            return result
+
+        # If no exact match, try semantic search (if enabled)
+        semantic_result = self._find_similar_prompt(prompt, operation_type, model, model_aware_cache, metadata)
+        if semantic_result:
+            semantic_result['metadata'] = parse_metadata_json(semantic_result.get('metadata'))
+        return semantic_result
+
+    def _get_exact(self, prompt_hash):
+        """Exact lookup by cache hash, memory tier before SQLite"""
+        memory_entry = self._memory.get(prompt_hash)
+        if memory_entry is not None:
+            self._access_tracker.record(prompt_hash)
+            result = dict(memory_entry)
+            result['metadata'] = parse_metadata_json(result['metadata'])
+            return result
+
         expiry_time = datetime.utcnow() - timedelta(hours=self.ttl_hours)
 
-        with sqlite_connection(self.db_path, row_factory=sqlite3.Row) as (conn, cursor):
+        with self._pool.connection(row_factory=sqlite3.Row) as (conn, cursor):
             cursor.execute('''
                 SELECT * FROM prompt_cache
                 WHERE prompt_hash = ? AND created_at > ?
@@ -76,25 +208,83 @@ class PromptCache:
 
             row = cursor.fetchone()
 
-            if row:
+        if not row:
+            return None
+
+        self._access_tracker.record(prompt_hash)
+
+        result = self._codec.decode_row(dict(row))
+        self._memory.set(prompt_hash, dict(result), self._memory_expiry(result['created_at']))
+        result['metadata'] = parse_metadata_json(result['metadata'])
+
+        return result
+
+    def _hash_pre_rag(self, prompt, operation_type, rag_version, model=None, model_aware_cache=None):
+        return self._hash_prompt(f"{rag_version}:{prompt}", f"pre_rag:{operation_type}", model, model_aware_cache)
+
+    def get_pre_rag(self, prompt, operation_type, rag_version, model=None, use_cache=None, model_aware_cache=None):
+        """
+        Look up a response by the prompt as it was before RAG augmentation.
+
+        The key includes the RAG index version, so once documents change the
+        lookup misses and retrieval runs again. A hit returns the cached entry
+        plus the RAG chunks that were used to build its prompt.
+        """
+        should_use_cache = use_cache if use_cache is not None else config.is_cache_enabled()
+
+        if not should_use_cache or not rag_version:
+            return None
+
+        alias_hash = self._hash_pre_rag(prompt, operation_type, rag_version, model, model_aware_cache)
+        alias = self._aliases.get(alias_hash)
+
+        if alias is None:
+            expiry_time = datetime.utcnow() - timedelta(hours=self.ttl_hours)
+            with self._pool.connection() as (conn, cursor):
                 cursor.execute('''
-                    UPDATE prompt_cache
-                    SET accessed_at = ?, access_count = access_count + 1
-                    WHERE prompt_hash = ?
-                ''', (datetime.utcnow().isoformat(), prompt_hash))
+                    SELECT prompt_hash, rag_chunks, created_at FROM prompt_cache_aliases
+                    WHERE alias_hash = ? AND created_at > ?
+                ''', (alias_hash, expiry_time.isoformat()))
+                row = cursor.fetchone()
 
-                result = dict(row)
-                result['metadata'] = parse_metadata_json(result['metadata'])
+            if not row:
+                return None
 
-                return result
+            alias = (row[0], row[1])
+            self._aliases.set(alias_hash, alias, self._memory_expiry(row[2]))
 
-        # If no exact match, try semantic search (if enabled)
-        semantic_result = self._find_similar_prompt(prompt, operation_type, model, model_aware_cache, metadata)
-        if semantic_result:
-            semantic_result['metadata'] = parse_metadata_json(semantic_result.get('metadata'))
-        return semantic_result
+        prompt_hash, rag_chunks_json = alias
+        result = self._get_exact(prompt_hash)
+        if not result:
+            return None
+
+        result['pre_rag_cache_hit'] = True
+        result['rag_chunks'] = json.loads(rag_chunks_json) if rag_chunks_json else []
+        return result
+
+    def set_pre_rag(self, prompt, operation_type, rag_version, augmented_prompt, rag_chunks=None, model=None,
+                    use_cache=None, model_aware_cache=None):
+        """Point the pre-RAG key for a prompt at the entry cached for its augmented prompt"""
+        should_use_cache = use_cache if use_cache is not None else config.is_cache_enabled()
+
+        if not should_use_cache or not rag_version:
+            return
+
+        alias_hash = self._hash_pre_rag(prompt, operation_type, rag_version, model, model_aware_cache)
+        prompt_hash = self._hash_prompt(augmented_prompt, operation_type, model, model_aware_cache)
+        rag_chunks_json = json.dumps(rag_chunks) if rag_chunks else None
+        now = datetime.utcnow()
+
+        with self._pool.connection() as (conn, cursor):
+            cursor.execute('''
+                INSERT OR REPLACE INTO prompt_cache_aliases (alias_hash, prompt_hash, rag_chunks, created_at)
+                VALUES (?, ?, ?, ?)
+            ''', (alias_hash, prompt_hash, rag_chunks_json, now.isoformat()))
 
-    def set(self, prompt, operation_type, response_text, metadata=None, model=None, use_cache=None, model_aware_cache=None):
+        self._aliases.set(alias_hash, (prompt_hash, rag_chunks_json), self._memory_expiry(now))
+
+    def set(self, prompt, operation_type, response_text, metadata=None, model=None, use_cache=None, model_aware_cache=None,
+            latency_ms=None, tokens=None):
         # Use provided use_cache setting, or fall back to config setting
         should_use_cache = use_cache if use_cache is not None else config.is_cache_enabled()
 
@@ -103,41 +293,169 @@ class PromptCache:
 
         prompt_hash = self._hash_prompt(prompt, operation_type, model, model_aware_cache)
         metadata_json = json.dumps(metadata) if metadata else None
+        now = datetime.utcnow()
+        index_entry = self._semantic_index.build_entry(
+            prompt_hash, prompt, operation_type, model, metadata_json, now.isoformat()
+        )
+        stored_prompt = self._codec.encode(prompt)
+        stored_response = self._codec.encode(response_text)
+        size_bytes = (
+            len(stored_prompt if isinstance(stored_prompt, bytes) else stored_prompt.encode())
+            + len(stored_response if isinstance(stored_response, bytes) else stored_response.encode())
+            + len(metadata_json or '')
+            + index_entry.vector.nnz * 8
+        )
+
+        with self._pool.connection() as (conn, cursor):
+            cursor.execute('SELECT size_bytes FROM prompt_cache WHERE prompt_hash = ?', (prompt_hash,))
+            replaced = cursor.fetchone()
 
-        with sqlite_connection(self.db_path) as (conn, cursor):
             cursor.execute('''
                 INSERT OR REPLACE INTO prompt_cache (
                     prompt_hash, prompt, operation_type, model, response_text, metadata,
-                    created_at, accessed_at, access_count
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    created_at, accessed_at, access_count, size_bytes, cost_latency_ms, cost_tokens
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
             ''', (
-                prompt_hash, prompt, operation_type, model, response_text, metadata_json,
-                datetime.utcnow().isoformat(),
-                datetime.utcnow().isoformat(),
-                1
+                prompt_hash, stored_prompt, operation_type, model, stored_response, metadata_json,
+                now.isoformat(),
+                now.isoformat(),
+                1,
+                size_bytes,
+                latency_ms,
+                tokens
             ))
+            row_id = cursor.lastrowid
+            self._semantic_index.persist(cursor, index_entry, metadata_json)
+
+        self._semantic_index.add(index_entry)
+
+        with self._budget_lock:
+            if replaced:
+                self._total_entries -= 1
+                self._total_bytes -= replaced[0] or 0
+            self._total_entries += 1
+            self._total_bytes += size_bytes
+
+        # Write-through to the memory tier once the row is committed
+        self._memory.set(prompt_hash, {
+            'id': row_id,
+            'prompt_hash': prompt_hash,
+            'prompt': prompt,
+            'operation_type': operation_type,
+            'model': model,
+            'response_text': response_text,
+            'metadata': metadata_json,
+            'created_at': now.isoformat(),
+            'accessed_at': now.isoformat(),
+            'access_count': 1
+        }, self._memory_expiry(now))
+
+        self._enforce_budget()
+
+    def _sync_budget_totals(self, cursor=None):
+        """Recount entries/bytes from SQLite (startup, bulk deletes, before evicting)"""
+        if cursor is None:
+            with self._pool.connection() as (conn, cursor):
+                return self._sync_budget_totals(cursor)
+
+        cursor.execute('SELECT COUNT(*), COALESCE(SUM(size_bytes), 0) FROM prompt_cache')
+        entries, total_bytes = cursor.fetchone()
+        self._total_entries = entries
+        self._total_bytes = total_bytes
+
+    def _over_budget(self, entries, total_bytes, fraction=1.0):
+        max_entries = config.get_cache_max_entries()
+        max_bytes = config.get_cache_max_bytes()
+        return (
+            (max_entries is not None and entries > max_entries * fraction)
+            or (max_bytes is not None and total_bytes > max_bytes * fraction)
+        )
+
+    def _enforce_budget(self):
+        """Evict by the configured policy once the entry or byte budget is exceeded"""
+        with self._budget_lock:
+            if not self._over_budget(self._total_entries, self._total_bytes):
+                return 0
+
+            # Eviction ranks on access stats, so apply pending hits first
+            self._access_tracker.flush()
+            policy = config.get_cache_eviction_policy()
+            order_by = EVICTION_POLICIES.get(policy, EVICTION_POLICIES['lru'])
+
+            victims = []
+            with self._pool.connection() as (conn, cursor):
+                self._sync_budget_totals(cursor)
+                entries, total_bytes = self._total_entries, self._total_bytes
+
+                cursor.execute(f'SELECT prompt_hash, size_bytes FROM prompt_cache ORDER BY {order_by}')
+                for prompt_hash, size_bytes in cursor:
+                    if not self._over_budget(entries, total_bytes, EVICTION_LOW_WATERMARK):
+                        break
+                    victims.append(prompt_hash)
+                    entries -= 1
+                    total_bytes -= size_bytes or 0
+
+                cursor.executemany('DELETE FROM prompt_cache WHERE prompt_hash = ?', [(h,) for h in victims])
+                cursor.executemany('DELETE FROM semantic_index WHERE prompt_hash = ?', [(h,) for h in victims])
+                cursor.executemany('DELETE FROM prompt_cache_aliases WHERE prompt_hash = ?', [(h,) for h in victims])
+
+            self._total_entries, self._total_bytes = entries, total_bytes
+            self._evictions += len(victims)
+
+        for prompt_hash in victims:
+            self._memory.delete(prompt_hash)
+        self._semantic_index.remove(victims)
+        self._access_tracker.discard(victims)
+
+        logger.info(f"Evicted {len(victims)} cache entries using '{policy}' policy")
+        return len(victims)
 
     def clear_expired(self):
         expiry_time = datetime.utcnow() - timedelta(hours=self.ttl_hours)
 
-        with sqlite_connection(self.db_path) as (conn, cursor):
+        with self._pool.connection() as (conn, cursor):
             cursor.execute('''
                 DELETE FROM prompt_cache WHERE created_at < ?
             ''', (expiry_time.isoformat(),))
 
             deleted_count = cursor.rowcount
 
+            cursor.execute('''
+                DELETE FROM semantic_index WHERE created_at < ?
+            ''', (expiry_time.isoformat(),))
+
+            cursor.execute('''
+                DELETE FROM prompt_cache_aliases WHERE created_at < ?
+            ''', (expiry_time.isoformat(),))
+
+        self._memory.purge_expired()
+        self._aliases.purge_expired()
+        self._semantic_index.purge_before(expiry_time.isoformat())
+        with self._budget_lock:
+            self._sync_budget_totals()
         return deleted_count
 
     def clear_all(self):
-        with sqlite_connection(self.db_path) as (conn, cursor):
+        with self._pool.connection() as (conn, cursor):
             cursor.execute('DELETE FROM prompt_cache')
             deleted_count = cursor.rowcount
+            cursor.execute('DELETE FROM semantic_index')
+            cursor.execute('DELETE FROM prompt_cache_aliases')
+
+        self._memory.clear()
+        self._aliases.clear()
+        self._semantic_index.clear()
+        self._access_tracker.discard()
+        with self._budget_lock:
+            self._total_entries = 0
+            self._total_bytes = 0
 
         return deleted_count
 
     def get_stats(self):
-        with sqlite_connection(self.db_path) as (conn, cursor):
+        self._access_tracker.flush()
+
+        with self._pool.connection() as (conn, cursor):
             cursor.execute('''
                 SELECT
                     COUNT(*) as total_entries,
@@ -164,9 +482,25 @@ class PromptCache:
             'ttl_hours': self.ttl_hours,
             'enabled': config.is_cache_enabled(),
             'model_aware_cache': config.is_model_aware_cache(),
-            'semantic_cache_enabled': config.is_semantic_cache_enabled()
+            'semantic_cache_enabled': config.is_semantic_cache_enabled(),
+            'memory_tier': self._memory.get_stats(),
+            'pre_rag_aliases': self._aliases.get_stats(),
+            'semantic_index': self._semantic_index.get_stats(),
+            'access_tracker': self._access_tracker.get_stats(),
+            'budget': self.get_budget_stats(),
+            'connection_pool': self._pool.get_stats()
         }
 
+    def get_budget_stats(self):
+        with self._budget_lock:
+            return {
+                'total_bytes': self._total_bytes,
+                'max_bytes': config.get_cache_max_bytes(),
+                'max_entries': config.get_cache_max_entries(),
+                'eviction_policy': config.get_cache_eviction_policy(),
+                'evictions': self._evictions
+            }
+
     def set_enabled(self, enabled):
         """Store cache enabled state"""
         return config.set_cache_enabled(enabled)
@@ -203,8 +537,38 @@ class PromptCache:
         """Get semantic similarity threshold"""
         return config.get_semantic_similarity_threshold()
 
+    def set_eviction_policy(self, policy):
+        """Store eviction policy and enforce the budget under it"""
+        config.set_cache_eviction_policy(policy)
+        self._enforce_budget()
+        return policy
+
+    def get_eviction_policy(self):
+        """Read eviction policy"""
+        return config.get_cache_eviction_policy()
+
+    def set_max_bytes(self, max_bytes):
+        """Store byte budget and evict down to it"""
+        config.set_cache_max_bytes(max_bytes)
+        self._enforce_budget()
+        return max_bytes
+
+    def get_max_bytes(self):
+        """Read byte budget"""
+        return config.get_cache_max_bytes()
+
+    def set_max_entries(self, max_entries):
+        """Store entry budget and evict down to it"""
+        config.set_cache_max_entries(max_entries)
+        self._enforce_budget()
+        return max_entries
+
+    def get_max_entries(self):
+        """Read entry budget"""
+        return config.get_cache_max_entries()
+
     def _find_similar_prompt(self, prompt, operation_type, model=None, model_aware_cache=None, metadata=None):
-        """Find similar cached prompt using semantic search (TF-IDF + cosine similarity)
+        """Find similar cached prompt using the incremental semantic index (hashed TF + cosine similarity)
 
         Only compares against cached entries with matching metadata fields.
         This ensures semantic cache only matches similar prompts for the SAME problem/context.
@@ -217,93 +581,51 @@ class PromptCache:
 
         expiry_time = datetime.utcnow() - timedelta(hours=self.ttl_hours)
 
-        # Get all non-expired prompts for this operation type (and model if model-aware)
-        with sqlite_connection(self.db_path, row_factory=sqlite3.Row) as (conn, cursor):
-            if use_model_aware and model:
-                cursor.execute('''
-                    SELECT * FROM prompt_cache
-                    WHERE operation_type = ? AND model = ? AND created_at > ?
-                ''', (operation_type, model, expiry_time.isoformat()))
-            else:
-                cursor.execute('''
-                    SELECT * FROM prompt_cache
-                    WHERE operation_type = ? AND created_at > ?
-                ''', (operation_type, expiry_time.isoformat()))
-
-            rows = cursor.fetchall()
-
-        if not rows:
+        try:
+            match = self._semantic_index.search(
+                prompt,
+                operation_type,
+                threshold,
+                not_before=expiry_time.isoformat(),
+                model=model if use_model_aware else None,
+                metadata=metadata
+            )
+        except Exception as e:
+            logger.warning(f"Semantic search error: {e}")
             return None
 
-        # Extract prompts and filter by metadata if provided
-        cached_prompts = [dict(row) for row in rows]
-
-        # Filter by metadata: only keep entries with matching metadata fields
-        if metadata:
-            filtered_prompts = []
-            for cp in cached_prompts:
-                if cp['metadata']:
-                    try:
-                        cached_metadata = json.loads(cp['metadata']) if isinstance(cp['metadata'], str) else cp['metadata']
-                        # Check if all provided metadata fields match
-                        metadata_match = all(
-                            cached_metadata.get(key) == value
-                            for key, value in metadata.items()
-                        )
-                        if metadata_match:
-                            filtered_prompts.append(cp)
-                    except (json.JSONDecodeError, TypeError, AttributeError) as e:
-                        logger.debug(f"Skipping cache entry with invalid metadata: {e}")
-                        continue
-            cached_prompts = filtered_prompts
-
-        if not cached_prompts:
+        if not match:
             return None
 
-        # Extract prompts for comparison
-        prompt_texts = [cp['prompt'] for cp in cached_prompts]
-        prompt_texts.append(prompt)  # Add current prompt
+        prompt_hash, similarity = match
 
-        # Calculate TF-IDF vectors
-        try:
-            vectorizer = TfidfVectorizer(lowercase=True, stop_words='english')
-            tfidf_matrix = vectorizer.fit_transform(prompt_texts)
-
-            # Calculate cosine similarity between current prompt and all cached prompts
-            similarities = cosine_similarity(tfidf_matrix[-1:], tfidf_matrix[:-1])[0]
-
-            # Find best match above threshold
-            max_idx = np.argmax(similarities)
-            max_similarity = similarities[max_idx]
-
-            if max_similarity >= threshold:
-                best_match = cached_prompts[max_idx]
-                best_match['similarity_score'] = float(max_similarity)
-                best_match['semantic_cache_hit'] = True
-                best_match['current_prompt'] = prompt  # Include current prompt for diff comparison
-
-                # Update access stats for the matched entry
-                with sqlite_connection(self.db_path) as (conn, cursor):
-                    cursor.execute('''
-                        UPDATE prompt_cache
-                        SET accessed_at = ?, access_count = access_count + 1
-                        WHERE prompt_hash = ?
-                    ''', (datetime.utcnow().isoformat(), best_match['prompt_hash']))
-
-                return best_match
-        except Exception as e:
-            logger.warning(f"Semantic search error: {e}")
+        with self._pool.connection(row_factory=sqlite3.Row) as (conn, cursor):
+            cursor.execute('''
+                SELECT * FROM prompt_cache
+                WHERE prompt_hash = ? AND created_at > ?
+            ''', (prompt_hash, expiry_time.isoformat()))
+
+            row = cursor.fetchone()
+
+        if not row:
             return None
 
-        return None
+        self._access_tracker.record(prompt_hash)
+
+        best_match = self._codec.decode_row(dict(row))
+        best_match['similarity_score'] = similarity
+        best_match['semantic_cache_hit'] = True
+        best_match['current_prompt'] = prompt  # Include current prompt for diff comparison
+
+        return best_match
 
     def get_all_entries(self, limit=100):
-        with sqlite_connection(self.db_path, row_factory=sqlite3.Row) as (conn, cursor):
+        self._access_tracker.flush()
+
+        with self._pool.connection(row_factory=sqlite3.Row) as (conn, cursor):
             cursor.execute('''
                 SELECT
-                    id, prompt_hash, operation_type, model,
-                    substr(prompt, 1, 100) as prompt_preview,
-                    substr(response_text, 1, 100) as response_preview,
+                    id, prompt_hash, operation_type, model, prompt, response_text,
                     created_at, accessed_at, access_count
                 FROM prompt_cache
                 ORDER BY accessed_at DESC
@@ -312,6 +634,14 @@ class PromptCache:
 
             rows = cursor.fetchall()
 
-        return [dict(row) for row in rows]
+        entries = []
+        for row in rows:
+            entry = dict(row)
+            # Previews are cut after decompression, so they can't be done in SQL
+            entry['prompt_preview'] = self._codec.decode(entry.pop('prompt'))[:100]
+            entry['response_preview'] = self._codec.decode(entry.pop('response_text'))[:100]
+            entries.append(entry)
+
+        return entries
 
 cache = PromptCache()
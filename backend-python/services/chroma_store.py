@@ -0,0 +1,153 @@
+"""
+Long-lived ChromaDB collection handle
+
+Opening a PersistentClient loads the collection and its HNSW index from disk,
+so the handle opens it once (at startup, or on first use) and keeps it.
+
+Concurrency model:
+- One client and collection per process, shared by every thread. Chroma's
+  client is thread-safe (its SQLite store serializes writers and the HNSW
+  index guards itself), so reads and writes take no extra lock here.
+- The handle's condition only covers the lifecycle. close() and reopen()
+  stop new operations from starting, wait for in-flight ones to finish, and
+  then release the client.
+- If an operation fails, the client is reopened in case it was left in a
+  bad state. Reads are retried once on the fresh client; writes are not, and
+  their error is raised to the caller.
+- The store is owned by one process. Documents written by another process
+  on the same path are visible here after reopen().
+"""
+import atexit
+import logging
+import threading
+import time
+from contextlib import contextmanager
+
+import chromadb
+from chromadb.config import Settings
+
+logger = logging.getLogger(__name__)
+
+
+class ChromaStore:
+    """Thread-safe, explicitly managed PersistentClient + collection"""
+
+    def __init__(self, path, collection_name, collection_metadata=None, close_timeout=10.0):
+        self.path = path
+        self.collection_name = collection_name
+        self.collection_metadata = collection_metadata
+        self.close_timeout = close_timeout
+
+        self._client = None
+        self._collection = None
+        self._in_flight = 0
+        self._closing = False
+        self._condition = threading.Condition()
+        self._stats = {'opens': 0, 'reopens': 0, 'reads': 0, 'writes': 0, 'errors': 0, 'open_ms': 0.0}
+
+        atexit.register(self.close)
+
+    def _open_locked(self):
+        if self._collection is None:
+            start = time.perf_counter()
+            self._client = chromadb.PersistentClient(path=self.path, settings=Settings(anonymized_telemetry=False))
+            self._collection = self._client.get_or_create_collection(
+                name=self.collection_name, metadata=self.collection_metadata
+            )
+            self._stats['opens'] += 1
+            self._stats['open_ms'] = round((time.perf_counter() - start) * 1000, 2)
+            logger.info(f"[CHROMA] Opened {self.collection_name} at {self.path} in {self._stats['open_ms']}ms")
+        return self._collection
+
+    def _close_locked(self):
+        self._condition.wait_for(lambda: self._in_flight == 0, timeout=self.close_timeout)
+        client = self._client
+        self._client = self._collection = None
+        if client is not None:
+            # close() only exists in newer chromadb releases
+            close = getattr(client, 'close', None)
+            if close is not None:
+                try:
+                    close()
+                except Exception as e:
+                    logger.debug(f"Error closing Chroma client: {e}")
+
+    def open(self):
+        """Open the client and collection if they aren't already; returns the collection"""
+        with self._condition:
+            self._condition.wait_for(lambda: not self._closing)
+            return self._open_locked()
+
+    def close(self):
+        """Release the client once in-flight operations finish (the next operation reopens it)"""
+        with self._condition:
+            self._closing = True
+            try:
+                self._close_locked()
+            finally:
+                self._closing = False
+                self._condition.notify_all()
+
+    def reopen(self):
+        """Close and open again, e.g. to pick up another process's writes"""
+        with self._condition:
+            self._closing = True
+            try:
+                self._close_locked()
+                self._stats['reopens'] += 1
+                self._open_locked()
+            finally:
+                self._closing = False
+                self._condition.notify_all()
+
+    @contextmanager
+    def _checkout(self):
+        with self._condition:
+            self._condition.wait_for(lambda: not self._closing)
+            collection = self._open_locked()
+            self._in_flight += 1
+        try:
+            yield collection
+        finally:
+            with self._condition:
+                self._in_flight -= 1
+                self._condition.notify_all()
+
+    def _run(self, fn, kind):
+        with self._checkout() as collection:
+            with self._condition:
+                self._stats[kind] += 1
+            return fn(collection)
+
+    def _on_error(self, error):
+        with self._condition:
+            self._stats['errors'] += 1
+        logger.warning(f"[CHROMA] Operation failed ({error}); reopening {self.collection_name}")
+        try:
+            self.reopen()
+        except Exception as e:
+            logger.error(f"[CHROMA] Reopen failed: {e}")
+
+    def read(self, fn):
+        """Run fn(collection) for a read, retrying once on a reopened client if it fails"""
+        try:
+            return self._run(fn, 'reads')
+        except Exception as e:
+            self._on_error(e)
+        return self._run(fn, 'reads')
+
+    def write(self, fn):
+        """Run fn(collection) for a write; a failure reopens the client and is raised"""
+        try:
+            return self._run(fn, 'writes')
+        except Exception as e:
+            self._on_error(e)
+            raise
+
+    def get_stats(self):
+        with self._condition:
+            return {
+                **self._stats,
+                'open': self._collection is not None,
+                'in_flight': self._in_flight
+            }
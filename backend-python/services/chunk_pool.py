@@ -0,0 +1,166 @@
+"""
+Sentence-aware chunking, inline or on a process pool
+
+LlamaIndex's SentenceSplitter is pure Python regex work that holds the GIL,
+so chunking on threads doesn't run in parallel. For bulk loads, chunk_many()
+splits documents on a pool of worker processes instead. Documents go to the
+workers in batches and only plain string chunks come back, which keeps
+pickling cheap. A single document, or a small total, is chunked inline: the
+round trip to a worker would cost more than the split.
+
+Workers are forked from a forkserver that imports this module once, so they
+start with the splitter already loaded and without inheriting the web
+process's threads. The pool starts on first use and is resized when the
+configured worker count changes. If it breaks, chunk_many() chunks inline.
+"""
+import atexit
+import logging
+import math
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import List
+
+from llama_index.core.node_parser import SentenceSplitter
+from llama_index.core.schema import Document as LlamaDocument
+
+from services.config_service import config
+
+logger = logging.getLogger(__name__)
+
+# Batches per worker, so a slow batch doesn't leave the other workers idle
+BATCHES_PER_WORKER = 4
+
+_splitters = {}
+
+
+def make_splitter(chunk_size: int, chunk_overlap: int) -> SentenceSplitter:
+    """Sentence splitter respecting paragraph, sentence and word boundaries"""
+    return SentenceSplitter(
+        chunk_size=chunk_size,
+        chunk_overlap=chunk_overlap,
+        paragraph_separator="\n\n",  # paragraph boundaries
+        secondary_chunking_regex="[^,.;。？！]+[,.;。？！]?",  # sentence boundaries
+        separator=" ",  # word boundaries
+    )
+
+
+def split_text(splitter: SentenceSplitter, text: str, chunk_size: int) -> List[str]:
+    """Chunks of text (the text itself when it fits in one chunk)"""
+    if len(text) <= chunk_size:
+        return [text]
+
+    nodes = splitter.get_nodes_from_documents([LlamaDocument(text=text)])
+
+    chunks = [node.get_content() for node in nodes]  # extract text
+
+    chunks = [chunk.strip() for chunk in chunks if chunk.strip()]  # filter empty out
+
+    return chunks if chunks else [text]
+
+
+def _split_batch(texts: List[str], chunk_size: int, chunk_overlap: int) -> List[List[str]]:
+    """Worker entry point; each process builds its splitter once"""
+    splitter = _splitters.get((chunk_size, chunk_overlap))
+    if splitter is None:
+        splitter = _splitters[(chunk_size, chunk_overlap)] = make_splitter(chunk_size, chunk_overlap)
+    return [split_text(splitter, text, chunk_size) for text in texts]
+
+
+def _pool_context():
+    if 'forkserver' in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context('forkserver')
+        context.set_forkserver_preload([__name__])
+        return context
+    return multiprocessing.get_context('spawn')
+
+
+class ChunkPool:
+    """Chunks documents with a shared splitter inline, or many at once on worker processes"""
+
+    def __init__(self, chunk_size: int, chunk_overlap: int):
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+        self.splitter = make_splitter(chunk_size, chunk_overlap)
+
+        self._executor = None
+        self._workers = 0
+        self._lock = threading.Lock()
+        self._stats = {'inline_documents': 0, 'pool_documents': 0, 'pool_batches': 0, 'chunks': 0,
+                       'pool_failures': 0}
+
+        atexit.register(self.shutdown)
+
+    def chunk(self, text: str) -> List[str]:
+        """Chunk one document inline"""
+        return self.chunk_many([text])[0]
+
+    def _get_executor(self, workers: int) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None or self._workers != workers:
+                if self._executor is not None:
+                    self._executor.shutdown(wait=False)
+                self._executor = ProcessPoolExecutor(max_workers=workers, mp_context=_pool_context())
+                self._workers = workers
+                logger.info(f"[CHUNKING] Started process pool with {workers} workers")
+            return self._executor
+
+    def _count(self, **increments):
+        with self._lock:
+            for key, value in increments.items():
+                self._stats[key] += value
+
+    def chunk_many(self, texts: List[str]) -> List[List[str]]:
+        """
+        Chunk many documents, in parallel when it pays off.
+
+        Args:
+            texts: Document texts
+
+        Returns:
+            One list of chunks per text, in order
+        """
+        workers = config.get_chunking_workers()
+        small = len(texts) <= 1 or sum(len(text) for text in texts) <= config.get_chunking_inline_max_chars()
+        if workers == 0 or small:
+            results = [split_text(self.splitter, text, self.chunk_size) for text in texts]
+            self._count(inline_documents=len(texts), chunks=sum(len(chunks) for chunks in results))
+            return results
+
+        per_batch = math.ceil(len(texts) / (workers * BATCHES_PER_WORKER))
+        batches = [texts[i:i + per_batch] for i in range(0, len(texts), per_batch)]
+        try:
+            executor = self._get_executor(workers)
+            results = [chunks for batch in executor.map(_split_batch, batches,
+                                                        [self.chunk_size] * len(batches),
+                                                        [self.chunk_overlap] * len(batches))
+                       for chunks in batch]
+        except BrokenProcessPool as e:
+            logger.error(f"[CHUNKING] Process pool failed ({e}); chunking inline")
+            with self._lock:
+                self._executor = None
+                self._stats['pool_failures'] += 1
+            results = [split_text(self.splitter, text, self.chunk_size) for text in texts]
+            self._count(inline_documents=len(texts), chunks=sum(len(chunks) for chunks in results))
+            return results
+
+        self._count(pool_documents=len(texts), pool_batches=len(batches),
+                    chunks=sum(len(chunks) for chunks in results))
+        return results
+
+    def shutdown(self):
+        """Stop the worker processes (the next pooled call starts them again)"""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    def get_stats(self):
+        with self._lock:
+            return {
+                **self._stats,
+                'workers': config.get_chunking_workers(),
+                'inline_max_chars': config.get_chunking_inline_max_chars(),
+                'pool_running': self._executor is not None
+            }
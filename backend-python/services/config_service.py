@@ -4,10 +4,34 @@ Simple in-memory configuration service
 This provides a single source of truth for application configuration without external dependencies.
 """
 import logging
+import os
 from typing import Optional
 
 logger = logging.getLogger(__name__)
 
+CACHE_EVICTION_POLICIES = ('lru', 'lfu', 'cost')
+LLM_PROVIDERS = ('gemini', 'stub')
+
+# Most texts the embedding API accepts in one batch request
+EMBEDDING_BATCH_LIMIT = 100
+
+# Per-operation latency SLOs: hedge after hedge_delay_seconds (None disables hedging),
+# fail after deadline_seconds. '*' applies to operations without their own entry.
+DEFAULT_LLM_SLOS = {
+    '*': {'hedge_delay_seconds': 10.0, 'deadline_seconds': 90.0},
+    'leetcode_solve': {'hedge_delay_seconds': 12.0, 'deadline_seconds': 90.0},
+    'test_case_generation': {'hedge_delay_seconds': 8.0, 'deadline_seconds': 60.0},
+    'code_modification': {'hedge_delay_seconds': 8.0, 'deadline_seconds': 60.0},
+}
+
+# Estimated prompt tokens (template + code + RAG context) per model. Smaller
+# budgets keep cheaper, faster models fast; '*' applies to unlisted models.
+DEFAULT_PROMPT_TOKEN_BUDGETS = {
+    '*': 8000,
+    'gemini-2.5-flash-lite': 4000,
+    'gemini-2.5-pro': 16000,
+}
+
 
 class ConfigService:
     """In-memory configuration state management"""
@@ -19,10 +43,34 @@ class ConfigService:
         self._current_model = 'gemini-2.5-flash'
         self._semantic_cache_enabled = False
         self._semantic_similarity_threshold = 0.95
+        self._cache_max_bytes = 512 * 1024 * 1024
+        self._cache_max_entries = 100000
+        self._cache_eviction_policy = 'lru'
+
+        # LLM pipeline settings
+        self._llm_provider = os.environ.get('LLM_PROVIDER', 'gemini')
+        if self._llm_provider not in LLM_PROVIDERS:
+            logger.warning(f"Unknown LLM_PROVIDER {self._llm_provider!r}, using gemini")
+            self._llm_provider = 'gemini'
+        self._single_flight_timeout = 120.0
+        self._batch_concurrency = 8
+        self._batch_max_items = 200
+        self._llm_rate_limit = 10.0  # requests/second per API key and model
+        self._llm_rate_burst = 10
+        self._llm_retry_deadline = 60.0
+        self._llm_slos = {op: dict(slo) for op, slo in DEFAULT_LLM_SLOS.items()}
+        self._hedge_fallback_model = None
+        self._prompt_token_budgets = dict(DEFAULT_PROMPT_TOKEN_BUDGETS)
 
         # RAG settings
         self._rag_enabled = False
         self._rag_doc_id_counter = 0
+        self._embedding_batch_size = EMBEDDING_BATCH_LIMIT
+        self._embedding_batch_max_tokens = 20000
+        self._embedding_concurrency = 4
+        self._embedding_cache_enabled = True
+        self._chunking_workers = os.cpu_count() or 1
+        self._chunking_inline_max_chars = 20000
 
     # Cache configuration methods
     def set_cache_enabled(self, enabled: bool) -> bool:
@@ -75,6 +123,164 @@ class ConfigService:
         """Get the semantic similarity threshold"""
         return self._semantic_similarity_threshold
 
+    def set_cache_max_bytes(self, max_bytes: Optional[int]) -> Optional[int]:
+        """Set the cache size budget in bytes (None for unbounded)"""
+        self._cache_max_bytes = int(max_bytes) if max_bytes is not None else None
+        logger.info(f"Cache max bytes set to: {self._cache_max_bytes}")
+        return self._cache_max_bytes
+
+    def get_cache_max_bytes(self) -> Optional[int]:
+        """Get the cache size budget in bytes"""
+        return self._cache_max_bytes
+
+    def set_cache_max_entries(self, max_entries: Optional[int]) -> Optional[int]:
+        """Set the cache entry budget (None for unbounded)"""
+        self._cache_max_entries = int(max_entries) if max_entries is not None else None
+        logger.info(f"Cache max entries set to: {self._cache_max_entries}")
+        return self._cache_max_entries
+
+    def get_cache_max_entries(self) -> Optional[int]:
+        """Get the cache entry budget"""
+        return self._cache_max_entries
+
+    def set_cache_eviction_policy(self, policy: str) -> str:
+        """
+        Set the cache eviction policy.
+
+        'lru' evicts the least recently used entries, 'lfu' the least used, and
+        'cost' the entries with the lowest generation time (measured latency, or
+        latency estimated from tokens) times hits per byte stored.
+        """
+        if policy not in CACHE_EVICTION_POLICIES:
+            raise ValueError(f"Unknown eviction policy '{policy}', expected one of {CACHE_EVICTION_POLICIES}")
+        self._cache_eviction_policy = policy
+        logger.info(f"Cache eviction policy set to: {policy}")
+        return policy
+
+    def get_cache_eviction_policy(self) -> str:
+        """Get the cache eviction policy"""
+        return self._cache_eviction_policy
+
+    # LLM pipeline configuration methods
+    def set_single_flight_timeout(self, seconds: float) -> float:
+        """Set how long identical requests wait on an in-flight LLM call"""
+        self._single_flight_timeout = float(seconds)
+        logger.info(f"Single-flight timeout set to: {self._single_flight_timeout}")
+        return self._single_flight_timeout
+
+    def get_single_flight_timeout(self) -> float:
+        """Get how long identical requests wait on an in-flight LLM call"""
+        return self._single_flight_timeout
+
+    def set_batch_concurrency(self, concurrency: int) -> int:
+        """Set how many batch items may run LLM calls at once"""
+        if int(concurrency) < 1:
+            raise ValueError("Batch concurrency must be at least 1")
+        self._batch_concurrency = int(concurrency)
+        logger.info(f"Batch concurrency set to: {self._batch_concurrency}")
+        return self._batch_concurrency
+
+    def get_batch_concurrency(self) -> int:
+        """Get how many batch items may run LLM calls at once"""
+        return self._batch_concurrency
+
+    def set_batch_max_items(self, max_items: int) -> int:
+        """Set the largest batch accepted by /api/jobs/batch"""
+        if int(max_items) < 1:
+            raise ValueError("Batch size limit must be at least 1")
+        self._batch_max_items = int(max_items)
+        logger.info(f"Batch max items set to: {self._batch_max_items}")
+        return self._batch_max_items
+
+    def get_batch_max_items(self) -> int:
+        """Get the largest batch accepted by /api/jobs/batch"""
+        return self._batch_max_items
+
+    def set_llm_rate_limit(self, requests_per_second: float, burst: Optional[int] = None) -> float:
+        """Set the request rate ceiling per API key and model (and optionally the burst size)"""
+        if float(requests_per_second) <= 0:
+            raise ValueError("Rate limit must be positive")
+        self._llm_rate_limit = float(requests_per_second)
+        if burst is not None:
+            self._llm_rate_burst = max(1, int(burst))
+        logger.info(f"LLM rate limit set to: {self._llm_rate_limit}/s (burst {self._llm_rate_burst})")
+        return self._llm_rate_limit
+
+    def get_llm_rate_limit(self) -> float:
+        """Get the request rate ceiling per API key and model"""
+        return self._llm_rate_limit
+
+    def get_llm_rate_burst(self) -> int:
+        """Get how many requests may be sent back to back before the rate limit applies"""
+        return self._llm_rate_burst
+
+    def set_llm_retry_deadline(self, seconds: float) -> float:
+        """Set how long a throttled or failing API call keeps retrying"""
+        self._llm_retry_deadline = float(seconds)
+        logger.info(f"LLM retry deadline set to: {self._llm_retry_deadline}")
+        return self._llm_retry_deadline
+
+    def get_llm_retry_deadline(self) -> float:
+        """Get how long a throttled or failing API call keeps retrying"""
+        return self._llm_retry_deadline
+
+    def set_llm_slo(self, operation_type: str, hedge_delay_seconds: Optional[float],
+                    deadline_seconds: Optional[float]) -> dict:
+        """Set when an operation's LLM call is hedged and when it gives up (None disables either)"""
+        self._llm_slos[operation_type] = {
+            'hedge_delay_seconds': float(hedge_delay_seconds) if hedge_delay_seconds is not None else None,
+            'deadline_seconds': float(deadline_seconds) if deadline_seconds is not None else None
+        }
+        logger.info(f"LLM SLO for {operation_type} set to: {self._llm_slos[operation_type]}")
+        return self._llm_slos[operation_type]
+
+    def get_llm_slo(self, operation_type: str) -> dict:
+        """Get the hedge delay and deadline for an operation"""
+        return dict(self._llm_slos.get(operation_type, self._llm_slos['*']))
+
+    def get_llm_slos(self) -> dict:
+        """Get all configured LLM SLOs"""
+        return {op: dict(slo) for op, slo in self._llm_slos.items()}
+
+    def set_hedge_fallback_model(self, model: Optional[str]) -> Optional[str]:
+        """Set the model hedge requests go to (None hedges to the primary model)"""
+        self._hedge_fallback_model = model or None
+        logger.info(f"Hedge fallback model set to: {self._hedge_fallback_model}")
+        return self._hedge_fallback_model
+
+    def get_hedge_fallback_model(self) -> Optional[str]:
+        """Get the model hedge requests go to (None hedges to the primary model)"""
+        return self._hedge_fallback_model
+
+    def set_llm_provider(self, provider: str) -> str:
+        """Set the generation/embedding provider ('gemini' or 'stub')"""
+        if provider not in LLM_PROVIDERS:
+            raise ValueError(f"Unknown LLM provider: {provider}. Choose from {', '.join(LLM_PROVIDERS)}")
+        self._llm_provider = provider
+        logger.info(f"LLM provider set to: {provider}")
+        return provider
+
+    def get_llm_provider(self) -> str:
+        """Get the generation/embedding provider"""
+        return self._llm_provider
+
+    def set_prompt_token_budget(self, model: str, tokens: int) -> int:
+        """Set a model's prompt token budget ('*' for the default)"""
+        tokens = int(tokens)
+        if tokens <= 0:
+            raise ValueError("Prompt token budget must be positive")
+        self._prompt_token_budgets[model] = tokens
+        logger.info(f"Prompt token budget for {model} set to: {tokens}")
+        return tokens
+
+    def get_prompt_token_budget(self, model: str) -> int:
+        """Get the prompt token budget for a model"""
+        return self._prompt_token_budgets.get(model, self._prompt_token_budgets['*'])
+
+    def get_prompt_token_budgets(self) -> dict:
+        """Get all configured prompt token budgets"""
+        return dict(self._prompt_token_budgets)
+
     # RAG configuration methods
     def set_rag_enabled(self, enabled: bool) -> bool:
         """Enable or disable RAG"""
@@ -95,6 +301,74 @@ class ConfigService:
         """Get the current RAG document ID counter"""
         return self._rag_doc_id_counter
 
+    def ensure_rag_doc_id_counter(self, minimum: int) -> int:
+        """Raise the RAG document ID counter to at least minimum (e.g. the highest stored ID)"""
+        if minimum > self._rag_doc_id_counter:
+            self._rag_doc_id_counter = minimum
+            logger.info(f"RAG document ID counter set to {minimum}")
+        return self._rag_doc_id_counter
+
+    def set_embedding_batch_size(self, batch_size: int, max_tokens: Optional[int] = None) -> int:
+        """Set how many texts (and optionally estimated tokens) go in one embedding request"""
+        batch_size = int(batch_size)
+        if not 1 <= batch_size <= EMBEDDING_BATCH_LIMIT:
+            raise ValueError(f"Embedding batch size must be between 1 and {EMBEDDING_BATCH_LIMIT}")
+        self._embedding_batch_size = batch_size
+        if max_tokens is not None:
+            self._embedding_batch_max_tokens = max(1, int(max_tokens))
+        logger.info(f"Embedding batch size set to: {batch_size} texts, "
+                    f"{self._embedding_batch_max_tokens} tokens")
+        return batch_size
+
+    def get_embedding_batch_size(self) -> int:
+        """Get the most texts sent in one embedding request"""
+        return self._embedding_batch_size
+
+    def get_embedding_batch_max_tokens(self) -> int:
+        """Get the most estimated tokens sent in one embedding request"""
+        return self._embedding_batch_max_tokens
+
+    def set_embedding_concurrency(self, concurrency: int) -> int:
+        """Set how many embedding requests one ingestion keeps in flight"""
+        if int(concurrency) < 1:
+            raise ValueError("Embedding concurrency must be at least 1")
+        self._embedding_concurrency = int(concurrency)
+        logger.info(f"Embedding concurrency set to: {self._embedding_concurrency}")
+        return self._embedding_concurrency
+
+    def get_embedding_concurrency(self) -> int:
+        """Get how many embedding requests one ingestion keeps in flight"""
+        return self._embedding_concurrency
+
+    def set_embedding_cache_enabled(self, enabled: bool) -> bool:
+        """Enable or disable the embedding cache"""
+        self._embedding_cache_enabled = enabled
+        logger.info(f"Embedding cache enabled set to: {enabled}")
+        return enabled
+
+    def is_embedding_cache_enabled(self) -> bool:
+        """Check if the embedding cache is enabled"""
+        return self._embedding_cache_enabled
+
+    def set_chunking_workers(self, workers: int, inline_max_chars: Optional[int] = None) -> int:
+        """Set the chunking process pool size (0 chunks inline) and the most characters chunked inline"""
+        if int(workers) < 0:
+            raise ValueError("Chunking workers must be 0 or more")
+        self._chunking_workers = int(workers)
+        if inline_max_chars is not None:
+            self._chunking_inline_max_chars = max(0, int(inline_max_chars))
+        logger.info(f"Chunking workers set to: {self._chunking_workers} "
+                    f"(inline up to {self._chunking_inline_max_chars} characters)")
+        return self._chunking_workers
+
+    def get_chunking_workers(self) -> int:
+        """Get the chunking process pool size (0 means chunk inline)"""
+        return self._chunking_workers
+
+    def get_chunking_inline_max_chars(self) -> int:
+        """Get the most characters chunked inline instead of on the process pool"""
+        return self._chunking_inline_max_chars
+
 
 # Global singleton instance
 config = ConfigService()
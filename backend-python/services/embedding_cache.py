@@ -0,0 +1,153 @@
+"""
+Content-addressed embedding cache
+
+Embeddings are keyed by (embedding model, SHA-256 of the text), so the same
+text is only ever embedded once per model: repeated RAG queries, chunks shared
+between re-ingested or edited documents, and benchmark reruns all hit the
+cache. Vectors are stored as float32 BLOBs in SQLite, with a bounded
+in-memory LRU tier in front holding numpy arrays.
+
+The model key includes the provider name, so vectors from the offline stub
+never answer for a real model.
+"""
+import hashlib
+import logging
+import sqlite3
+import threading
+from datetime import datetime
+
+import numpy as np
+
+from utils import cache_error_handler
+from services.memory_tier import MemoryTier
+from services.sqlite_pool import get_pool
+
+logger = logging.getLogger(__name__)
+
+# SQLite's default limit on host parameters is 999; two are used per key
+LOOKUP_BATCH_SIZE = 400
+
+
+class EmbeddingCache:
+    """Persistent (model, text hash) -> float32 vector store with an LRU tier"""
+
+    def __init__(self, db_path='data/embedding_cache.db', memory_max_entries=4096):
+        self.db_path = db_path
+        self._pool = get_pool(db_path)
+        self._memory = MemoryTier(max_entries=memory_max_entries)
+        self._lock = threading.Lock()
+        self._stats = {'memory_hits': 0, 'disk_hits': 0, 'misses': 0, 'stored': 0}
+        self._init_database()
+
+    def _init_database(self):
+        with self._pool.connection() as (conn, cursor):
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS embedding_cache (
+                    model TEXT NOT NULL,
+                    text_hash TEXT NOT NULL,
+                    dimensions INTEGER NOT NULL,
+                    vector BLOB NOT NULL,
+                    created_at TIMESTAMP NOT NULL,
+                    PRIMARY KEY (model, text_hash)
+                ) WITHOUT ROWID
+            ''')
+
+    @staticmethod
+    def _hash_text(text):
+        return hashlib.sha256(text.encode()).hexdigest()
+
+    def _count(self, **increments):
+        with self._lock:
+            for key, value in increments.items():
+                self._stats[key] += value
+
+    def get_many(self, model, texts):
+        """
+        Look up embeddings for texts.
+
+        Args:
+            model: Embedding model key
+            texts: Texts to look up
+
+        Returns:
+            A list parallel to texts holding each cached embedding, or None where missing
+        """
+        hashes = [self._hash_text(text) for text in texts]
+        found = {}
+        for text_hash in set(hashes):
+            vector = self._memory.get((model, text_hash))
+            if vector is not None:
+                found[text_hash] = vector
+        memory_hits = len(found)
+
+        missing = [text_hash for text_hash in set(hashes) if text_hash not in found]
+        for start in range(0, len(missing), LOOKUP_BATCH_SIZE):
+            batch = missing[start:start + LOOKUP_BATCH_SIZE]
+            try:
+                with self._pool.connection() as (conn, cursor):
+                    cursor.execute(f'''
+                        SELECT text_hash, vector FROM embedding_cache
+                        WHERE model = ? AND text_hash IN ({','.join('?' * len(batch))})
+                    ''', (model, *batch))
+                    rows = cursor.fetchall()
+            except sqlite3.Error as e:
+                # Treat as misses; the texts just get embedded again
+                logger.error(f"Embedding cache lookup failed: {e}")
+                break
+            for text_hash, blob in rows:
+                vector = np.frombuffer(blob, dtype=np.float32)
+                found[text_hash] = vector
+                self._memory.set((model, text_hash), vector)
+
+        self._count(memory_hits=memory_hits, disk_hits=len(found) - memory_hits,
+                    misses=len(set(hashes)) - len(found))
+        return [found[text_hash].tolist() if text_hash in found else None for text_hash in hashes]
+
+    def get(self, model, text):
+        """Cached embedding for one text, or None"""
+        return self.get_many(model, [text])[0]
+
+    @cache_error_handler(default_value=None)
+    def set_many(self, model, texts, embeddings):
+        """Store embeddings for texts (parallel lists)"""
+        created_at = datetime.now().isoformat()
+        rows = []
+        for text, embedding in zip(texts, embeddings):
+            text_hash = self._hash_text(text)
+            vector = np.asarray(embedding, dtype=np.float32)
+            self._memory.set((model, text_hash), vector)
+            rows.append((model, text_hash, len(vector), vector.tobytes(), created_at))
+
+        with self._pool.connection() as (conn, cursor):
+            cursor.executemany('''
+                INSERT OR REPLACE INTO embedding_cache (model, text_hash, dimensions, vector, created_at)
+                VALUES (?, ?, ?, ?, ?)
+            ''', rows)
+        self._count(stored=len(rows))
+
+    @cache_error_handler(default_value=0)
+    def clear(self):
+        """Drop every cached embedding and return how many were removed"""
+        self._memory.clear()
+        with self._pool.connection() as (conn, cursor):
+            cursor.execute('DELETE FROM embedding_cache')
+            return cursor.rowcount
+
+    def get_stats(self):
+        with self._pool.connection() as (conn, cursor):
+            cursor.execute('SELECT COUNT(*), COALESCE(SUM(length(vector)), 0) FROM embedding_cache')
+            entries, size_bytes = cursor.fetchone()
+        with self._lock:
+            stats = dict(self._stats)
+        lookups = stats['memory_hits'] + stats['disk_hits'] + stats['misses']
+        return {
+            **stats,
+            'hit_rate': round((lookups - stats['misses']) / lookups, 4) if lookups else 0,
+            'entries': entries,
+            'size_bytes': size_bytes,
+            'memory': self._memory.get_stats()
+        }
+
+
+# Global cache used by RAG query and ingestion embeddings
+embedding_cache = EmbeddingCache()
@@ -0,0 +1,119 @@
+"""
+Shared Google GenAI clients, one per API key
+
+Creating a genai.Client per call throws away its HTTP connection pool (and the
+TLS sessions in it), so every request pays for a fresh handshake. The registry
+keeps one client per API key and hands it to every caller using that key.
+
+Keys are indexed by their SHA-256 digest, so the registry itself never holds
+them in clear. The number of clients is bounded (least recently used clients
+are dropped first), and clients left unused for `idle_ttl_seconds` are dropped
+too. Evicted clients are never closed, since a caller that fetched one may
+still be mid-request with it; their connections are released when they are
+garbage collected. Only close_all() (at exit) closes clients.
+"""
+import atexit
+import hashlib
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+from google import genai
+
+logger = logging.getLogger(__name__)
+
+
+class GenAIClientRegistry:
+    """Bounded, thread-safe cache of genai.Client instances keyed by API key hash"""
+
+    def __init__(self, max_clients=32, idle_ttl_seconds=30 * 60):
+        self.max_clients = max_clients
+        self.idle_ttl_seconds = idle_ttl_seconds
+        # key digest -> [client, last_used (monotonic)]
+        self._clients = OrderedDict()
+        self._lock = threading.Lock()
+
+        self._constructions = 0
+        self._reuses = 0
+        self._evictions = 0
+
+        atexit.register(self.close_all)
+
+    @staticmethod
+    def _key_digest(api_key):
+        return hashlib.sha256(api_key.encode()).hexdigest()
+
+    @staticmethod
+    def _close(client):
+        try:
+            client.close()
+        except Exception as e:
+            logger.debug(f"Error closing GenAI client: {e}")
+
+    def _evict_idle(self, now):
+        idle = [digest for digest, (_, last_used) in self._clients.items()
+                if now - last_used > self.idle_ttl_seconds]
+        for digest in idle:
+            # Not closed, like LRU eviction: last_used is when the client was
+            # handed out, and the request using it may still be running
+            del self._clients[digest]
+            self._evictions += 1
+
+    def get(self, api_key):
+        """
+        Get the shared client for an API key, constructing it on first use.
+
+        Args:
+            api_key: Google API key
+
+        Returns:
+            genai.Client for the key
+        """
+        digest = self._key_digest(api_key)
+        now = time.monotonic()
+
+        with self._lock:
+            self._evict_idle(now)
+
+            entry = self._clients.get(digest)
+            if entry is not None:
+                entry[1] = now
+                self._clients.move_to_end(digest)
+                self._reuses += 1
+                return entry[0]
+
+            client = genai.Client(api_key=api_key)
+            self._constructions += 1
+            self._clients[digest] = [client, now]
+
+            while len(self._clients) > self.max_clients:
+                # Not closed: another thread may still be mid-request with it,
+                # its connections are released when it is garbage collected
+                self._clients.popitem(last=False)
+                self._evictions += 1
+
+            return client
+
+    def close_all(self):
+        """Close and forget every cached client"""
+        with self._lock:
+            clients = [client for client, _ in self._clients.values()]
+            self._clients.clear()
+        for client in clients:
+            self._close(client)
+
+    def get_stats(self):
+        with self._lock:
+            return {
+                'clients': len(self._clients),
+                'max_clients': self.max_clients,
+                'constructions': self._constructions,
+                'reuses': self._reuses,
+                'evictions': self._evictions,
+                'idle_ttl_seconds': self.idle_ttl_seconds
+            }
+
+
+# Global registry shared by the LLM, RAG and model-listing code paths
+genai_clients = GenAIClientRegistry()
@@ -0,0 +1,169 @@
+"""
+Hedged LLM requests with a deadline
+
+The primary request starts immediately. If it hasn't answered within the
+operation's hedge delay, a second request is sent (to the fallback model when
+one is configured, otherwise to the same model) and whichever succeeds first
+wins; the other is cancelled. The whole call fails with LLMDeadlineExceeded
+once the operation's deadline passes.
+
+Streams aren't hedged (the client has already seen the primary's text), but
+stream() holds them to the same deadline: the provider's blocking iterator is
+pulled on a daemon thread, so a stalled stream can't keep the caller waiting.
+
+Hedging trades extra requests for tail latency, so the counters track how
+often hedges fire, who wins and roughly how many prompt tokens were spent on
+the extra requests.
+"""
+import asyncio
+import logging
+import queue
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class LLMDeadlineExceeded(Exception):
+    """No request answered before the operation's deadline"""
+
+
+class Hedger:
+    """Runs primary/hedge request races and keeps per-operation counters"""
+
+    def __init__(self):
+        self._stats = {}
+        self._lock = threading.Lock()
+
+    def _count(self, operation_type, **increments):
+        with self._lock:
+            stats = self._stats.setdefault(operation_type, {
+                'calls': 0, 'hedged': 0, 'primary_wins': 0, 'hedge_wins': 0,
+                'deadline_exceeded': 0, 'extra_requests': 0, 'extra_prompt_tokens_estimate': 0
+            })
+            for key, value in increments.items():
+                stats[key] += value
+
+    async def run(self, attempt, operation_type, primary_model, fallback_model, hedge_delay, deadline,
+                  prompt_tokens_estimate=0):
+        """
+        Race a primary request against a delayed hedge.
+
+        Args:
+            attempt: Coroutine function taking a model name and returning its response
+            operation_type: Operation the call belongs to (for counters)
+            primary_model: Model for the primary request
+            fallback_model: Model for the hedge request (None uses the primary model)
+            hedge_delay: Seconds to wait for the primary before hedging (None disables hedging)
+            deadline: Seconds before giving up on both requests (None waits indefinitely)
+            prompt_tokens_estimate: Prompt size, counted as extra cost when a hedge fires
+
+        Returns:
+            (response, info) where info has 'hedged', 'winner' ('primary' or 'hedge') and 'model'
+        """
+        start = time.monotonic()
+        self._count(operation_type, calls=1)
+
+        def remaining():
+            return None if deadline is None else max(deadline - (time.monotonic() - start), 0)
+
+        tasks = {asyncio.create_task(attempt(primary_model)): ('primary', primary_model)}
+        try:
+            first_wait = hedge_delay if hedge_delay is not None else remaining()
+            if deadline is not None and first_wait is not None:
+                first_wait = min(first_wait, remaining())
+            done, _ = await asyncio.wait(tasks, timeout=first_wait)
+
+            if not done and hedge_delay is not None and (remaining() is None or remaining() > 0):
+                hedge_model = fallback_model or primary_model
+                logger.info(f"[HEDGE] {operation_type} primary exceeded {hedge_delay}s, hedging to {hedge_model}")
+                tasks[asyncio.create_task(attempt(hedge_model))] = ('hedge', hedge_model)
+                self._count(operation_type, hedged=1, extra_requests=1,
+                            extra_prompt_tokens_estimate=prompt_tokens_estimate)
+
+            pending = set(tasks)
+            error = None
+            while pending:
+                done, pending = await asyncio.wait(pending, timeout=remaining(), return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    break
+                for task in done:
+                    if task.exception() is None:
+                        role, model = tasks[task]
+                        self._count(operation_type, **{f'{role}_wins': 1})
+                        return task.result(), {'hedged': len(tasks) > 1, 'winner': role, 'model': model}
+                    error = task.exception()
+
+            if error is not None and not pending:
+                raise error
+            self._count(operation_type, deadline_exceeded=1)
+            raise LLMDeadlineExceeded(f"{operation_type} did not complete within its {deadline}s deadline")
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+    def stream(self, open_stream, operation_type, deadline):
+        """
+        Iterate a blocking stream, failing once the deadline passes.
+
+        Args:
+            open_stream: Function returning an iterator of chunks
+            operation_type: Operation the call belongs to (for counters)
+            deadline: Seconds allowed for the whole stream (None waits indefinitely)
+
+        Yields:
+            The stream's chunks; raises LLMDeadlineExceeded if the next one isn't in by the deadline
+        """
+        self._count(operation_type, calls=1)
+        if deadline is None:
+            yield from open_stream()
+            return
+
+        chunks = queue.Queue()
+        stop = threading.Event()
+
+        def pump():
+            try:
+                for chunk in open_stream():
+                    if stop.is_set():
+                        return
+                    chunks.put(('chunk', chunk))
+                chunks.put(('end', None))
+            except Exception as e:
+                chunks.put(('error', e))
+
+        threading.Thread(target=pump, name=f'llm-stream-{operation_type}', daemon=True).start()
+        end = time.monotonic() + deadline
+        try:
+            while True:
+                try:
+                    kind, value = chunks.get(timeout=max(end - time.monotonic(), 0))
+                except queue.Empty:
+                    self._count(operation_type, deadline_exceeded=1)
+                    raise LLMDeadlineExceeded(
+                        f"{operation_type} stream did not complete within its {deadline}s deadline"
+                    ) from None
+                if kind == 'end':
+                    return
+                if kind == 'error':
+                    raise value
+                yield value
+        finally:
+            # An abandoned provider stream stops at its next chunk
+            stop.set()
+
+    def get_stats(self):
+        with self._lock:
+            by_operation = {op: dict(stats) for op, stats in self._stats.items()}
+        totals = {}
+        for stats in by_operation.values():
+            for key, value in stats.items():
+                totals[key] = totals.get(key, 0) + value
+        for stats in [totals, *by_operation.values()]:
+            stats['hedge_rate'] = round(stats['hedged'] / stats['calls'], 4) if stats.get('calls') else 0.0
+        return {**totals, 'by_operation': by_operation}
+
+
+# Global hedger used by the LLM pipeline
+hedger = Hedger()
@@ -0,0 +1,198 @@
+"""
+In-process background job queue
+
+A fixed pool of worker threads takes jobs from a bounded queue, so the web
+worker that accepted a job returns right away with its id instead of waiting
+on the LLM. When the queue is full, submit() raises QueueFull rather than
+letting work pile up without limit.
+
+Job states follow the names the frontend's job poller (and the old Celery
+integration) uses: PENDING, STARTED, SUCCESS, FAILURE. Finished jobs are kept
+for result_ttl_seconds so clients can collect them, then forgotten.
+
+shutdown() (also run at exit) doesn't wait for the backlog: jobs still
+waiting are marked failed as cancelled, and only the jobs already running
+get a bounded time to finish.
+"""
+import atexit
+import logging
+import queue
+import threading
+import time
+import uuid
+
+logger = logging.getLogger(__name__)
+
+STATE_MESSAGES = {
+    'PENDING': 'Job is waiting to be processed',
+    'STARTED': 'Job is being processed',
+    'SUCCESS': 'Job completed successfully',
+    'FAILURE': 'Job failed',
+}
+
+
+class QueueFull(Exception):
+    """No room for another pending job"""
+
+
+class JobQueue:
+    """Worker threads fed from a bounded queue, with job status kept for polling"""
+
+    def __init__(self, max_workers=8, max_queue=100, result_ttl_seconds=600):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.result_ttl_seconds = result_ttl_seconds
+
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._jobs = {}
+        self._workers = []
+        self._lock = threading.Lock()
+        self._stopping = False
+        self._stats = {'submitted': 0, 'succeeded': 0, 'failed': 0, 'rejected': 0, 'expired': 0, 'cancelled': 0}
+
+        atexit.register(self.shutdown)
+
+    def _ensure_workers(self):
+        with self._lock:
+            self._workers = [worker for worker in self._workers if worker.is_alive()]
+            for _ in range(self.max_workers - len(self._workers)):
+                worker = threading.Thread(target=self._work, name='job-worker', daemon=True)
+                worker.start()
+                self._workers.append(worker)
+
+    def _work(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            job_id, fn, args, kwargs = item
+            with self._lock:
+                job = self._jobs.get(job_id)
+                if job is None:
+                    continue
+                job['state'] = 'STARTED'
+                job['started_at'] = time.time()
+
+            try:
+                result, error = fn(*args, **kwargs), None
+            except Exception as e:
+                logger.error(f"[JOBS] Job {job_id} ({job['type']}) failed: {e}")
+                result, error = None, str(e)
+
+            with self._lock:
+                job['finished_at'] = time.time()
+                if error is None:
+                    job['state'], job['result'] = 'SUCCESS', result
+                    self._stats['succeeded'] += 1
+                else:
+                    job['state'], job['error'] = 'FAILURE', error
+                    self._stats['failed'] += 1
+
+    def _expire(self, now):
+        expired = [job_id for job_id, job in self._jobs.items()
+                   if job['finished_at'] is not None and now - job['finished_at'] > self.result_ttl_seconds]
+        for job_id in expired:
+            del self._jobs[job_id]
+        self._stats['expired'] += len(expired)
+
+    def submit(self, job_type, fn, *args, **kwargs):
+        """
+        Queue fn(*args, **kwargs) to run on a worker thread.
+
+        Args:
+            job_type: Label reported with the job's status
+            fn: Callable to run; raising marks the job as failed
+
+        Returns:
+            The new job id
+
+        Raises:
+            QueueFull: if max_queue jobs are already waiting, or the queue is shutting down
+        """
+        if self._stopping:
+            raise QueueFull("Job queue is shutting down")
+        self._ensure_workers()
+        job_id = uuid.uuid4().hex
+        now = time.time()
+
+        with self._lock:
+            self._expire(now)
+            self._jobs[job_id] = {
+                'job_id': job_id,
+                'type': job_type,
+                'state': 'PENDING',
+                'submitted_at': now,
+                'started_at': None,
+                'finished_at': None
+            }
+            try:
+                self._queue.put_nowait((job_id, fn, args, kwargs))
+            except queue.Full:
+                del self._jobs[job_id]
+                self._stats['rejected'] += 1
+                raise QueueFull(f"Job queue is full ({self.max_queue} jobs waiting)")
+            self._stats['submitted'] += 1
+
+        logger.info(f"[JOBS] Queued {job_type} job {job_id}")
+        return job_id
+
+    def get(self, job_id):
+        """Status of a job (with its result or error once finished), or None if unknown or expired"""
+        with self._lock:
+            self._expire(time.time())
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+            return {**job, 'status': STATE_MESSAGES[job['state']]}
+
+    def shutdown(self):
+        """
+        Stop the workers without running the backlog.
+
+        Jobs still waiting are cancelled (marked FAILURE); jobs already
+        running get up to 5 seconds per worker to finish.
+        """
+        with self._lock:
+            self._stopping = True
+            workers, self._workers = self._workers, []
+            now = time.time()
+            while True:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    continue
+                job = self._jobs.get(item[0])
+                if job is not None:
+                    job['state'], job['error'], job['finished_at'] = 'FAILURE', 'Cancelled at shutdown', now
+                    self._stats['cancelled'] += 1
+
+        for _ in workers:
+            try:
+                self._queue.put_nowait(None)
+            except queue.Full:
+                break
+        for worker in workers:
+            worker.join(timeout=5)
+
+        with self._lock:
+            self._stopping = False
+
+    def get_stats(self):
+        with self._lock:
+            states = {state: 0 for state in STATE_MESSAGES}
+            for job in self._jobs.values():
+                states[job['state']] += 1
+            return {
+                **self._stats,
+                'states': states,
+                'queue_depth': self._queue.qsize(),
+                'max_queue': self.max_queue,
+                'max_workers': self.max_workers,
+                'result_ttl_seconds': self.result_ttl_seconds
+            }
+
+
+# Global queue behind the job endpoints
+job_queue = JobQueue()
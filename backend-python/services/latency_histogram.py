@@ -0,0 +1,195 @@
+"""
+Streaming latency histograms
+
+Latencies are counted into fixed log-spaced buckets (each bucket is 5% wider
+than the previous one), so a histogram is a fixed-size list of counters no
+matter how many samples it holds and any percentile is accurate to within a
+bucket width. Histograms are kept per series (metric, operation_type, model)
+and per minute for the last hour; older minutes are rolled up into 15-minute
+histograms, which keeps a day of retention to ~156 slots instead of 1440.
+A windowed query merges the slots it covers (windows reaching past the last
+hour are rounded out to whole 15-minute slots), and slots older than the
+retention period are dropped.
+
+Rolled-up histograms are replaced rather than updated, and a query copies
+the slot references under the lock and merges outside it, so a long window
+never holds up record() on the request path.
+"""
+import math
+import threading
+import time
+
+DEFAULT_PERCENTILES = (50, 90, 99)
+
+
+class LatencyHistogram:
+    """Fixed log-bucket histogram of latencies in milliseconds"""
+
+    GROWTH = 1.05
+    MAX_MS = 10 * 60 * 1000
+    # Bucket 0 holds everything under 1ms; the last bucket absorbs overflow
+    BUCKETS = int(math.log(MAX_MS, GROWTH)) + 2
+
+    def __init__(self):
+        self.counts = [0] * self.BUCKETS
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    @classmethod
+    def _bucket(cls, value):
+        if value < 1:
+            return 0
+        return min(int(math.log(value, cls.GROWTH)) + 1, cls.BUCKETS - 1)
+
+    @classmethod
+    def _upper_bound(cls, bucket):
+        return cls.GROWTH ** bucket
+
+    def record(self, value):
+        value = max(float(value), 0.0)
+        self.counts[self._bucket(value)] += 1
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+
+    def merge(self, other):
+        for i, count in enumerate(other.counts):
+            if count:
+                self.counts[i] += count
+        self.count += other.count
+        self.total += other.total
+        self.max = max(self.max, other.max)
+
+    def percentile(self, q):
+        """Upper bound of the bucket holding the q-th percentile (capped at the observed max)"""
+        if not self.count:
+            return None
+        rank = max(math.ceil(self.count * q / 100), 1)
+        seen = 0
+        for bucket, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                return min(self._upper_bound(bucket), self.max)
+        return self.max
+
+    def summary(self, percentiles=DEFAULT_PERCENTILES):
+        result = {'count': self.count}
+        for q in percentiles:
+            value = self.percentile(q)
+            result[f'p{q}'] = round(value, 2) if value is not None else None
+        result['max'] = round(self.max, 2)
+        result['avg'] = round(self.total / self.count, 2) if self.count else None
+        return result
+
+
+class LatencyRecorder:
+    """Per-minute, then per-15-minute, latency histograms for (metric, operation_type, model) series"""
+
+    def __init__(self, retention_minutes=24 * 60, fine_minutes=60, coarse_minutes=15):
+        """
+        Args:
+            retention_minutes: How far back samples are kept
+            fine_minutes: How long per-minute histograms are kept before being rolled up
+            coarse_minutes: Width of the rolled-up histograms
+        """
+        self.retention_minutes = retention_minutes
+        self.fine_minutes = min(fine_minutes, retention_minutes)
+        self.coarse_minutes = coarse_minutes
+        self._slots = {}
+        self._coarse = {}
+        self._lock = threading.Lock()
+
+    def _prune(self, current_minute):
+        fine_oldest = current_minute - self.fine_minutes + 1
+        oldest = current_minute - self.retention_minutes + 1
+        for minute in [m for m in self._slots if m < fine_oldest]:
+            slot = self._slots.pop(minute)
+            if minute < oldest:
+                continue
+            index = minute // self.coarse_minutes
+            # New histograms and dict, so snapshots holding the old ones aren't affected
+            coarse = dict(self._coarse.get(index, {}))
+            for key, histogram in slot.items():
+                rolled = LatencyHistogram()
+                if key in coarse:
+                    rolled.merge(coarse[key])
+                rolled.merge(histogram)
+                coarse[key] = rolled
+            self._coarse[index] = coarse
+        for index in [i for i in self._coarse if (i + 1) * self.coarse_minutes <= oldest]:
+            del self._coarse[index]
+
+    def record(self, metric, operation_type, model, latency_ms, now=None):
+        """
+        Count one latency sample.
+
+        Args:
+            metric: What was timed ('llm', 'rag', 'total', ...)
+            operation_type: Operation the sample belongs to
+            model: Model the request used (None if not applicable)
+            latency_ms: Duration in milliseconds
+            now: Sample time in epoch seconds (defaults to the current time)
+        """
+        minute = int((time.time() if now is None else now) // 60)
+        key = (metric, operation_type, model)
+        with self._lock:
+            slot = self._slots.get(minute)
+            if slot is None:
+                slot = self._slots[minute] = {}
+                self._prune(minute)
+            histogram = slot.get(key)
+            if histogram is None:
+                histogram = slot[key] = LatencyHistogram()
+            histogram.record(latency_ms)
+
+    def snapshot(self, window_minutes=60, now=None):
+        """
+        Percentiles for every series seen within the window.
+
+        Returns:
+            List of dicts with metric, operation_type, model, count, p50/p90/p99, max and avg
+        """
+        window_minutes = max(1, min(int(window_minutes), self.retention_minutes))
+        current_minute = int((time.time() if now is None else now) // 60)
+        oldest = current_minute - window_minutes + 1
+        live_minute = int(time.time() // 60) - 1
+
+        histograms = []
+        with self._lock:
+            for minute, slot in self._slots.items():
+                if minute < oldest:
+                    continue
+                if minute >= live_minute:
+                    # Still being recorded into; merge a copy
+                    histograms.extend((key, _copy(histogram)) for key, histogram in slot.items())
+                else:
+                    histograms.extend(slot.items())
+            for index, slot in self._coarse.items():
+                if window_minutes > self.fine_minutes and (index + 1) * self.coarse_minutes > oldest:
+                    histograms.extend(slot.items())
+
+        merged = {}
+        for key, histogram in histograms:
+            merged.setdefault(key, LatencyHistogram()).merge(histogram)
+
+        series = []
+        for (metric, operation_type, model), histogram in sorted(merged.items(), key=lambda item: tuple(str(k) for k in item[0])):
+            series.append({
+                'metric': metric,
+                'operation_type': operation_type,
+                'model': model,
+                **histogram.summary()
+            })
+        return series
+
+    def clear(self):
+        with self._lock:
+            self._slots.clear()
+            self._coarse.clear()
+
+
+def _copy(histogram):
+    copy = LatencyHistogram()
+    copy.merge(histogram)
+    return copy
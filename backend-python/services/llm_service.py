@@ -1,13 +1,24 @@
 """
-Synchronous LLM service
+LLM service: async pipeline with blocking and streaming entry points
 """
+import asyncio
+import itertools
+import threading
 import time
 import logging
-from typing import Optional, Callable, Dict, Any
-from google import genai
+from contextlib import contextmanager
+from typing import Optional, Callable, Dict, Any, Iterator, List, Tuple
 from services import logger as observability_logger, cache
 from services.rag_service import rag_service
 from services.config_service import config
+from services.single_flight import SingleFlight
+from services.genai_clients import genai_clients
+from services.async_runtime import async_runtime
+from services.rate_limiter import rate_limiter
+from services.hedging import hedger
+from services.providers import get_provider
+from services.token_budget import assemble_prompt, estimate_tokens
+from services.embedding_cache import embedding_cache
 from prompts.loader import PromptLoader
 
 logger = logging.getLogger(__name__)
@@ -15,6 +26,9 @@ logger = logging.getLogger(__name__)
 # Initialize prompt loader
 prompts = PromptLoader()
 
+# Identical concurrent cache misses share one LLM call
+llm_flights = SingleFlight()
+
 
 def _strip_markdown_code_blocks(text: str) -> str:
     """
@@ -34,7 +48,331 @@ def _strip_markdown_code_blocks(text: str) -> str:
     return text
 
 
-def _execute_llm_task(
+class _MarkdownStripper:
+    """
+    Incremental _strip_markdown_code_blocks for streamed text.
+
+    Feeding chunks and joining the outputs gives the same text as calling
+    _strip_markdown_code_blocks on the whole response. Only a few characters
+    are held back at a time: the opening fence until it is recognised, a
+    possible partial closing fence, and trailing whitespace.
+    """
+
+    OPENING_FENCES = ('```python', '```')
+
+    def __init__(self):
+        self._buffer = ''
+        self._state = 'detect'  # detect -> fenced | plain -> done
+        self._started = False
+        self._held = ''
+
+    def _emit(self, text: str) -> str:
+        # Strip leading whitespace of the content and hold back trailing whitespace
+        if not self._started:
+            text = text.lstrip()
+            if not text:
+                return ''
+            self._started = True
+        text = self._held + text
+        stripped = text.rstrip()
+        self._held = text[len(stripped):]
+        return stripped
+
+    def _detect(self) -> str:
+        text = self._buffer.lstrip()
+        if not text or (len(text) < len(self.OPENING_FENCES[0]) and self.OPENING_FENCES[0].startswith(text)):
+            return ''  # could still become an opening fence
+        for fence in self.OPENING_FENCES:
+            if text.startswith(fence):
+                self._state = 'fenced'
+                self._buffer = text[len(fence):]
+                return self._fenced()
+        self._state = 'plain'
+        self._buffer = ''
+        return self._emit(text)
+
+    def _fenced(self) -> str:
+        end = self._buffer.find('```')
+        if end >= 0:
+            self._state = 'done'
+            text, self._buffer = self._buffer[:end], ''
+            return self._emit(text)
+        # Keep a possible partial closing fence for the next chunk
+        text, self._buffer = self._buffer[:-2], self._buffer[-2:]
+        return self._emit(text)
+
+    def feed(self, chunk: str) -> str:
+        if self._state == 'done':
+            return ''
+        if self._state == 'plain':
+            return self._emit(chunk)
+        self._buffer += chunk
+        return self._detect() if self._state == 'detect' else self._fenced()
+
+    def finish(self) -> str:
+        if self._state == 'detect':
+            return self._emit(_strip_markdown_code_blocks(self._buffer))
+        if self._state == 'fenced':
+            text, self._buffer = self._buffer, ''
+            return self._emit(text)
+        return ''
+
+
+class _PassThrough:
+    """Streams text unchanged (no post-processor)"""
+
+    def feed(self, chunk: str) -> str:
+        return chunk
+
+    def finish(self) -> str:
+        return ''
+
+
+class _Buffered:
+    """Applies a post-processor that can't run incrementally to the full text at the end"""
+
+    def __init__(self, post_processor: Callable[[str], str]):
+        self._post_processor = post_processor
+        self._parts = []
+
+    def feed(self, chunk: str) -> str:
+        self._parts.append(chunk)
+        return ''
+
+    def finish(self) -> str:
+        return self._post_processor(''.join(self._parts))
+
+
+def _incremental_processor(post_processor: Optional[Callable[[str], str]]):
+    if post_processor is None:
+        return _PassThrough()
+    if post_processor is _strip_markdown_code_blocks:
+        return _MarkdownStripper()
+    return _Buffered(post_processor)
+
+
+def _cached_result(
+    cached_response: Dict[str, Any],
+    response_key: str,
+    post_processor: Optional[Callable[[str], str]],
+    rag_chunks: list
+) -> Dict[str, Any]:
+    """Build the task result for a cache hit"""
+    processed_response = cached_response['response_text']
+    if post_processor:
+        processed_response = post_processor(processed_response)
+
+    return {
+        'success': True,
+        response_key: processed_response,
+        'from_cache': True,
+        'semantic_cache_hit': cached_response.get('semantic_cache_hit', False),
+        'pre_rag_cache_hit': cached_response.get('pre_rag_cache_hit', False),
+        'similarity_score': cached_response.get('similarity_score'),
+        'cached_prompt': cached_response.get('prompt'),
+        'current_prompt': cached_response.get('current_prompt'),
+        'metadata': cached_response.get('metadata', {}),
+        'rag_doc_count': len(rag_chunks),
+        'rag_chunks': rag_chunks
+    }
+
+
+def _record_total_latency(operation_type: str, model: str, request_start: float) -> None:
+    """Record end-to-end request latency (cache lookups, RAG and LLM call)"""
+    observability_logger.record_latency('total', operation_type, model, (time.time() - request_start) * 1000)
+
+
+@contextmanager
+def _stage(timings: Dict[str, float], name: str):
+    """Record how long a pipeline stage took, in ms"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[name] = round((time.perf_counter() - start) * 1000, 2)
+
+
+def _probe_pre_rag(base_prompt: str, operation_type: str, current_model: str,
+                   use_cache: bool, model_aware_cache: bool) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+    """Look up the cache by the un-augmented prompt; returns (cached_response, rag_version)"""
+    rag_version = rag_service.index_version()
+    cached_response = cache.get_pre_rag(
+        base_prompt,
+        operation_type,
+        rag_version,
+        current_model,
+        use_cache,
+        model_aware_cache
+    )
+    return cached_response, rag_version
+
+
+async def _prepare_llm_task_async(
+    prompt: str,
+    operation_type: str,
+    current_model: str,
+    api_key: str,
+    response_key: str,
+    cache_metadata: Dict[str, Any],
+    post_processor: Optional[Callable[[str], str]],
+    use_cache: bool,
+    model_aware_cache: bool,
+    timings: Dict[str, float]
+) -> Tuple[Optional[Dict[str, Any]], Optional[Dict[str, Any]]]:
+    """
+    Cache lookups and RAG augmentation shared by the blocking and streaming paths.
+
+    With RAG enabled, the cache probe by the un-augmented prompt and the
+    retrieval (query embedding + vector query) start together; a probe hit
+    cancels the retrieval, so hits never wait for the embedding round trip.
+    Stage durations are written to timings.
+
+    Returns:
+        (cached_result, task) where cached_result is the finished result on a
+        cache hit (else None) and task holds the augmented prompt plus what is
+        needed to store the response afterwards
+    """
+    base_prompt = prompt
+    rag_version = None
+    rag_chunks = []
+    prompt_budget = None
+    rag_enabled = rag_service.is_enabled()
+
+    retrieval = None
+    if rag_enabled:
+        logger.info("[LLM] RAG enabled, retrieving documents...")
+        retrieval = asyncio.create_task(rag_service.retrieve_async(query=prompt, api_key=api_key, timings=timings))
+        retrieval_start = time.perf_counter()
+
+    try:
+        # Before waiting on retrieval, check the cache by the un-augmented prompt.
+        # The key includes the RAG index version so document changes force a miss.
+        if rag_enabled and use_cache:
+            with _stage(timings, 'cache_probe'):
+                cached_response, rag_version = await asyncio.to_thread(
+                    _probe_pre_rag, base_prompt, operation_type, current_model, use_cache, model_aware_cache
+                )
+            if cached_response:
+                logger.info("[LLM] Pre-RAG cache hit, cancelling retrieval")
+                retrieval.cancel()
+                result = _cached_result(cached_response, response_key, post_processor, cached_response['rag_chunks'])
+                # A flag, so it is reported beside stage_timings_ms (all durations) rather than in it
+                return {**result, 'retrieval_cancelled': True}, None
+
+        # Augment prompt with RAG context (if enabled)
+        if retrieval is not None:
+            retrieved_docs = await retrieval
+            timings['retrieval'] = round((time.perf_counter() - retrieval_start) * 1000, 2)
+            observability_logger.record_latency('rag', operation_type, current_model, timings['retrieval'])
+            rag_chunks = retrieved_docs
+            if retrieved_docs:
+                print(f"[RAG] Found {len(retrieved_docs)} matching documents:")
+                for i, doc in enumerate(retrieved_docs, 1):
+                    similarity = doc.get('similarity_score', 0)
+                    content_preview = doc.get('content', '')[:100]
+                    print(f"[RAG]   {i}. Similarity: {similarity:.4f} | Preview: {content_preview}...")
+                budget = config.get_prompt_token_budget(current_model)
+                prompt, rag_chunks, prompt_budget = assemble_prompt(prompt, retrieved_docs, budget)
+                logger.info(f"[RAG] Packed {prompt_budget['chunks_included']} chunks "
+                            f"({prompt_budget['chunks_skipped']} skipped), "
+                            f"~{prompt_budget['estimated_tokens']}/{budget} tokens")
+            else:
+                print("[RAG] No matching documents found in RAG system")
+        else:
+            print("[RAG] RAG is disabled, skipping document retrieval")
+    finally:
+        if retrieval is not None and not retrieval.done():
+            retrieval.cancel()
+
+    # Check cache
+    logger.info("[LLM] Checking cache...")
+    with _stage(timings, 'cache_lookup'):
+        cached_response = await asyncio.to_thread(
+            cache.get,
+            prompt,
+            operation_type,
+            current_model,
+            use_cache,
+            model_aware_cache,
+            metadata=cache_metadata if cache_metadata != {'model': current_model} else None
+        )
+    logger.info(f"[LLM] Cache check complete. Hit: {bool(cached_response)}")
+
+    if cached_response:
+        if not cached_response.get('semantic_cache_hit'):
+            await asyncio.to_thread(cache.set_pre_rag, base_prompt, operation_type, rag_version, prompt,
+                                    rag_chunks, current_model, use_cache, model_aware_cache)
+        return _cached_result(cached_response, response_key, post_processor, rag_chunks), None
+
+    return None, {
+        'prompt': prompt,
+        'base_prompt': base_prompt,
+        'rag_version': rag_version,
+        'rag_chunks': rag_chunks,
+        'prompt_budget': prompt_budget
+    }
+
+
+def _record_llm_response(
+    task: Dict[str, Any],
+    operation_type: str,
+    current_model: str,
+    response_text: str,
+    usage_metadata: Any,
+    latency_ms: float,
+    cache_metadata: Dict[str, Any],
+    use_cache: bool,
+    model_aware_cache: bool,
+    log_metadata: Optional[Dict[str, Any]] = None
+) -> Tuple[int, int]:
+    """
+    Log a completed LLM call and store its response in the cache.
+
+    log_metadata, if given, replaces cache_metadata in the metrics log (for
+    details that shouldn't become part of the cached entry).
+
+    Returns:
+        (tokens_sent, tokens_received)
+    """
+    prompt = task['prompt']
+    # Either count may be missing (None) from the API's usage metadata; estimate just that one
+    tokens_sent = getattr(usage_metadata, 'prompt_token_count', None)
+    if tokens_sent is None:
+        tokens_sent = estimate_tokens(prompt)
+    tokens_received = getattr(usage_metadata, 'candidates_token_count', None)
+    if tokens_received is None:
+        tokens_received = estimate_tokens(response_text)
+
+    # Log metrics
+    observability_logger.log_llm_call(
+        operation_type=operation_type,
+        prompt=prompt,
+        response_text=response_text,
+        tokens_sent=tokens_sent,
+        tokens_received=tokens_received,
+        latency_ms=latency_ms,
+        metadata=log_metadata or cache_metadata
+    )
+
+    # Save to cache
+    cache.set(
+        prompt,
+        operation_type,
+        response_text,
+        metadata=cache_metadata,
+        model=current_model,
+        use_cache=use_cache,
+        model_aware_cache=model_aware_cache,
+        latency_ms=latency_ms,
+        tokens=tokens_sent + tokens_received
+    )
+    cache.set_pre_rag(task['base_prompt'], operation_type, task['rag_version'], prompt, task['rag_chunks'],
+                      current_model, use_cache, model_aware_cache)
+
+    return tokens_sent, tokens_received
+
+
+async def _execute_llm_task_async(
     prompt: str,
     operation_type: str,
     current_model: str,
@@ -49,13 +387,18 @@ def _execute_llm_task(
     Generic LLM task execution with RAG, caching, logging, and error handling.
 
     This function consolidates the common pattern used across all LLM tasks:
-    1. Augment prompt with RAG context
-    2. Check cache
-    3. Make API call if not cached
-    4. Post-process response (optional)
-    5. Log metrics
-    6. Save to cache
-    7. Handle errors
+    1. Check cache by the pre-RAG prompt (RAG enabled only) while retrieval
+       runs; a hit cancels the retrieval
+    2. Augment prompt with RAG context
+    3. Check cache
+    4. Make API call if not cached
+    5. Post-process response (optional)
+    6. Log metrics
+    7. Save to cache
+    8. Handle errors
+
+    The LLM call uses the async GenAI client; cache, RAG and SQLite work runs
+    in the event loop's executor, so the loop can hold many requests in flight.
 
     Args:
         prompt: The prompt to send to the LLM
@@ -69,7 +412,9 @@ def _execute_llm_task(
         model_aware_cache: Whether to use model-aware caching
 
     Returns:
-        Dict with success status, response data, and metadata
+        Dict with success status, response data, and metadata, including
+        per-stage durations under 'stage_timings_ms' and, when a pre-RAG
+        cache hit cancelled the retrieval, 'retrieval_cancelled': True
     """
     if not api_key:
         return {
@@ -77,146 +422,331 @@ def _execute_llm_task(
             'error': 'No Google API key provided'
         }
 
+    request_start = time.time()
     try:
-        # Create client with provided API key
-        client = genai.Client(api_key=api_key)
-        logger.info(f"[LLM] Starting {operation_type} with model {current_model}")
+        provider = get_provider()
+        logger.info(f"[LLM] Starting {operation_type} with model {current_model} ({provider.name})")
 
         # Prepare cache metadata
         if cache_metadata is None:
             cache_metadata = {}
         cache_metadata['model'] = current_model
 
-        # Augment prompt with RAG context (if enabled)
-        logger.info("[LLM] Checking RAG service...")
-        rag_doc_count = 0
-        rag_chunks = []
-        if rag_service.is_enabled():
-            logger.info("[LLM] RAG enabled, retrieving documents...")
-            retrieved_docs = rag_service.retrieve(query=prompt, api_key=api_key)
-            rag_doc_count = len(retrieved_docs)
-            rag_chunks = retrieved_docs
-            if retrieved_docs:
-                print(f"[RAG] Found {len(retrieved_docs)} matching documents:")
-                for i, doc in enumerate(retrieved_docs, 1):
-                    similarity = doc.get('similarity_score', 0)
-                    content_preview = doc.get('content', '')[:100]
-                    print(f"[RAG]   {i}. Similarity: {similarity:.4f} | Preview: {content_preview}...")
-                context = rag_service.format_context(retrieved_docs)
-                prompt = f"{prompt}\n\n{context}"
-            else:
-                print("[RAG] No matching documents found in RAG system")
-        else:
-            print("[RAG] RAG is disabled, skipping document retrieval")
-
-        # Check cache
-        logger.info("[LLM] Checking cache...")
-        cached_response = cache.get(
-            prompt,
-            operation_type,
-            current_model,
-            use_cache,
-            model_aware_cache,
-            metadata=cache_metadata if cache_metadata != {'model': current_model} else None
+        timings = {}
+        cached_result, task = await _prepare_llm_task_async(
+            prompt, operation_type, current_model, api_key, response_key,
+            cache_metadata, post_processor, use_cache, model_aware_cache, timings
         )
-        logger.info(f"[LLM] Cache check complete. Hit: {bool(cached_response)}")
+        if cached_result:
+            _record_total_latency(operation_type, current_model, request_start)
+            timings['total'] = round((time.time() - request_start) * 1000, 2)
+            return {**cached_result, 'stage_timings_ms': timings}
+        prompt = task['prompt']
+
+        async def generate(model):
+            return await rate_limiter.call_async(
+                lambda: provider.generate_async(api_key, model, prompt),
+                api_key, model
+            )
+
+        async def call_llm():
+            # Make LLM call, hedged per the operation's SLO
+            logger.info(f"[LLM] Making API call to {current_model}...")
+            slo = config.get_llm_slo(operation_type)
+            start_time = time.time()
+            response, hedge = await hedger.run(
+                generate,
+                operation_type,
+                current_model,
+                config.get_hedge_fallback_model(),
+                slo['hedge_delay_seconds'],
+                slo['deadline_seconds'],
+                prompt_tokens_estimate=estimate_tokens(prompt)
+            )
+            latency_ms = (time.time() - start_time) * 1000
+            logger.info(f"[LLM] API call complete in {latency_ms:.2f}ms (winner: {hedge['winner']} {hedge['model']})")
 
-        if cached_response:
-            processed_response = cached_response['response_text']
+            # A fallback model's answer is cached under that model
+            answered_model = hedge['model']
+            response_metadata = cache_metadata
+            if answered_model != current_model:
+                response_metadata = {**cache_metadata, 'model': answered_model}
+
+            response_text = response.text
+
+            # Post-process response if needed
+            processed_response = response_text
             if post_processor:
-                processed_response = post_processor(processed_response)
+                processed_response = post_processor(response_text)
+
+            tokens_sent, tokens_received = await asyncio.to_thread(
+                _record_llm_response,
+                task, operation_type, answered_model, response_text,
+                getattr(response, 'usage_metadata', None), latency_ms,
+                response_metadata, use_cache, model_aware_cache,
+                {**response_metadata, 'hedge': hedge} if hedge['hedged'] else None
+            )
 
             return {
                 'success': True,
                 response_key: processed_response,
-                'from_cache': True,
-                'semantic_cache_hit': cached_response.get('semantic_cache_hit', False),
-                'similarity_score': cached_response.get('similarity_score'),
-                'cached_prompt': cached_response.get('prompt'),
-                'current_prompt': cached_response.get('current_prompt'),
-                'metadata': cached_response.get('metadata', {}),
-                'rag_doc_count': rag_doc_count,
-                'rag_chunks': rag_chunks
+                'from_cache': False,
+                'latency_ms': latency_ms,
+                'model': answered_model,
+                'hedge': hedge,
+                'rag_doc_count': len(task['rag_chunks']),
+                'rag_chunks': task['rag_chunks'],
+                'prompt_budget': task['prompt_budget'],
+                'tokens_sent': tokens_sent,
+                'tokens_received': tokens_received
             }
 
-        # Make LLM call
-        logger.info(f"[LLM] Making API call to {current_model}...")
-        start_time = time.time()
-        response = client.models.generate_content(
-            model=current_model,
-            contents=prompt
-        )
-        latency_ms = (time.time() - start_time) * 1000
-        logger.info(f"[LLM] API call complete in {latency_ms:.2f}ms")
-
-        response_text = response.text
-
-        tokens_sent = len(prompt.split())
-        tokens_received = len(response_text.split())
-        if hasattr(response, 'usage_metadata'):
-            tokens_sent = response.usage_metadata.prompt_token_count
-            tokens_received = response.usage_metadata.candidates_token_count
+        with _stage(timings, 'llm'):
+            if not use_cache:
+                result = await call_llm()
+            else:
+                # Concurrent identical misses (same cache key) wait on one in-flight call
+                flight_key = cache._hash_prompt(prompt, operation_type, current_model, model_aware_cache)
+                result, shared = await llm_flights.do_async(flight_key, call_llm, timeout=config.get_single_flight_timeout())
+                if shared:
+                    logger.info(f"[LLM] Coalesced with in-flight {operation_type} call")
+                    result = {**result, 'coalesced': True}
 
-        # Post-process response if needed
-        processed_response = response_text
-        if post_processor:
-            processed_response = post_processor(response_text)
+        _record_total_latency(operation_type, current_model, request_start)
+        timings['total'] = round((time.time() - request_start) * 1000, 2)
+        return {**result, 'stage_timings_ms': timings}
 
-        # Log metrics
+    except Exception as e:
+        # Log error
         observability_logger.log_llm_call(
             operation_type=operation_type,
             prompt=prompt,
-            response_text=response_text,
-            tokens_sent=tokens_sent,
-            tokens_received=tokens_received,
-            latency_ms=latency_ms,
+            response_text='',
+            tokens_sent=estimate_tokens(prompt),
+            tokens_received=0,
+            latency_ms=0,
+            error=str(e),
             metadata=cache_metadata
         )
 
-        # Save to cache
-        cache.set(
-            prompt,
-            operation_type,
-            response_text,
-            metadata=cache_metadata,
-            model=current_model,
-            use_cache=use_cache,
-            model_aware_cache=model_aware_cache
+        return {
+            'success': False,
+            'error': str(e)
+        }
+
+
+def _execute_llm_task(
+    prompt: str,
+    operation_type: str,
+    current_model: str,
+    api_key: str,
+    response_key: str = 'response',
+    cache_metadata: Optional[Dict[str, Any]] = None,
+    post_processor: Optional[Callable[[str], str]] = None,
+    use_cache: bool = True,
+    model_aware_cache: bool = True
+) -> Dict[str, Any]:
+    """
+    Blocking wrapper around _execute_llm_task_async (runs on the shared event loop).
+
+    Args:
+        prompt: The prompt to send to the LLM
+        operation_type: Type of operation (for logging/caching)
+        current_model: Model to use for generation
+        api_key: Google API key for authentication
+        response_key: Key name for response in return dict (default: 'response')
+        cache_metadata: Optional metadata for cache lookup
+        post_processor: Optional function to process response text
+        use_cache: Whether to use caching
+        model_aware_cache: Whether to use model-aware caching
+
+    Returns:
+        The result dict from _execute_llm_task_async
+    """
+    return async_runtime.run(_execute_llm_task_async(
+        prompt, operation_type, current_model, api_key,
+        response_key=response_key,
+        cache_metadata=cache_metadata,
+        post_processor=post_processor,
+        use_cache=use_cache,
+        model_aware_cache=model_aware_cache
+    ))
+
+
+def _stream_llm_task(
+    prompt: str,
+    operation_type: str,
+    current_model: str,
+    api_key: str,
+    response_key: str = 'response',
+    cache_metadata: Optional[Dict[str, Any]] = None,
+    post_processor: Optional[Callable[[str], str]] = None,
+    use_cache: bool = True,
+    model_aware_cache: bool = True
+) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """
+    Streaming variant of _execute_llm_task.
+
+    Yields (event, data) pairs:
+    - ('chunk', {'text': ...}) for each piece of (post-processed) response text
+    - ('done', result) once, with the same result dict _execute_llm_task returns
+      (minus the response text already streamed) plus ttft_ms for live calls
+    - ('error', {'success': False, 'error': ...}) if the task fails
+
+    Cache hits are streamed back as a single chunk. The assembled response is
+    logged and cached after the stream completes. Streams are not coalesced
+    with single-flight: every client gets its own generation. They aren't
+    hedged either, but the operation's SLO deadline applies to the whole
+    stream; past it the task fails with LLMDeadlineExceeded.
+    """
+    if not api_key:
+        yield 'error', {'success': False, 'error': 'No Google API key provided'}
+        return
+
+    request_start = time.time()
+    try:
+        provider = get_provider()
+        logger.info(f"[LLM] Starting streaming {operation_type} with model {current_model} ({provider.name})")
+
+        if cache_metadata is None:
+            cache_metadata = {}
+        cache_metadata['model'] = current_model
+
+        timings = {}
+        cached_result, task = async_runtime.run(_prepare_llm_task_async(
+            prompt, operation_type, current_model, api_key, response_key,
+            cache_metadata, post_processor, use_cache, model_aware_cache, timings
+        ))
+        if cached_result:
+            _record_total_latency(operation_type, current_model, request_start)
+            timings['total'] = round((time.time() - request_start) * 1000, 2)
+            yield 'chunk', {'text': cached_result.pop(response_key)}
+            yield 'done', {**cached_result, 'stage_timings_ms': timings}
+            return
+        prompt = task['prompt']
+
+        logger.info(f"[LLM] Streaming API call to {current_model}...")
+        processor = _incremental_processor(post_processor)
+        parts = []
+        usage_metadata = None
+        ttft_ms = None
+        start_time = time.time()
+        def open_stream():
+            # Throttling surfaces on the first chunk; retry only until text starts flowing
+            stream = iter(provider.generate_stream(api_key, current_model, prompt))
+            first = next(stream, None)
+            return itertools.chain([first] if first is not None else [], stream)
+
+        deadline = config.get_llm_slo(operation_type)['deadline_seconds']
+        stream = hedger.stream(lambda: rate_limiter.call(open_stream, api_key, current_model),
+                               operation_type, deadline)
+        for chunk in stream:
+            if getattr(chunk, 'usage_metadata', None) is not None:
+                usage_metadata = chunk.usage_metadata
+            text = chunk.text or ''
+            if not text:
+                continue
+            if ttft_ms is None:
+                ttft_ms = (time.time() - start_time) * 1000
+                observability_logger.record_latency('ttft', operation_type, current_model, ttft_ms)
+            parts.append(text)
+            processed = processor.feed(text)
+            if processed:
+                yield 'chunk', {'text': processed}
+
+        processed = processor.finish()
+        if processed:
+            yield 'chunk', {'text': processed}
+
+        latency_ms = (time.time() - start_time) * 1000
+        logger.info(f"[LLM] Stream complete in {latency_ms:.2f}ms (first token {ttft_ms or 0:.2f}ms)")
+
+        tokens_sent, tokens_received = _record_llm_response(
+            task, operation_type, current_model, ''.join(parts), usage_metadata, latency_ms,
+            cache_metadata, use_cache, model_aware_cache
         )
+        _record_total_latency(operation_type, current_model, request_start)
+        timings['llm'] = round(latency_ms, 2)
+        timings['ttft'] = round(ttft_ms, 2) if ttft_ms is not None else None
+        timings['total'] = round((time.time() - request_start) * 1000, 2)
 
-        return {
+        yield 'done', {
             'success': True,
-            response_key: processed_response,
             'from_cache': False,
             'latency_ms': latency_ms,
-            'rag_doc_count': rag_doc_count,
-            'rag_chunks': rag_chunks,
+            'ttft_ms': ttft_ms,
+            'rag_doc_count': len(task['rag_chunks']),
+            'rag_chunks': task['rag_chunks'],
+            'prompt_budget': task['prompt_budget'],
             'tokens_sent': tokens_sent,
-            'tokens_received': tokens_received
+            'tokens_received': tokens_received,
+            'stage_timings_ms': timings
         }
 
     except Exception as e:
-        # Log error
         observability_logger.log_llm_call(
             operation_type=operation_type,
             prompt=prompt,
             response_text='',
-            tokens_sent=len(prompt.split()),
+            tokens_sent=estimate_tokens(prompt),
             tokens_received=0,
             latency_ms=0,
             error=str(e),
             metadata=cache_metadata
         )
+        yield 'error', {'success': False, 'error': str(e)}
 
-        return {
-            'success': False,
-            'error': str(e)
-        }
 
+def _leetcode_task(problem_number: str, custom_prompt: Optional[str] = None) -> Dict[str, Any]:
+    """_execute_llm_task arguments for solving a LeetCode problem"""
+    # Use custom prompt if provided, otherwise load from file
+    if custom_prompt:
+        prompt = custom_prompt
+    else:
+        prompt = prompts.get('leetcode_solve', problem_number=problem_number)
 
-def process_leetcode(problem_number: str, api_key: str, custom_prompt: Optional[str] = None) -> Dict[str, Any]:
+    return {
+        'prompt': prompt,
+        'operation_type': 'leetcode_solve',
+        'current_model': config.get_current_model(),
+        'response_key': 'response',
+        'cache_metadata': {'problem_number': problem_number},
+        'post_processor': None,  # No markdown stripping for leetcode
+        'use_cache': config.is_cache_enabled(),
+        'model_aware_cache': config.is_model_aware_cache()
+    }
+
+
+def _test_cases_task(code: str) -> Dict[str, Any]:
+    """_execute_llm_task arguments for test case generation"""
+    return {
+        'prompt': prompts.get('test_case_generation', code=code),
+        'operation_type': 'test_case_generation',
+        'current_model': config.get_current_model(),
+        'response_key': 'test_cases',
+        'post_processor': _strip_markdown_code_blocks,
+        'use_cache': config.is_cache_enabled(),
+        'model_aware_cache': config.is_model_aware_cache()
+    }
+
+
+def _code_modification_task(prompt_text: str, code: str) -> Dict[str, Any]:
+    """_execute_llm_task arguments for code modification"""
+    return {
+        'prompt': prompts.get('code_modification', code=code, prompt=prompt_text),
+        'operation_type': 'code_modification',
+        'current_model': config.get_current_model(),
+        'response_key': 'code',
+        'post_processor': _strip_markdown_code_blocks,
+        'use_cache': config.is_cache_enabled(),
+        'model_aware_cache': config.is_model_aware_cache()
+    }
+
+
+async def process_leetcode_async(problem_number: str, api_key: str,
+                                 custom_prompt: Optional[str] = None) -> Dict[str, Any]:
     """
-    Process LeetCode problem synchronously.
+    Process LeetCode problem.
 
     Args:
         problem_number: The LeetCode problem number
@@ -234,31 +764,15 @@ def process_leetcode(problem_number: str, api_key: str, custom_prompt: Optional[
 
     logger.info(f"[TASK START] Processing LeetCode problem #{problem_number}")
 
-    # Use custom prompt if provided, otherwise load from file
-    if custom_prompt:
-        prompt = custom_prompt
-    else:
-        prompt = prompts.get('leetcode_solve', problem_number=problem_number)
-
-    logger.info(f"[TASK] Calling _execute_llm_task...")
-    result = _execute_llm_task(
-        prompt=prompt,
-        operation_type='leetcode_solve',
-        current_model=config.get_current_model(),
-        api_key=api_key,
-        response_key='response',
-        cache_metadata={'problem_number': problem_number},
-        post_processor=None,  # No markdown stripping for leetcode
-        use_cache=config.is_cache_enabled(),
-        model_aware_cache=config.is_model_aware_cache()
-    )
+    logger.info(f"[TASK] Calling _execute_llm_task_async...")
+    result = await _execute_llm_task_async(api_key=api_key, **_leetcode_task(problem_number, custom_prompt))
     logger.info(f"[TASK COMPLETE] Result success: {result.get('success')}")
     return result
 
 
-def process_test_cases(code: str, api_key: str) -> Dict[str, Any]:
+async def process_test_cases_async(code: str, api_key: str) -> Dict[str, Any]:
     """
-    Generate test cases for code synchronously.
+    Generate test cases for code.
 
     Args:
         code: The code to generate test cases for
@@ -273,23 +787,12 @@ def process_test_cases(code: str, api_key: str) -> Dict[str, Any]:
             'error': 'No Google API key provided'
         }
 
-    prompt = prompts.get('test_case_generation', code=code)
+    return await _execute_llm_task_async(api_key=api_key, **_test_cases_task(code))
 
-    return _execute_llm_task(
-        prompt=prompt,
-        operation_type='test_case_generation',
-        current_model=config.get_current_model(),
-        api_key=api_key,
-        response_key='test_cases',
-        post_processor=_strip_markdown_code_blocks,
-        use_cache=config.is_cache_enabled(),
-        model_aware_cache=config.is_model_aware_cache()
-    )
 
-
-def process_code_modification(prompt_text: str, code: str, api_key: str) -> Dict[str, Any]:
+async def process_code_modification_async(prompt_text: str, code: str, api_key: str) -> Dict[str, Any]:
     """
-    Modify code based on user prompt synchronously.
+    Modify code based on user prompt.
 
     Args:
         prompt_text: The modification instructions
@@ -305,15 +808,224 @@ def process_code_modification(prompt_text: str, code: str, api_key: str) -> Dict
             'error': 'No Google API key provided'
         }
 
-    full_prompt = prompts.get('code_modification', code=code, prompt=prompt_text)
-
-    return _execute_llm_task(
-        prompt=full_prompt,
-        operation_type='code_modification',
-        current_model=config.get_current_model(),
-        api_key=api_key,
-        response_key='code',
-        post_processor=_strip_markdown_code_blocks,
-        use_cache=config.is_cache_enabled(),
-        model_aware_cache=config.is_model_aware_cache()
-    )
+    return await _execute_llm_task_async(api_key=api_key, **_code_modification_task(prompt_text, code))
+
+
+def process_leetcode(problem_number: str, api_key: str, custom_prompt: Optional[str] = None) -> Dict[str, Any]:
+    """Process LeetCode problem synchronously (blocking wrapper around process_leetcode_async)"""
+    return async_runtime.run(process_leetcode_async(problem_number, api_key, custom_prompt))
+
+
+def process_test_cases(code: str, api_key: str) -> Dict[str, Any]:
+    """Generate test cases synchronously (blocking wrapper around process_test_cases_async)"""
+    return async_runtime.run(process_test_cases_async(code, api_key))
+
+
+def process_code_modification(prompt_text: str, code: str, api_key: str) -> Dict[str, Any]:
+    """Modify code synchronously (blocking wrapper around process_code_modification_async)"""
+    return async_runtime.run(process_code_modification_async(prompt_text, code, api_key))
+
+
+def stream_leetcode(problem_number: str, api_key: str,
+                    custom_prompt: Optional[str] = None) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """Streaming process_leetcode; yields (event, data) pairs (see _stream_llm_task)"""
+    return _stream_llm_task(api_key=api_key, **_leetcode_task(problem_number, custom_prompt))
+
+
+def stream_test_cases(code: str, api_key: str) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """Streaming process_test_cases; yields (event, data) pairs (see _stream_llm_task)"""
+    return _stream_llm_task(api_key=api_key, **_test_cases_task(code))
+
+
+def stream_code_modification(prompt_text: str, code: str, api_key: str) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """Streaming process_code_modification; yields (event, data) pairs (see _stream_llm_task)"""
+    return _stream_llm_task(api_key=api_key, **_code_modification_task(prompt_text, code))
+
+
+# Batch item type -> (task builder, processor, {item field: parameter name}, required fields)
+BATCH_ITEM_TYPES = {
+    'leetcode': (
+        _leetcode_task, process_leetcode_async,
+        {'problem_number': 'problem_number', 'custom_prompt': 'custom_prompt'}, ('problem_number',)
+    ),
+    'test-cases': (
+        _test_cases_task, process_test_cases_async,
+        {'code': 'code'}, ('code',)
+    ),
+    'code-modification': (
+        _code_modification_task, process_code_modification_async,
+        {'prompt': 'prompt_text', 'code': 'code'}, ('prompt', 'code')
+    ),
+}
+
+_batch_stats = {'batches': 0, 'items': 0, 'duplicates': 0, 'cache_hits': 0, 'executed': 0, 'failed': 0}
+_batch_stats_lock = threading.Lock()
+
+
+def _count_batch(**increments: int) -> None:
+    with _batch_stats_lock:
+        for key, value in increments.items():
+            _batch_stats[key] += value
+
+
+def _batch_item_key(item: Any) -> Tuple[str, Tuple[Tuple[str, Any], ...]]:
+    """Validate a batch item; returns (type, sorted keyword args for its task builder/processor)"""
+    if not isinstance(item, dict):
+        raise ValueError('Batch item must be an object')
+    item_type = item.get('type')
+    if item_type not in BATCH_ITEM_TYPES:
+        raise ValueError(f"Unknown batch item type '{item_type}', expected one of {list(BATCH_ITEM_TYPES)}")
+
+    _, _, fields, required = BATCH_ITEM_TYPES[item_type]
+    missing = [field for field in required if not item.get(field)]
+    if missing:
+        raise ValueError(f"Batch item of type '{item_type}' is missing {', '.join(missing)}")
+    kwargs = {param: (str(item[field]) if item.get(field) is not None else None) for field, param in fields.items()}
+    return item_type, tuple(sorted(kwargs.items()))
+
+
+async def _probe_batch_item(item_type: str, kwargs: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Cache-only lookup for a batch item (no RAG retrieval, no LLM call)"""
+    build_task, _, _, _ = BATCH_ITEM_TYPES[item_type]
+    task = build_task(**kwargs)
+    if not task['use_cache']:
+        return None
+
+    current_model = task['current_model']
+    if rag_service.is_enabled():
+        cached_response, _ = await asyncio.to_thread(
+            _probe_pre_rag, task['prompt'], task['operation_type'], current_model,
+            task['use_cache'], task['model_aware_cache']
+        )
+        rag_chunks = cached_response['rag_chunks'] if cached_response else []
+    else:
+        cache_metadata = {**task.get('cache_metadata', {}), 'model': current_model}
+        cached_response = await asyncio.to_thread(
+            cache.get,
+            task['prompt'],
+            task['operation_type'],
+            current_model,
+            task['use_cache'],
+            task['model_aware_cache'],
+            metadata=cache_metadata if cache_metadata != {'model': current_model} else None
+        )
+        rag_chunks = []
+
+    if not cached_response:
+        return None
+    return _cached_result(cached_response, task['response_key'], task['post_processor'], rag_chunks)
+
+
+async def process_batch_async(items: List[Any], api_key: str, concurrency: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Run a batch of job items with bounded fan-out.
+
+    Identical items are executed once. Every unique item is first looked up in
+    the cache; only the misses go through the full pipeline, at most
+    `concurrency` at a time.
+
+    Args:
+        items: Dicts with 'type' ('leetcode', 'test-cases' or 'code-modification')
+               plus that job's fields (as accepted by its /api/jobs endpoint)
+        api_key: Google API key for authentication
+        concurrency: Max concurrent LLM pipeline runs (capped by the configured batch concurrency)
+
+    Returns:
+        Dict with per-item results (in request order) and batch counters
+    """
+    if not api_key:
+        return {
+            'success': False,
+            'error': 'No Google API key provided'
+        }
+
+    start = time.time()
+    limit = config.get_batch_concurrency()
+    if concurrency:
+        limit = max(1, min(int(concurrency), limit))
+
+    # Deduplicate: unique (type, args) -> indices of the items asking for it
+    results: List[Optional[Dict[str, Any]]] = [None] * len(items)
+    unique: Dict[Tuple[str, Tuple[Tuple[str, Any], ...]], List[int]] = {}
+    for index, item in enumerate(items):
+        try:
+            unique.setdefault(_batch_item_key(item), []).append(index)
+        except ValueError as e:
+            results[index] = {'success': False, 'error': str(e)}
+
+    semaphore = asyncio.Semaphore(limit)
+    counts = {'cache_hits': 0, 'executed': 0}
+
+    async def run(key: Tuple[str, Tuple[Tuple[str, Any], ...]]) -> Dict[str, Any]:
+        item_type, kwargs = key[0], dict(key[1])
+        try:
+            cached = await _probe_batch_item(item_type, kwargs)
+        except Exception as e:
+            logger.warning(f"[BATCH] Cache probe failed for {item_type} item: {e}")
+            cached = None
+        if cached:
+            counts['cache_hits'] += 1
+            return cached
+
+        _, process, _, _ = BATCH_ITEM_TYPES[item_type]
+        async with semaphore:
+            counts['executed'] += 1
+            return await process(api_key=api_key, **kwargs)
+
+    keys = list(unique)
+    outcomes = await asyncio.gather(*(run(key) for key in keys), return_exceptions=True)
+
+    for key, outcome in zip(keys, outcomes):
+        if isinstance(outcome, BaseException):
+            outcome = {'success': False, 'error': str(outcome)}
+        first, *duplicates = unique[key]
+        results[first] = outcome
+        for index in duplicates:
+            results[index] = {**outcome, 'duplicate_of': first}
+
+    failed = sum(1 for result in results if not result.get('success'))
+    duplicates = sum(len(indices) - 1 for indices in unique.values())
+    _count_batch(batches=1, items=len(items), duplicates=duplicates, failed=failed, **counts)
+
+    return {
+        'success': True,
+        'results': [{'index': index, **result} for index, result in enumerate(results)],
+        'total': len(items),
+        'unique': len(unique),
+        'duplicates': duplicates,
+        'cache_hits': counts['cache_hits'],
+        'executed': counts['executed'],
+        'failed': failed,
+        'concurrency': limit,
+        'duration_ms': round((time.time() - start) * 1000, 2)
+    }
+
+
+def process_batch(items: List[Any], api_key: str, concurrency: Optional[int] = None) -> Dict[str, Any]:
+    """Run a batch synchronously (blocking wrapper around process_batch_async)"""
+    return async_runtime.run(process_batch_async(items, api_key, concurrency))
+
+
+def get_pipeline_stats() -> Dict[str, Any]:
+    """Counters for the LLM request pipeline (exposed on the admin API)"""
+    return {
+        'single_flight': {
+            **llm_flights.get_stats(),
+            'wait_timeout_seconds': config.get_single_flight_timeout()
+        },
+        'provider': get_provider().get_stats(),
+        'genai_clients': genai_clients.get_stats(),
+        'async_runtime': async_runtime.get_stats(),
+        'batch': {**_batch_stats, 'concurrency': config.get_batch_concurrency()},
+        'rate_limiter': rate_limiter.get_stats(),
+        'hedging': {
+            **hedger.get_stats(),
+            'fallback_model': config.get_hedge_fallback_model(),
+            'slos': config.get_llm_slos()
+        },
+        'prompt_token_budgets': config.get_prompt_token_budgets(),
+        'rag_ingest': rag_service.get_ingest_stats(),
+        'chroma': rag_service.store.get_stats(),
+        'chunking': rag_service.chunk_pool.get_stats(),
+        'embedding_cache': embedding_cache.get_stats()
+    }
@@ -0,0 +1,92 @@
+"""
+Bounded in-process LRU tier with per-entry expiry
+
+Used in front of the SQLite-backed PromptCache so repeated exact hits are
+served from memory without touching disk.
+"""
+import threading
+from collections import OrderedDict
+from datetime import datetime
+
+
+class MemoryTier:
+    """Thread-safe LRU map with an absolute expiry time per entry"""
+
+    def __init__(self, max_entries=512):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # key -> (value, expires_at)
+        self._lock = threading.Lock()
+
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._expirations = 0
+
+    def get(self, key):
+        """Return the cached value, or None on a miss or expired entry"""
+        with self._lock:
+            item = self._entries.get(key)
+            if item is None:
+                self._misses += 1
+                return None
+
+            value, expires_at = item
+            if expires_at is not None and expires_at <= datetime.utcnow():
+                del self._entries[key]
+                self._expirations += 1
+                self._misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return value
+
+    def set(self, key, value, expires_at=None):
+        """Insert or refresh an entry, evicting least recently used entries over capacity"""
+        if self.max_entries <= 0:
+            return
+
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._evictions += 1
+
+    def delete(self, key):
+        """Drop a single entry if present"""
+        with self._lock:
+            return self._entries.pop(key, None) is not None
+
+    def clear(self):
+        """Drop every entry and return how many were removed"""
+        with self._lock:
+            count = len(self._entries)
+            self._entries.clear()
+            return count
+
+    def purge_expired(self):
+        """Drop entries whose expiry time has passed"""
+        now = datetime.utcnow()
+        with self._lock:
+            expired = [
+                key for key, (_, expires_at) in self._entries.items()
+                if expires_at is not None and expires_at <= now
+            ]
+            for key in expired:
+                del self._entries[key]
+            self._expirations += len(expired)
+            return len(expired)
+
+    def get_stats(self):
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'hits': self._hits,
+                'misses': self._misses,
+                'hit_rate': round(self._hits / lookups, 4) if lookups else 0,
+                'evictions': self._evictions,
+                'expirations': self._expirations,
+            }
@@ -0,0 +1,171 @@
+"""
+Asynchronous batched writer for the metrics database
+
+Request threads hand rows to a bounded in-memory queue and return
+immediately. A background thread drains the queue every `flush_interval`
+seconds (sooner once `batch_size` rows are waiting) and writes them with one
+executemany per batch, so many rows share a single commit.
+
+When the queue is full the `overflow_policy` decides what happens:
+- 'block': wait up to `block_timeout` seconds for space, then drop the row
+- 'drop_newest': drop the incoming row
+- 'drop_oldest': discard the oldest queued row to make room
+"""
+import atexit
+import logging
+import queue
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+OVERFLOW_POLICIES = ('block', 'drop_newest', 'drop_oldest')
+
+
+class AsyncBatchWriter:
+    """Bounded queue + background group-commit writer for a single INSERT statement"""
+
+    def __init__(self, pool, insert_sql, max_queue=10000, batch_size=200, flush_interval=0.5,
+                 overflow_policy='block', block_timeout=0.1):
+        if overflow_policy not in OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown overflow policy '{overflow_policy}', expected one of {OVERFLOW_POLICIES}")
+
+        self._pool = pool
+        self._insert_sql = insert_sql
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.overflow_policy = overflow_policy
+        self.block_timeout = block_timeout
+
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._write_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self._start_lock = threading.Lock()
+
+        self._queued = 0
+        self._written = 0
+        self._dropped = 0
+        self._failed = 0
+        self._batches = 0
+        self._last_batch_ms = 0.0
+
+        atexit.register(self.close)
+
+    def _ensure_started(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._start_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='metrics-writer', daemon=True)
+                self._thread.start()
+
+    def submit(self, row):
+        """Queue a row for writing; returns False if it was dropped"""
+        if self._stop.is_set():
+            # Shutting down - write through so nothing is lost
+            self._write_batch([row])
+            return True
+
+        self._ensure_started()
+
+        accepted = self._enqueue(row)
+        with self._stats_lock:
+            if accepted:
+                self._queued += 1
+            else:
+                self._dropped += 1
+
+        if self._queue.qsize() >= self.batch_size:
+            self._wake.set()
+        return accepted
+
+    def _enqueue(self, row):
+        if self.overflow_policy == 'block':
+            try:
+                self._queue.put(row, timeout=self.block_timeout)
+                return True
+            except queue.Full:
+                return False
+
+        try:
+            self._queue.put_nowait(row)
+            return True
+        except queue.Full:
+            if self.overflow_policy == 'drop_newest':
+                return False
+
+        # drop_oldest: make room by discarding the head of the queue
+        try:
+            self._queue.get_nowait()
+            with self._stats_lock:
+                self._dropped += 1
+        except queue.Empty:
+            pass
+        try:
+            self._queue.put_nowait(row)
+            return True
+        except queue.Full:
+            return False
+
+    def _write_batch(self, rows):
+        start = time.perf_counter()
+        try:
+            with self._pool.connection() as (conn, cursor):
+                cursor.executemany(self._insert_sql, rows)
+        except Exception as e:
+            logger.error(f"Failed to write {len(rows)} metric rows: {e}")
+            with self._stats_lock:
+                self._failed += len(rows)
+            return
+
+        with self._stats_lock:
+            self._written += len(rows)
+            self._batches += 1
+            self._last_batch_ms = (time.perf_counter() - start) * 1000
+
+    def flush(self):
+        """Write everything queued so far; returns the number of rows written"""
+        written = 0
+        with self._write_lock:
+            while True:
+                rows = []
+                while len(rows) < self.batch_size:
+                    try:
+                        rows.append(self._queue.get_nowait())
+                    except queue.Empty:
+                        break
+                if not rows:
+                    return written
+                self._write_batch(rows)
+                written += len(rows)
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            self.flush()
+
+    def close(self):
+        """Stop the background thread and flush what is still queued"""
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout=5)
+        self.flush()
+
+    def get_stats(self):
+        with self._stats_lock:
+            return {
+                'queued': self._queued,
+                'written': self._written,
+                'dropped': self._dropped,
+                'failed': self._failed,
+                'batches': self._batches,
+                'queue_depth': self._queue.qsize(),
+                'queue_capacity': self._queue.maxsize,
+                'overflow_policy': self.overflow_policy,
+                'last_batch_ms': round(self._last_batch_ms, 2)
+            }
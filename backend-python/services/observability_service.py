@@ -3,16 +3,33 @@ import json
 import time
 from datetime import datetime
 from pathlib import Path
-from utils import sqlite_connection, parse_metadata_json
+from utils import parse_metadata_json
+from services.sqlite_pool import get_pool
+from services.metrics_writer import AsyncBatchWriter
+from services.latency_histogram import LatencyRecorder
+
+INSERT_LLM_CALL_SQL = '''
+    INSERT INTO llm_calls (
+        timestamp, operation_type, prompt, prompt_preview, prompt_length,
+        response_text, response_preview, response_length,
+        tokens_sent, tokens_received, total_tokens,
+        latency_ms, success, error, metadata
+    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+'''
 
 class ObservabilityLogger:
-    def __init__(self, db_path='data/llm_metrics.db'):
+    def __init__(self, db_path='data/llm_metrics.db', overflow_policy='block'):
         self.db_path = db_path
+        self._pool = get_pool(db_path)
         self._init_database()
+        # Rows are written off the request thread in group-committed batches
+        self._writer = AsyncBatchWriter(self._pool, INSERT_LLM_CALL_SQL, overflow_policy=overflow_policy)
+        # In-memory latency percentiles (llm, rag and total request time)
+        self.latency = LatencyRecorder()
 
     def _init_database(self):
         """Initialize the SQLite database and create tables if they don't exist."""
-        with sqlite_connection(self.db_path) as (conn, cursor):
+        with self._pool.connection() as (conn, cursor):
             cursor.execute('''
                 CREATE TABLE IF NOT EXISTS llm_calls (
                     id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -51,6 +68,9 @@ class ObservabilityLogger:
         """
         Log an LLM API call with all relevant metrics.
 
+        The row is queued for the background writer; reads through this
+        logger flush the queue first, so they always see it.
+
         Args:
             operation_type: Type of operation (e.g., 'leetcode_solve', 'test_case_gen', 'code_modify')
             prompt: The prompt sent to the LLM
@@ -66,20 +86,16 @@ class ObservabilityLogger:
         response_preview = response_text[:200] + '...' if len(response_text) > 200 else response_text
         metadata_json = json.dumps(metadata) if metadata else None
 
-        with sqlite_connection(self.db_path) as (conn, cursor):
-            cursor.execute('''
-                INSERT INTO llm_calls (
-                    timestamp, operation_type, prompt, prompt_preview, prompt_length,
-                    response_text, response_preview, response_length,
-                    tokens_sent, tokens_received, total_tokens,
-                    latency_ms, success, error, metadata
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (
-                timestamp, operation_type, prompt, prompt_preview, len(prompt),
-                response_text, response_preview, len(response_text),
-                tokens_sent, tokens_received, tokens_sent + tokens_received,
-                latency_ms, error is None, error, metadata_json
-            ))
+        self._writer.submit((
+            timestamp, operation_type, prompt, prompt_preview, len(prompt),
+            response_text, response_preview, len(response_text),
+            tokens_sent, tokens_received, tokens_sent + tokens_received,
+            latency_ms, error is None, error, metadata_json
+        ))
+
+        if error is None:
+            model = metadata.get('model') if isinstance(metadata, dict) else None
+            self.latency.record('llm', operation_type, model, latency_ms)
 
         return {
             'timestamp': timestamp,
@@ -100,7 +116,9 @@ class ObservabilityLogger:
         Returns:
             List of log entries, most recent first
         """
-        with sqlite_connection(self.db_path, row_factory=sqlite3.Row) as (conn, cursor):
+        self._writer.flush()
+
+        with self._pool.connection(row_factory=sqlite3.Row) as (conn, cursor):
             cursor.execute('''
                 SELECT
                     id, timestamp, operation_type, prompt, prompt_preview, prompt_length,
@@ -128,7 +146,9 @@ class ObservabilityLogger:
         Returns:
             Dictionary with aggregate metrics
         """
-        with sqlite_connection(self.db_path) as (conn, cursor):
+        self._writer.flush()
+
+        with self._pool.connection() as (conn, cursor):
             # Get overall stats
             cursor.execute('''
                 SELECT
@@ -159,12 +179,43 @@ class ObservabilityLogger:
             'total_tokens': stats[3] or 0,
             'avg_latency_ms': round(stats[4], 2) if stats[4] else 0,
             'total_latency_ms': round(stats[5], 2) if stats[5] else 0,
-            'operation_breakdown': operation_breakdown
+            'operation_breakdown': operation_breakdown,
+            'metrics_writer': self._writer.get_stats(),
+            'connection_pool': self._pool.get_stats()
+        }
+
+    def record_latency(self, metric, operation_type, model, latency_ms):
+        """
+        Record a latency sample that is not an LLM call (e.g. 'rag' or 'total').
+
+        Args:
+            metric: Name of the timed stage
+            operation_type: Operation the request belongs to
+            model: Model used for the request
+            latency_ms: Duration in milliseconds
+        """
+        self.latency.record(metric, operation_type, model, latency_ms)
+
+    def get_latency_stats(self, window_minutes=60):
+        """
+        Latency percentiles per metric, operation type and model.
+
+        Args:
+            window_minutes: How far back to aggregate
+
+        Returns:
+            Dictionary with the window and one p50/p90/p99/max entry per series
+        """
+        return {
+            'window_minutes': window_minutes,
+            'series': self.latency.snapshot(window_minutes)
         }
 
     def get_call_by_id(self, call_id):
         """Get full details of a specific LLM call including full prompt and response."""
-        with sqlite_connection(self.db_path, row_factory=sqlite3.Row) as (conn, cursor):
+        self._writer.flush()
+
+        with self._pool.connection(row_factory=sqlite3.Row) as (conn, cursor):
             cursor.execute('''
                 SELECT * FROM llm_calls WHERE id = ?
             ''', (call_id,))
@@ -0,0 +1,30 @@
+"""
+Generation and embedding providers
+
+The LLM and RAG services go through the provider selected in config
+(LLM_PROVIDER environment variable, or set at runtime):
+
+- gemini: the Google Gemini API
+- stub: deterministic offline responses for load tests and benchmarks
+"""
+from services.config_service import config
+from .base import LLMProvider, Generation, Usage, ProviderError
+from .gemini import GeminiProvider
+from .stub import StubProvider
+
+providers = {
+    'gemini': GeminiProvider(),
+    'stub': StubProvider.from_env(),
+}
+
+
+def get_provider(name=None) -> LLMProvider:
+    """The named provider, or the one currently selected in config"""
+    name = name or config.get_llm_provider()
+    if name not in providers:
+        raise ValueError(f"Unknown LLM provider: {name}")
+    return providers[name]
+
+
+__all__ = ['LLMProvider', 'Generation', 'Usage', 'ProviderError', 'GeminiProvider', 'StubProvider',
+           'providers', 'get_provider']
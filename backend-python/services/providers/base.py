@@ -0,0 +1,56 @@
+"""
+Provider interface for text generation and embeddings
+"""
+from dataclasses import dataclass
+from typing import Iterator, List, Optional
+
+
+@dataclass
+class Usage:
+    """Token counts reported by the provider (field names follow the Gemini API)"""
+    prompt_token_count: Optional[int]
+    candidates_token_count: Optional[int]
+
+
+@dataclass
+class Generation:
+    """A generated response, or one chunk of a streamed response"""
+    text: str
+    usage_metadata: Optional[Usage] = None
+
+
+class ProviderError(Exception):
+    """A provider call failed; code is the equivalent HTTP status, used to decide on retries"""
+
+    def __init__(self, message, code=None):
+        super().__init__(message)
+        self.code = code
+
+
+class LLMProvider:
+    """Backend for the LLM and RAG services"""
+
+    name = None
+
+    async def generate_async(self, api_key: str, model: str, prompt: str) -> Generation:
+        """Generate a complete response"""
+        raise NotImplementedError
+
+    def generate_stream(self, api_key: str, model: str, prompt: str) -> Iterator[Generation]:
+        """Generate a response as chunks; the request is made when iteration starts"""
+        raise NotImplementedError
+
+    def embed(self, api_key: str, model: str, texts: List[str]) -> List[List[float]]:
+        """Embed texts, one vector per text"""
+        raise NotImplementedError
+
+    async def embed_async(self, api_key: str, model: str, texts: List[str]) -> List[List[float]]:
+        """Async embed()"""
+        raise NotImplementedError
+
+    def list_models(self, api_key: str) -> List[str]:
+        """Names of the models available to the API key"""
+        raise NotImplementedError
+
+    def get_stats(self) -> dict:
+        return {'name': self.name}
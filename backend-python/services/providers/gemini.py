@@ -0,0 +1,41 @@
+"""
+Google Gemini provider (google-genai SDK)
+"""
+from services.genai_clients import genai_clients
+from services.providers.base import LLMProvider, Generation, Usage
+
+
+def _usage(usage_metadata):
+    if usage_metadata is None:
+        return None
+    return Usage(usage_metadata.prompt_token_count, usage_metadata.candidates_token_count)
+
+
+class GeminiProvider(LLMProvider):
+    """Calls the Gemini API through the shared per-key clients"""
+
+    name = 'gemini'
+
+    async def generate_async(self, api_key, model, prompt):
+        client = genai_clients.get(api_key)
+        response = await client.aio.models.generate_content(model=model, contents=prompt)
+        return Generation(response.text, _usage(getattr(response, 'usage_metadata', None)))
+
+    def generate_stream(self, api_key, model, prompt):
+        client = genai_clients.get(api_key)
+        for chunk in client.models.generate_content_stream(model=model, contents=prompt):
+            yield Generation(chunk.text or '', _usage(getattr(chunk, 'usage_metadata', None)))
+
+    def embed(self, api_key, model, texts):
+        client = genai_clients.get(api_key)
+        result = client.models.embed_content(model=model, contents=texts)
+        return [embedding.values for embedding in result.embeddings]
+
+    async def embed_async(self, api_key, model, texts):
+        client = genai_clients.get(api_key)
+        result = await client.aio.models.embed_content(model=model, contents=texts)
+        return [embedding.values for embedding in result.embeddings]
+
+    def list_models(self, api_key):
+        client = genai_clients.get(api_key)
+        return [model.name for model in client.models.list()]
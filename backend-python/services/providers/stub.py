@@ -0,0 +1,187 @@
+"""
+Deterministic offline provider for load tests and benchmarks
+
+Nothing leaves the machine. Responses and embeddings are derived from a hash
+of the input, so the same prompt always gets the same answer and cache
+behaviour matches a real provider's. Latency is drawn from a lognormal
+distribution around a median, and a configurable fraction of calls fail with a
+retryable 503. All randomness comes from one seeded RNG, so a run with the
+same seed and request order is reproducible.
+
+Embeddings use feature hashing over words: texts sharing words get similar
+vectors, which keeps RAG similarity thresholds meaningful.
+"""
+import asyncio
+import hashlib
+import math
+import os
+import random
+import re
+import threading
+import time
+
+from services.providers.base import LLMProvider, Generation, Usage, ProviderError
+from services.token_budget import estimate_tokens
+
+_VOCABULARY = (
+    'def', 'return', 'if', 'else', 'for', 'in', 'range', 'while', 'list', 'dict',
+    'result', 'value', 'index', 'node', 'left', 'right', 'count', 'total', 'len', 'None'
+)
+_WORD_PATTERN = re.compile(r"\w+")
+
+
+def _digest_stream(seed):
+    """Endless deterministic bytes derived from seed"""
+    block = 0
+    while True:
+        yield from hashlib.sha256(f"{block}:{seed}".encode()).digest()
+        block += 1
+
+
+class StubProvider(LLMProvider):
+    """Fake generation and embeddings with configurable latency, errors and output size"""
+
+    name = 'stub'
+
+    SETTINGS = ('latency_ms', 'latency_sigma', 'embedding_latency_ms', 'error_rate',
+                'output_tokens', 'stream_chunks', 'embedding_dim', 'seed')
+
+    def __init__(self, latency_ms=200.0, latency_sigma=0.5, embedding_latency_ms=20.0, error_rate=0.0,
+                 output_tokens=200, stream_chunks=8, embedding_dim=768, seed=0):
+        """
+        Args:
+            latency_ms: Median generation latency (0 answers immediately)
+            latency_sigma: Spread of the lognormal latency distribution
+            embedding_latency_ms: Median latency of an embedding call
+            error_rate: Fraction of calls failing with a 503 (0-1)
+            output_tokens: Words in each generated response
+            stream_chunks: Chunks a streamed response is split into
+            embedding_dim: Length of embedding vectors
+            seed: Seed for latency and error sampling
+        """
+        self._lock = threading.Lock()
+        self._stats = {'generations': 0, 'embedded_texts': 0, 'errors': 0}
+        self.configure(latency_ms=latency_ms, latency_sigma=latency_sigma,
+                       embedding_latency_ms=embedding_latency_ms, error_rate=error_rate,
+                       output_tokens=output_tokens, stream_chunks=stream_chunks,
+                       embedding_dim=embedding_dim, seed=seed)
+
+    @classmethod
+    def from_env(cls):
+        """Build from STUB_LLM_* environment variables (e.g. STUB_LLM_LATENCY_MS=500)"""
+        settings = {}
+        for setting in cls.SETTINGS:
+            value = os.environ.get(f'STUB_LLM_{setting.upper()}')
+            if value is not None:
+                settings[setting] = float(value)
+        return cls(**settings)
+
+    def configure(self, **settings):
+        """Change settings at runtime; returns the full settings"""
+        unknown = set(settings) - set(self.SETTINGS)
+        if unknown:
+            raise ValueError(f"Unknown stub provider settings: {', '.join(sorted(unknown))}")
+        if not 0 <= settings.get('error_rate', 0) <= 1:
+            raise ValueError("error_rate must be between 0 and 1")
+
+        with self._lock:
+            for setting, value in settings.items():
+                if setting in ('output_tokens', 'stream_chunks', 'embedding_dim'):
+                    value = max(int(value), 1)
+                elif setting == 'seed':
+                    value = int(value)
+                else:
+                    value = float(value)
+                setattr(self, setting, value)
+            if 'seed' in settings:
+                self._rng = random.Random(self.seed)
+            return {setting: getattr(self, setting) for setting in self.SETTINGS}
+
+    def _sample(self, median_ms):
+        """Latency (seconds) and whether the call fails, from the shared RNG"""
+        with self._lock:
+            delay = self._rng.lognormvariate(math.log(median_ms), self.latency_sigma) if median_ms > 0 else 0.0
+            failed = self._rng.random() < self.error_rate
+            if failed:
+                self._stats['errors'] += 1
+        return delay / 1000, failed
+
+    @staticmethod
+    def _raise_error(operation):
+        raise ProviderError(f"Stub provider: simulated {operation} failure (503 UNAVAILABLE)", code=503)
+
+    def _response(self, model, prompt):
+        digest = _digest_stream(f"{model}\0{prompt}")
+        words = [_VOCABULARY[next(digest) % len(_VOCABULARY)] for _ in range(self.output_tokens)]
+        text = ' '.join(words)
+        with self._lock:
+            self._stats['generations'] += 1
+        return text, Usage(estimate_tokens(prompt), self.output_tokens)
+
+    async def generate_async(self, api_key, model, prompt):
+        delay, failed = self._sample(self.latency_ms)
+        await asyncio.sleep(delay)
+        if failed:
+            self._raise_error('generation')
+        text, usage = self._response(model, prompt)
+        return Generation(text, usage)
+
+    def generate_stream(self, api_key, model, prompt):
+        delay, failed = self._sample(self.latency_ms)
+        if failed:
+            time.sleep(delay)
+            self._raise_error('generation')
+
+        text, usage = self._response(model, prompt)
+        words = text.split(' ')
+        per_chunk = math.ceil(len(words) / self.stream_chunks)
+        pieces = [' '.join(words[i:i + per_chunk]) for i in range(0, len(words), per_chunk)]
+        for i, piece in enumerate(pieces):
+            time.sleep(delay / len(pieces))
+            last = i == len(pieces) - 1
+            yield Generation(piece if last else piece + ' ', usage if last else None)
+
+    def _embedding(self, model, text):
+        vector = [0.0] * self.embedding_dim
+        for word in _WORD_PATTERN.findall(text.lower()):
+            digest = hashlib.blake2b(f"{model}\0{word}".encode(), digest_size=8).digest()
+            index = int.from_bytes(digest[:4], 'little') % self.embedding_dim
+            vector[index] += 1.0 if digest[4] & 1 else -1.0
+
+        norm = math.sqrt(sum(value * value for value in vector))
+        if norm == 0:
+            # Empty text: a fixed unit vector rather than zeros, which cosine distance can't handle
+            vector[0] = 1.0
+            return vector
+        return [value / norm for value in vector]
+
+    def _embed_all(self, model, texts):
+        with self._lock:
+            self._stats['embedded_texts'] += len(texts)
+        return [self._embedding(model, text) for text in texts]
+
+    def embed(self, api_key, model, texts):
+        delay, failed = self._sample(self.embedding_latency_ms)
+        time.sleep(delay)
+        if failed:
+            self._raise_error('embedding')
+        return self._embed_all(model, texts)
+
+    async def embed_async(self, api_key, model, texts):
+        delay, failed = self._sample(self.embedding_latency_ms)
+        await asyncio.sleep(delay)
+        if failed:
+            self._raise_error('embedding')
+        return self._embed_all(model, texts)
+
+    def list_models(self, api_key):
+        # Any model name is accepted; list the ones the UI usually offers
+        return ['models/gemini-2.5-flash', 'models/gemini-2.5-flash-lite', 'models/gemini-2.5-pro']
+
+    def get_stats(self):
+        with self._lock:
+            return {
+                'name': self.name,
+                **self._stats,
+                'settings': {setting: getattr(self, setting) for setting in self.SETTINGS}
+            }
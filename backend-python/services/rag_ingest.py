@@ -0,0 +1,385 @@
+"""
+Streaming bulk ingestion into the RAG store
+
+Documents flow through four stages, each on its own thread and joined by
+bounded queues, so reading, chunking, embedding and writing overlap and a
+slow stage holds back the ones before it instead of buffering the whole
+source in memory:
+
+    read -> prepare (hash, dedup, chunk) -> embed (batched) -> write (Chroma add)
+
+The prepare stage chunks each step's new documents together through
+RAGService._chunk_texts, which uses the chunking process pool for large
+enough steps, so the GIL-bound splitting doesn't stall the other stages.
+
+Documents whose content_hash is already stored, or was already seen in the
+run, are counted as duplicates and never embedded. Embedding gathers several
+documents' texts into one _generate_embeddings call, which splits them into
+request batches with the configured concurrency and embedding cache.
+
+Every record read from the source has a position. The writer handles records
+in source order and, after each Chroma write, saves the position reached to
+the checkpoint file. After a failure the next run with the same checkpoint
+skips the records already written; dedup covers anything in between.
+"""
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from datetime import datetime
+from typing import Callable, Dict, Iterable, Iterator, Optional, Tuple
+
+from services.config_service import config
+from services.rag_service import rag_service
+
+logger = logging.getLogger(__name__)
+
+TEXT_EXTENSIONS = ('.md', '.markdown', '.txt', '.rst', '.py')
+
+_DONE = object()
+
+
+def iter_directory(path: str, extensions: Tuple[str, ...] = TEXT_EXTENSIONS) -> Iterator[Tuple[str, str]]:
+    """Yield (relative path, content) for each text file under path, in a stable order"""
+    for root, dirs, files in os.walk(path):
+        dirs.sort()
+        for name in sorted(files):
+            if not name.lower().endswith(extensions):
+                continue
+            file_path = os.path.join(root, name)
+            with open(file_path, encoding='utf-8', errors='replace') as f:
+                yield os.path.relpath(file_path, path), f.read()
+
+
+def iter_jsonl(path: str) -> Iterator[Tuple[str, str]]:
+    """
+    Yield (line number, content) for each line of a JSONL file.
+
+    A line is either a JSON string or an object with a 'content' (or 'text')
+    field. Blank and malformed lines are skipped (malformed ones with a warning).
+    """
+    with open(path, encoding='utf-8') as f:
+        for line_number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                content = document_content(json.loads(line))
+            except ValueError as e:
+                logger.warning(f"[INGEST] Skipping {path}:{line_number}: {e}")
+                continue
+            yield str(line_number), content
+
+
+def document_content(document) -> str:
+    """Text of a document given as a string or a {'content': ...} / {'text': ...} object"""
+    if isinstance(document, str):
+        return document
+    if isinstance(document, dict):
+        return document.get('content') or document.get('text') or ''
+    raise ValueError(f"Unsupported document: expected a string or object, got {type(document).__name__}")
+
+
+def iter_source(path: str) -> Iterator[Tuple[str, str]]:
+    """Documents from a directory of text files or a JSONL file"""
+    if os.path.isdir(path):
+        return iter_directory(path)
+    if os.path.isfile(path):
+        return iter_jsonl(path)
+    raise FileNotFoundError(f"No such file or directory: {path}")
+
+
+class IngestCheckpoint:
+    """Position reached in a source, saved atomically as JSON"""
+
+    def __init__(self, path: str, source: str):
+        self.path = path
+        self.source = source
+
+    def load(self) -> int:
+        """Records already written from this source (0 if none, or the checkpoint is for another source)"""
+        if not os.path.exists(self.path):
+            return 0
+        with open(self.path) as f:
+            state = json.load(f)
+        if state.get('source') != self.source:
+            logger.warning(f"[INGEST] Checkpoint {self.path} is for {state.get('source')}, starting from the beginning")
+            return 0
+        return int(state.get('position', 0))
+
+    def save(self, position: int, report: Dict):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump({
+                'source': self.source,
+                'position': position,
+                'documents': report['documents'],
+                'chunks': report['chunks'],
+                'updated_at': datetime.now().isoformat()
+            }, f)
+        os.replace(tmp_path, self.path)
+
+    def clear(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+class BulkIngestor:
+    """Pipelined chunk / dedup / embed / write of a document stream into the RAG store"""
+
+    def __init__(self, rag=None, queue_size: int = 64, dedup_batch: int = 32, embed_group_texts: Optional[int] = None):
+        """
+        Args:
+            rag: RAGService to ingest into (the global one by default)
+            queue_size: Capacity of each queue between stages
+            dedup_batch: Documents checked against the store (and chunked) per step
+            embed_group_texts: Texts gathered per embedding call (default: one
+                full request batch per concurrent request)
+        """
+        self.rag = rag or rag_service
+        self.queue_size = queue_size
+        self.dedup_batch = dedup_batch
+        self.embed_group_texts = embed_group_texts
+
+        self._stop = threading.Event()
+        self._error = None
+        self._lock = threading.Lock()
+
+    def _fail(self, stage: str, error: Exception):
+        with self._lock:
+            if self._error is None:
+                self._error = f"{stage} stage failed: {error}"
+        logger.error(f"[INGEST] {stage} stage failed: {error}")
+        self._stop.set()
+
+    def _put(self, q: queue.Queue, item) -> bool:
+        while not self._stop.is_set():
+            try:
+                q.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _get(self, q: queue.Queue):
+        while not self._stop.is_set():
+            try:
+                return q.get(timeout=0.1)
+            except queue.Empty:
+                continue
+        return _DONE
+
+    def _drain(self, q: queue.Queue, first, limit: int) -> list:
+        """first plus whatever is already waiting in q, up to limit items (stops at _DONE)"""
+        items = [first]
+        while len(items) < limit and items[-1] is not _DONE:
+            try:
+                items.append(q.get_nowait())
+            except queue.Empty:
+                break
+        return items
+
+    def _read(self, documents: Iterable, start: int, out_q: queue.Queue):
+        try:
+            for position, (key, content) in enumerate(documents):
+                if position < start:
+                    continue
+                if not self._put(out_q, (position, key, content)):
+                    return
+        except Exception as e:
+            self._fail('read', e)
+        self._put(out_q, _DONE)
+
+    def _prepare(self, in_q: queue.Queue, out_q: queue.Queue):
+        seen = set()
+        try:
+            while True:
+                items = self._drain(in_q, self._get(in_q), self.dedup_batch)
+                done = items[-1] is _DONE
+                if done:
+                    items.pop()
+
+                hashed = [(position, key, content, self.rag._hash_content(content))
+                          for position, key, content in items]
+                existing = self.rag._find_existing(list({content_hash for *_, content_hash in hashed}))
+
+                statuses = []
+                for position, key, content, content_hash in hashed:
+                    if not content.strip():
+                        statuses.append('empty')
+                    elif content_hash in existing or content_hash in seen:
+                        statuses.append('duplicate')
+                    else:
+                        seen.add(content_hash)
+                        statuses.append('new')
+
+                # The new documents are chunked together, on the chunking process pool if it pays off
+                new = [item[2] for item, status in zip(hashed, statuses) if status == 'new']
+                chunked = iter(self.rag._chunk_texts(new) if new else [])
+                for (position, key, content, content_hash), status in zip(hashed, statuses):
+                    chunks = next(chunked) if status == 'new' else None
+                    if not self._put(out_q, (position, key, content, content_hash, status, chunks)):
+                        return
+                if done:
+                    break
+        except Exception as e:
+            self._fail('prepare', e)
+        self._put(out_q, _DONE)
+
+    def _embed(self, in_q: queue.Queue, out_q: queue.Queue, api_key: str):
+        group_texts = self.embed_group_texts or config.get_embedding_batch_size() * config.get_embedding_concurrency()
+        try:
+            done = False
+            while not done:
+                group, text_count = [], 0
+                item = self._get(in_q)
+                while True:
+                    if item is _DONE:
+                        done = True
+                        break
+                    group.append(item)
+                    chunks = item[5]
+                    if chunks:
+                        text_count += 1 if len(chunks) == 1 else len(chunks) + 1
+                    if text_count >= group_texts:
+                        break
+                    # Take what is ready now rather than waiting for a full group
+                    try:
+                        item = in_q.get_nowait()
+                    except queue.Empty:
+                        break
+                if not group:
+                    continue
+
+                texts = []
+                for position, key, content, content_hash, status, chunks in group:
+                    if status == 'new':
+                        texts.extend([content] if len(chunks) == 1 else [content] + chunks)
+                embed_stats = {'requests': 0, 'cached': 0}
+                embeddings = self.rag._generate_embeddings(texts, api_key, embed_stats) if texts else []
+                if not self._put(out_q, (group, embeddings, embed_stats)):
+                    return
+        except Exception as e:
+            self._fail('embed', e)
+        self._put(out_q, _DONE)
+
+    def _write(self, in_q: queue.Queue, report: Dict, checkpoint: Optional[IngestCheckpoint],
+               progress: Optional[Callable[[Dict], None]]):
+        try:
+            while True:
+                item = self._get(in_q)
+                if item is _DONE:
+                    return
+                group, embeddings, embed_stats = item
+
+                created_at = datetime.now().isoformat()
+                records = {'ids': [], 'embeddings': [], 'documents': [], 'metadatas': []}
+                added = chunk_count = offset = 0
+                for position, key, content, content_hash, status, chunks in group:
+                    if status != 'new':
+                        report['duplicates' if status == 'duplicate' else 'empty'] += 1
+                        continue
+                    size = 1 if len(chunks) == 1 else len(chunks) + 1
+                    _, doc_records = self.rag._document_records(
+                        content, content_hash, chunks, embeddings[offset:offset + size], created_at
+                    )
+                    offset += size
+                    for field, values in doc_records.items():
+                        records[field].extend(values)
+                    added += 1
+                    chunk_count += len(chunks)
+
+                if records['ids']:
+                    self.rag._write_records(records)
+
+                position = group[-1][0] + 1
+                with self._lock:
+                    report['documents'] += added
+                    report['chunks'] += chunk_count
+                    report['embedding_requests'] += embed_stats['requests']
+                    report['cached_embeddings'] += embed_stats['cached']
+                    report['position'] = position
+                if checkpoint is not None:
+                    checkpoint.save(position, report)
+                if progress is not None:
+                    progress(self._summary(report))
+        except Exception as e:
+            self._fail('write', e)
+
+    def _summary(self, report: Dict) -> Dict:
+        with self._lock:
+            summary = dict(report)
+        seconds = time.perf_counter() - summary.pop('_start')
+        summary['seconds'] = round(seconds, 3)
+        summary['documents_per_second'] = round(summary['documents'] / seconds, 2) if seconds > 0 else 0.0
+        summary['chunks_per_second'] = round(summary['chunks'] / seconds, 2) if seconds > 0 else 0.0
+        return summary
+
+    def run(self, documents: Iterable[Tuple[str, str]], api_key: str, checkpoint: Optional[IngestCheckpoint] = None,
+            progress: Optional[Callable[[Dict], None]] = None) -> Dict:
+        """
+        Ingest (key, content) pairs.
+
+        Args:
+            documents: Iterable of (key, content), e.g. from iter_source()
+            api_key: API key for embeddings
+            checkpoint: Where to resume from and record progress (optional)
+            progress: Called with the running report after each write
+
+        Returns:
+            Report with documents/chunks added, duplicates, empty documents
+            skipped, the position reached, docs/sec, chunks/sec and, if the
+            run stopped early, the error
+        """
+        self._stop.clear()
+        self._error = None
+        start = checkpoint.load() if checkpoint is not None else 0
+        if start:
+            logger.info(f"[INGEST] Resuming {checkpoint.source} at record {start}")
+
+        report = {
+            'resumed_from': start, 'position': start, 'documents': 0, 'chunks': 0, 'duplicates': 0, 'empty': 0,
+            'embedding_requests': 0, 'cached_embeddings': 0, '_start': time.perf_counter()
+        }
+        read_q = queue.Queue(maxsize=self.queue_size)
+        prepared_q = queue.Queue(maxsize=self.queue_size)
+        embedded_q = queue.Queue(maxsize=max(self.queue_size // 8, 2))
+
+        stages = [
+            threading.Thread(target=self._read, args=(documents, start, read_q), name='ingest-read', daemon=True),
+            threading.Thread(target=self._prepare, args=(read_q, prepared_q), name='ingest-prepare', daemon=True),
+            threading.Thread(target=self._embed, args=(prepared_q, embedded_q, api_key), name='ingest-embed',
+                             daemon=True),
+            threading.Thread(target=self._write, args=(embedded_q, report, checkpoint, progress), name='ingest-write',
+                             daemon=True),
+        ]
+        for stage in stages:
+            stage.start()
+        for stage in stages:
+            stage.join()
+
+        summary = self._summary(report)
+        summary['success'] = self._error is None
+        if self._error is not None:
+            summary['error'] = self._error
+        elif checkpoint is not None:
+            # Finished: a later run of the same source starts over (dedup skips what is stored)
+            checkpoint.clear()
+
+        logger.info(f"[INGEST] {summary['documents']} documents, {summary['chunks']} chunks "
+                    f"({summary['duplicates']} duplicates) in {summary['seconds']}s: "
+                    f"{summary['documents_per_second']} docs/sec, {summary['chunks_per_second']} chunks/sec")
+        return summary
+
+
+def ingest_path(path: str, api_key: str, checkpoint_path: Optional[str] = None,
+                progress: Optional[Callable[[Dict], None]] = None, **options) -> Dict:
+    """Ingest a directory of text files or a JSONL file, resuming from checkpoint_path if given"""
+    source = os.path.abspath(path)
+    checkpoint = IngestCheckpoint(checkpoint_path, source) if checkpoint_path else None
+    report = BulkIngestor(**options).run(iter_source(path), api_key, checkpoint, progress)
+    return {'source': source, **report}
@@ -1,18 +1,23 @@
+import asyncio
 import logging
 import hashlib
 import os
+import threading
+import time
 import uuid
+from collections import deque
 from typing import List, Dict, Optional
 from datetime import datetime
 import numpy as np
-import chromadb
-from chromadb.config import Settings
-from google import genai
 from utils import service_error_handler, cache_error_handler
 from services.config_service import config
-
-from llama_index.core.node_parser import SentenceSplitter
-from llama_index.core.schema import Document as LlamaDocument
+from services.token_budget import pack_context, estimate_tokens
+from services.async_runtime import async_runtime
+from services.embedding_cache import embedding_cache
+from services.chroma_store import ChromaStore
+from services.providers import get_provider
+from services.rate_limiter import rate_limiter
+from services.chunk_pool import ChunkPool
 
 logger = logging.getLogger(__name__)
 
@@ -20,9 +25,14 @@ logger = logging.getLogger(__name__)
 class RAGService:
     """RAG service for document retrieval with LlamaIndex-powered chunking"""
 
+    EMBEDDING_MODEL = 'models/text-embedding-004'
     CHUNK_SIZE = 512
     CHUNK_OVERLAP = 128
 
+    # Re-read the index fingerprint at least this often so changes made by other
+    # worker processes are picked up
+    INDEX_VERSION_TTL_SECONDS = 60
+
     def __init__(self, chroma_path=None):
         if chroma_path is None:
             current_dir = os.path.dirname(os.path.abspath(__file__))  # services/
@@ -32,62 +42,253 @@ class RAGService:
         self.chroma_path = chroma_path
         logger.info("Chroma path: %s", self.chroma_path)
 
-        # Don't keep persistent connection - create on demand
-        self.chroma_client = None
-        self.collection = None
-
-        # sentence splitter for intelligent chunking
-        self.text_splitter = SentenceSplitter(
-            chunk_size=self.CHUNK_SIZE,
-            chunk_overlap=self.CHUNK_OVERLAP,
-            paragraph_separator="\n\n",  # paragraph boundaries
-            secondary_chunking_regex="[^,.;。？！]+[,.;。？！]?",  # sentence boundaries
-            separator=" ",  # word boundaries
+        # One long-lived client for the process, see chroma_store for the concurrency model
+        self.store = ChromaStore(
+            chroma_path,
+            collection_name="rag_documents",
+            collection_metadata={"description": "RAG document embeddings", "hnsw:space": "cosine"}
         )
+        self._ids_seeded = False
+        self._ids_lock = threading.Lock()
+
+        # Full fingerprint of the stored ids, refreshed every INDEX_VERSION_TTL_SECONDS,
+        # plus a count of this process's writes since then
+        self._index_fingerprint = None
+        self._index_fingerprint_at = 0.0
+        self._index_writes = 0
+        self._index_token = uuid.uuid4().hex[:8]
+        self._index_lock = threading.Lock()
+
+        self._ingest_lock = threading.Lock()
+        self._ingest_stats = {'documents': 0, 'chunks': 0, 'embedding_requests': 0, 'cached_embeddings': 0,
+                              'embed_seconds': 0.0, 'total_seconds': 0.0}
+        self._recent_ingests = deque(maxlen=20)
+
+        # sentence splitter for intelligent chunking, with a process pool for bulk loads
+        self.chunk_pool = ChunkPool(self.CHUNK_SIZE, self.CHUNK_OVERLAP)
+        self.text_splitter = self.chunk_pool.splitter
+
+    def open(self):
+        """Open the document store (called at startup; otherwise it opens on first use)"""
+        self.store.open()
+
+    def close(self):
+        """Release the document store"""
+        self.store.close()
+
+    @property
+    def collection(self):
+        """The open Chroma collection, for scripts that need direct access"""
+        return self.store.open()
+
+    def _invalidate_index_version(self):
+        with self._index_lock:
+            self._index_writes += 1
+
+    @service_error_handler(default_value=None, error_message_prefix="Error computing RAG index version")
+    def index_version(self) -> Optional[str]:
+        """
+        Fingerprint of the document set used for retrieval.
 
-    def _get_collection(self):
-        """Get ChromaDB collection, creating fresh connection if needed"""
-        if self.chroma_client is None or self.collection is None:
-            self.chroma_client = chromadb.PersistentClient(
-                path=self.chroma_path,
-                settings=Settings(anonymized_telemetry=False)
-            )
-            self.collection = self.chroma_client.get_or_create_collection(
-                name="rag_documents",
-                metadata={"description": "RAG document embeddings", "hnsw:space": "cosine"}
-            )
-        return self.chroma_client, self.collection
-
-    def _close_collection(self):
-        """Close ChromaDB connection to release file locks"""
-        if self.collection is not None:
-            del self.collection
-            self.collection = None
-        if self.chroma_client is not None:
-            del self.chroma_client
-            self.chroma_client = None
+        Changes whenever documents are added or deleted, so it can be part of
+        cache keys computed before retrieval runs. Returns None if the index
+        can't be read, in which case callers should not rely on it.
+
+        Hashing every stored id is O(N), so it only happens when the TTL runs
+        out (which also picks up other processes' writes). In between, writes
+        made here bump a counter that is appended with this process's token,
+        keeping each call O(1) even during bulk loads.
+        """
+        now = time.monotonic()
+        with self._index_lock:
+            fingerprint, writes, refreshed_at = self._index_fingerprint, self._index_writes, self._index_fingerprint_at
+            stale = fingerprint is None or now - refreshed_at > self.INDEX_VERSION_TTL_SECONDS
+
+        if stale:
+            ids = self.store.read(lambda collection: collection.get(include=[])['ids'])
+            fingerprint = f"{len(ids)}:{hashlib.sha256(','.join(sorted(ids)).encode()).hexdigest()[:16]}"
+            with self._index_lock:
+                if self._index_fingerprint_at == refreshed_at:
+                    # Writes made during the scan stay counted; they may or may not be in ids
+                    self._index_writes -= writes
+                    self._index_fingerprint, self._index_fingerprint_at = fingerprint, now
+                # else another thread refreshed first; use its fingerprint
+                fingerprint, writes = self._index_fingerprint, self._index_writes
+
+        return fingerprint if writes == 0 else f"{fingerprint}+{self._index_token}.{writes}"
 
     def _get_next_id(self) -> int:
         """Get next available document ID from config service"""
-        return config.increment_rag_doc_id()
+        with self._ids_lock:
+            if not self._ids_seeded:
+                # The counter is in memory; continue after the ids already stored
+                ids = self.store.read(lambda collection: collection.get(include=[])['ids'])
+                highest = max((int(doc_id) for doc_id in ids if doc_id.isdigit()), default=0)
+                config.ensure_rag_doc_id_counter(highest)
+                self._ids_seeded = True
+            return config.increment_rag_doc_id()
 
     def _hash_content(self, content: str) -> str:
         """Generate SHA256 hash of content for deduplication"""
         return hashlib.sha256(content.encode()).hexdigest()
 
+    def _embedding_cache_model(self, provider) -> str:
+        """Embedding cache key for the model (per provider, so stub vectors stay separate)"""
+        return f"{provider.name}:{self.EMBEDDING_MODEL}"
+
     def _generate_embedding(self, text: str, api_key: str) -> List[float]:
-        """Generate embedding using Google's embedding API"""
+        """
+        Generate embedding with the configured provider.
 
+        Served from the embedding cache when the text was embedded before.
+        Rate limited per API key; throttled calls are retried until the retry
+        deadline. Failures raise rather than returning a placeholder vector,
+        which would be stored or searched as if it were real.
+        """
+        provider = get_provider()
+        cache_model = self._embedding_cache_model(provider)
+        use_cache = config.is_embedding_cache_enabled()
+        if use_cache:
+            cached = embedding_cache.get(cache_model, text)
+            if cached is not None:
+                return cached
+
+        embeddings = rate_limiter.call(
+            lambda: provider.embed(api_key, self.EMBEDDING_MODEL, [text]),
+            api_key, self.EMBEDDING_MODEL
+        )
+        if use_cache:
+            embedding_cache.set_many(cache_model, [text], embeddings)
+        return embeddings[0]
+
+    async def _generate_embedding_async(self, text: str, api_key: str) -> List[float]:
+        """Generate embedding with the async provider API (cancellable while in flight)"""
+        provider = get_provider()
+        cache_model = self._embedding_cache_model(provider)
+        use_cache = config.is_embedding_cache_enabled()
+        if use_cache:
+            cached = await asyncio.to_thread(embedding_cache.get, cache_model, text)
+            if cached is not None:
+                return cached
+
+        embeddings = await rate_limiter.call_async(
+            lambda: provider.embed_async(api_key, self.EMBEDDING_MODEL, [text]),
+            api_key, self.EMBEDDING_MODEL
+        )
+        if use_cache:
+            await asyncio.to_thread(embedding_cache.set_many, cache_model, [text], embeddings)
+        return embeddings[0]
+
+    def _embedding_batches(self, texts: List[str]) -> List[List[str]]:
+        """Split texts into request-sized batches, bounded by count and estimated tokens"""
+        max_items = config.get_embedding_batch_size()
+        max_tokens = config.get_embedding_batch_max_tokens()
+
+        batches, batch, batch_tokens = [], [], 0
+        for text in texts:
+            tokens = estimate_tokens(text)
+            if batch and (len(batch) >= max_items or batch_tokens + tokens > max_tokens):
+                batches.append(batch)
+                batch, batch_tokens = [], 0
+            batch.append(text)
+            batch_tokens += tokens
+        if batch:
+            batches.append(batch)
+        return batches
+
+    async def _generate_embeddings_async(self, texts: List[str], api_key: str,
+                                         stats: Optional[Dict] = None) -> List[List[float]]:
+        """
+        Embed many texts with batched requests, a bounded number in flight.
+
+        Cached texts are not sent, and repeated texts are sent once. Returns
+        one embedding per text, in order. If any batch fails the others are
+        cancelled and the error is raised. The number of requests made and
+        cache hits are written to stats.
+        """
+        provider = get_provider()
+        cache_model = self._embedding_cache_model(provider)
+        use_cache = config.is_embedding_cache_enabled()
+        if use_cache:
+            cached = await asyncio.to_thread(embedding_cache.get_many, cache_model, texts)
+        else:
+            cached = [None] * len(texts)
+        missing = list(dict.fromkeys(text for text, embedding in zip(texts, cached) if embedding is None))
+
+        semaphore = asyncio.Semaphore(config.get_embedding_concurrency())
+
+        async def embed(batch):
+            async with semaphore:
+                embeddings = await rate_limiter.call_async(
+                    lambda: provider.embed_async(api_key, self.EMBEDDING_MODEL, batch),
+                    api_key, self.EMBEDDING_MODEL
+                )
+            if len(embeddings) != len(batch):
+                raise ValueError(f"Embedding API returned {len(embeddings)} vectors for {len(batch)} texts")
+            return embeddings
+
+        batches = self._embedding_batches(missing)
+        tasks = [asyncio.ensure_future(embed(batch)) for batch in batches]
         try:
-            genai_client = genai.Client(api_key=api_key)
-            result = genai_client.models.embed_content(
-                model='models/text-embedding-004',
-                contents=[text]
-            )
-            return result.embeddings[0].values
-        except Exception as e:
-            logger.error(f"Error generating embedding: {e}")
-            return [0.0] * 768  # fall back on empty list, text-embedding-004 has 768 dims
+            results = await asyncio.gather(*tasks)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            raise
+        fresh = dict(zip(missing, (embedding for batch in results for embedding in batch)))
+        if use_cache and missing:
+            await asyncio.to_thread(embedding_cache.set_many, cache_model, missing, [fresh[text] for text in missing])
+
+        if stats is not None:
+            stats['requests'] = len(batches)
+            stats['cached'] = sum(embedding is not None for embedding in cached)
+        return [embedding if embedding is not None else fresh[text] for text, embedding in zip(texts, cached)]
+
+    def _generate_embeddings(self, texts: List[str], api_key: str, stats: Optional[Dict] = None) -> List[List[float]]:
+        """Blocking wrapper around _generate_embeddings_async (runs on the shared event loop)"""
+        return async_runtime.run(self._generate_embeddings_async(texts, api_key, stats))
+
+    def _record_ingest(self, doc_id: int, chunk_count: int, embed_stats: Dict, embed_seconds: float,
+                       total_seconds: float):
+        chunks_per_second = chunk_count / total_seconds if total_seconds > 0 else 0.0
+        requests = embed_stats['requests']
+        logger.info(f"[RAG] Ingested doc {doc_id}: {chunk_count} chunks, {requests} embedding requests, "
+                    f"{embed_stats['cached']} cached embeddings, "
+                    f"{total_seconds * 1000:.0f}ms ({chunks_per_second:.1f} chunks/s)")
+        with self._ingest_lock:
+            stats = self._ingest_stats
+            stats['documents'] += 1
+            stats['chunks'] += chunk_count
+            stats['embedding_requests'] += requests
+            stats['cached_embeddings'] += embed_stats['cached']
+            stats['embed_seconds'] += embed_seconds
+            stats['total_seconds'] += total_seconds
+            self._recent_ingests.append({
+                'id': doc_id,
+                'chunks': chunk_count,
+                'embedding_requests': requests,
+                'cached_embeddings': embed_stats['cached'],
+                'embed_ms': round(embed_seconds * 1000, 2),
+                'total_ms': round(total_seconds * 1000, 2),
+                'chunks_per_second': round(chunks_per_second, 2)
+            })
+
+    def get_ingest_stats(self) -> Dict:
+        """Ingestion throughput since startup, plus the most recent documents"""
+        with self._ingest_lock:
+            stats = dict(self._ingest_stats)
+            recent = list(self._recent_ingests)
+        seconds = stats['total_seconds']
+        return {
+            **stats,
+            'embed_seconds': round(stats['embed_seconds'], 3),
+            'total_seconds': round(seconds, 3),
+            'documents_per_second': round(stats['documents'] / seconds, 2) if seconds else 0.0,
+            'chunks_per_second': round(stats['chunks'] / seconds, 2) if seconds else 0.0,
+            'batch_size': config.get_embedding_batch_size(),
+            'concurrency': config.get_embedding_concurrency(),
+            'recent': recent
+        }
 
     def _chunk_text(self, text: str) -> List[str]:
         """
@@ -99,120 +300,132 @@ class RAGService:
         - maintains word boundaries
         - provides better context preservation with larger, smarter chunks
         """
-        if len(text) <= self.CHUNK_SIZE:
-            return [text]
-
-        llama_doc = LlamaDocument(text=text)
-
-        nodes = self.text_splitter.get_nodes_from_documents([llama_doc])
-
-        chunks = [node.get_content() for node in nodes] # extract text
-
-        chunks = [chunk.strip() for chunk in chunks if chunk.strip()] # filter empty out
+        return self.chunk_pool.chunk(text)
 
-        return chunks if chunks else [text]
+    def _chunk_texts(self, texts: List[str]) -> List[List[str]]:
+        """Chunk many documents at once, on the chunking process pool when they are large enough"""
+        return self.chunk_pool.chunk_many(texts)
 
-    @service_error_handler(default_value=None, error_message_prefix="Error adding document")
-    def add_document(self, content: str, api_key: str) -> Optional[int]:
-        """Add a document to the RAG store, chunking if necessary"""
-        if not api_key:
-            logger.error("No API key provided for add_document")
-            return None
-
-        content_hash = self._hash_content(content)
-        created_at = datetime.now().isoformat()
-
-        existing = self.collection.get(
+    def _find_existing(self, content_hashes: List[str]) -> Dict[str, int]:
+        """Map each content hash that is already stored to its document ID"""
+        if not content_hashes:
+            return {}
+        existing = self.store.read(lambda collection: collection.get(
             where={
                 "$and": [
-                    {"content_hash": content_hash},
+                    {"content_hash": {"$in": list(content_hashes)}},
                     {"chunk_index": {"$lte": 0}}
                 ]
-            }
-        )
+            },
+            include=['metadatas']
+        ))
+        found = {}
+        for doc_id, metadata in zip(existing['ids'], existing['metadatas']):
+            found.setdefault(metadata['content_hash'], int(doc_id))
+        return found
+
+    def _document_records(self, content: str, content_hash: str, chunks: List[str],
+                          embeddings: List[List[float]], created_at: str):
+        """
+        Assign IDs and build the Chroma records for one document.
 
-        if existing and len(existing['ids']) > 0:
-            doc_id = int(existing['ids'][0])
-            logger.info(f"Document with hash {content_hash[:8]}... already exists (id={doc_id}), skipping duplicate")
-            return doc_id
+        embeddings holds the whole document's embedding followed by one per
+        chunk (just the document's when it is a single chunk). A single-chunk
+        document is stored as chunk 0; otherwise a parent record (chunk -1)
+        holds the full text and each chunk points to it.
 
-        chunks = self._chunk_text(content)
+        Returns:
+            (doc_id, records) where records has ids, embeddings, documents and metadatas
+        """
+        doc_id = self._get_next_id()
 
         if len(chunks) == 1:
-            doc_id = self._get_next_id()
-            embedding = self._generate_embedding(content, api_key)
-
-            self.collection.add(
-                ids=[str(doc_id)],
-                embeddings=[embedding],
-                documents=[content],
-                metadatas=[{
+            return doc_id, {
+                'ids': [str(doc_id)],
+                'embeddings': [embeddings[0]],
+                'documents': [content],
+                'metadatas': [{
                     "content_hash": content_hash,
                     "chunk_index": 0,
                     "chunk_count": 1,
                     "created_at": created_at
                 }]
-            )
-
-            return doc_id
-
-        # multiple chunks, create parent doc
-        parent_id = self._get_next_id()
-        parent_embedding = self._generate_embedding(content, api_key)
+            }
 
-        self.collection.add(
-            ids=[str(parent_id)],
-            embeddings=[parent_embedding],
-            documents=[content],
-            metadatas=[{
+        records = {
+            'ids': [str(doc_id)],
+            'embeddings': [embeddings[0]],
+            'documents': [content],
+            'metadatas': [{
                 "content_hash": content_hash,
                 "chunk_index": -1,
                 "chunk_count": len(chunks),
                 "created_at": created_at
             }]
-        )
-
-        # add chunks
-        chunk_ids = []
-        chunk_embeddings = []
-        chunk_metadatas = []
-
-        for i, chunk in enumerate(chunks):
-            chunk_id = self._get_next_id()
-            chunk_ids.append(str(chunk_id))
-
-            embedding = self._generate_embedding(chunk, api_key)
-            chunk_embeddings.append(embedding)
-
-            chunk_metadatas.append({
-                "parent_id": parent_id,
+        }
+        for i, (chunk, embedding) in enumerate(zip(chunks, embeddings[1:])):
+            records['ids'].append(str(self._get_next_id()))
+            records['embeddings'].append(embedding)
+            records['documents'].append(chunk)
+            records['metadatas'].append({
+                "parent_id": doc_id,
                 "chunk_index": i,
                 "chunk_count": len(chunks),
                 "created_at": created_at
             })
+        return doc_id, records
 
-        self.collection.add(
-            ids=chunk_ids,
-            embeddings=chunk_embeddings,
-            documents=chunks,
-            metadatas=chunk_metadatas
-        )
+    def _write_records(self, records: Dict):
+        """Add records (from one or more documents) in a single Chroma write"""
+        self.store.write(lambda collection: collection.add(**records))
+        self._invalidate_index_version()
+
+    @service_error_handler(default_value=None, error_message_prefix="Error adding document")
+    def add_document(self, content: str, api_key: str) -> Optional[int]:
+        """Add a document to the RAG store, chunking if necessary"""
+        if not api_key:
+            logger.error("No API key provided for add_document")
+            return None
+
+        content_hash = self._hash_content(content)
+        created_at = datetime.now().isoformat()
+
+        existing = self._find_existing([content_hash])
+        if content_hash in existing:
+            doc_id = existing[content_hash]
+            logger.info(f"Document with hash {content_hash[:8]}... already exists (id={doc_id}), skipping duplicate")
+            return doc_id
+
+        start = time.perf_counter()
+        chunks = self._chunk_text(content)
 
-        return parent_id
+        # The whole document and every chunk, embedded together in batches
+        texts = [content] if len(chunks) == 1 else [content] + chunks
+        embed_start = time.perf_counter()
+        embed_stats = {}
+        embeddings = self._generate_embeddings(texts, api_key, embed_stats)
+        embed_seconds = time.perf_counter() - embed_start
+
+        doc_id, records = self._document_records(content, content_hash, chunks, embeddings, created_at)
+        self._write_records(records)
+        self._record_ingest(doc_id, len(chunks), embed_stats, embed_seconds, time.perf_counter() - start)
+
+        return doc_id
 
     @service_error_handler(default_value=False, error_message_prefix="Error deleting document")
     def delete_document(self, doc_id: int) -> bool:
         """Delete a document by ID (and all its chunks if it's a parent)"""
-        chunks = self.collection.get(
+        chunks = self.store.read(lambda collection: collection.get(
             where={"parent_id": doc_id}
-        )
+        ))
 
         ids_to_delete = [str(doc_id)]
         if chunks and chunks['ids']:
             ids_to_delete.extend(chunks['ids'])
 
         try:
-            self.collection.delete(ids=ids_to_delete)
+            self.store.write(lambda collection: collection.delete(ids=ids_to_delete))
+            self._invalidate_index_version()
             return True
         except Exception as e:
             logger.error(f"Error deleting from ChromaDB: {e}")
@@ -229,13 +442,13 @@ class RAGService:
                      If False, returns only parent/standalone documents
         """
         if show_all:
-            result = self.collection.get(include=['documents', 'metadatas'])
+            result = self.store.read(lambda collection: collection.get(include=['documents', 'metadatas']))
         else:
             # Get only parent/standalone docs (chunk_index <= 0)
-            result = self.collection.get(
+            result = self.store.read(lambda collection: collection.get(
                 where={"chunk_index": {"$lte": 0}},
                 include=['documents', 'metadatas']
-            )
+            ))
 
         if not result or not result['ids']:
             return []
@@ -272,10 +485,10 @@ class RAGService:
         """Get all searchable chunks (excludes parent documents with chunk_index=-1)"""
 
         # get docs where chunk_index >= 0 (actual chunks, not parent docs)
-        result = self.collection.get(
+        result = self.store.read(lambda collection: collection.get(
             where={"chunk_index": {"$gte": 0}},
             include=['documents', 'metadatas']
-        )
+        ))
 
         if not result or not result['ids']:
             return []
@@ -310,24 +523,54 @@ class RAGService:
         query_embedding = self._generate_embedding(query, api_key)
         log.info("[RAG] Query embedding generated")
 
-        log.info("[RAG] Getting ChromaDB connection...")
-        client, collection = self._get_collection()
+        return self.retrieve_by_embedding(query, query_embedding, top_k, min_similarity)
+
+    async def retrieve_async(self, query: str, api_key: str, top_k: int = 20, min_similarity: float = 0.5,
+                             timings: Optional[Dict[str, float]] = None) -> List[Dict]:
+        """
+        Async retrieve(): the query embedding uses the async client and the
+        ChromaDB query runs in the executor. Cancelling the task while the
+        embedding is in flight abandons the retrieval.
+
+        Args:
+            timings: Optional dict that receives 'embedding' and 'vector_query' durations in ms
+        """
+        if not api_key:
+            logger.error("[RAG] No API key provided for retrieve")
+            return []
 
         try:
-            log.info("[RAG] Querying ChromaDB...")
-            results = collection.query(
+            start = time.perf_counter()
+            query_embedding = await self._generate_embedding_async(query, api_key)
+            if timings is not None:
+                timings['embedding'] = (time.perf_counter() - start) * 1000
+
+            start = time.perf_counter()
+            docs = await asyncio.to_thread(self.retrieve_by_embedding, query, query_embedding, top_k, min_similarity)
+            if timings is not None:
+                timings['vector_query'] = (time.perf_counter() - start) * 1000
+            return docs
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Error during retrieval: {e}")
+            return []
+
+    @service_error_handler(default_value=[], error_message_prefix="Error during retrieval")
+    def retrieve_by_embedding(self, query: str, query_embedding: List[float], top_k: int = 20,
+                              min_similarity: float = 0.5) -> List[Dict]:
+        """Query ChromaDB with a precomputed query embedding"""
+        try:
+            logger.info("[RAG] Querying ChromaDB...")
+            results = self.store.read(lambda collection: collection.query(
                 query_embeddings=[query_embedding],
                 n_results=top_k,
                 include=['documents', 'distances', 'metadatas']
-            )
-            log.info("[RAG] ChromaDB query complete")
+            ))
+            logger.info("[RAG] ChromaDB query complete")
         except Exception as e:
-            log.error(f"[RAG] ChromaDB query failed: {e}")
+            logger.error(f"[RAG] ChromaDB query failed: {e}")
             return []
-        finally:
-            # Close connection after operation to release locks
-            self._close_collection()
-            log.info("[RAG] ChromaDB connection closed")
 
         retrieved_docs = []
         if results['ids'] and len(results['ids'][0]) > 0:
@@ -360,25 +603,10 @@ class RAGService:
 
         return retrieved_docs
 
-    def format_context(self, documents: List[Dict], max_length: int = 2000) -> str:
-        """Format retrieved documents into context string"""
-        if not documents:
-            return ""
-
-        context_parts = ["## RELEVANT CONTEXT:\n"]
-        current_length = len(context_parts[0])
-
-        for i, doc in enumerate(documents, 1):
-            content = doc.get('content', '')
-            doc_text = f"\n[{i}]\n{content}\n"
-
-            if current_length + len(doc_text) > max_length:
-                break
-
-            context_parts.append(doc_text)
-            current_length += len(doc_text)
-
-        return "".join(context_parts)
+    def format_context(self, documents: List[Dict], max_tokens: int = 500) -> str:
+        """Format the highest-similarity documents that fit in max_tokens into a context string"""
+        context, _ = pack_context(documents, max_tokens)
+        return context
 
     def set_enabled(self, enabled: bool) -> bool:
         """Store RAG enabled state"""
@@ -0,0 +1,217 @@
+"""
+Adaptive rate limiting and retries for Gemini API calls
+
+Every (API key, model) pair gets a token bucket. A call reserves a token
+before it is made; when the bucket is empty the caller waits for its turn
+instead of sending a request that the quota would reject.
+
+The bucket rate adapts to the quota (AIMD): each 429 / RESOURCE_EXHAUSTED
+response halves it, each success raises it by a fixed step back toward the
+configured ceiling. Rate-limited and transient server errors are retried with
+full-jitter exponential backoff until a deadline.
+"""
+import asyncio
+import hashlib
+import logging
+import random
+import threading
+import time
+
+from services.config_service import config
+from services.latency_histogram import LatencyHistogram
+
+logger = logging.getLogger(__name__)
+
+RETRYABLE_STATUS_CODES = (429, 500, 502, 503, 504)
+
+
+class RateLimitExceeded(Exception):
+    """Retries were exhausted (or the deadline passed) while the API kept throttling"""
+
+
+def _status_code(error):
+    code = getattr(error, 'code', None)
+    if isinstance(code, int):
+        return code
+    if 'RESOURCE_EXHAUSTED' in str(error):
+        return 429
+    return None
+
+
+def is_rate_limit_error(error):
+    return _status_code(error) == 429
+
+
+def is_retryable_error(error):
+    return _status_code(error) in RETRYABLE_STATUS_CODES
+
+
+class _Bucket:
+    """Token bucket whose refill rate is adjusted additively up / multiplicatively down"""
+
+    DECREASE_FACTOR = 0.5
+    INCREASE_FRACTION = 0.05  # of the ceiling, per successful call
+    MIN_RATE = 0.05  # requests/second
+
+    def __init__(self, max_rate, burst):
+        self.max_rate = max_rate
+        self.burst = burst
+        self.rate = max_rate
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _refill(self, now):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self, max_rate, burst):
+        """Take a token; returns how long the caller must wait before using it"""
+        with self.lock:
+            now = time.monotonic()
+            self._refill(now)
+            # Pick up configuration changes
+            if max_rate != self.max_rate:
+                self.max_rate = max_rate
+                self.rate = min(self.rate, max_rate)
+            self.burst = burst
+            self.tokens -= 1
+            # A negative balance is a queue of reservations paid off by the refill
+            return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+    def on_success(self):
+        with self.lock:
+            self.rate = min(self.max_rate, self.rate + self.max_rate * self.INCREASE_FRACTION)
+
+    def on_throttled(self):
+        with self.lock:
+            self._refill(time.monotonic())
+            self.rate = max(self.MIN_RATE, self.rate * self.DECREASE_FACTOR)
+            # Stop any remaining burst from hitting the quota again
+            self.tokens = min(self.tokens, 0.0)
+
+
+class RateLimiter:
+    """Per (API key, model) adaptive token buckets with retrying call wrappers"""
+
+    BACKOFF_BASE_SECONDS = 0.5
+    BACKOFF_CAP_SECONDS = 20.0
+
+    def __init__(self, limits, deadline, max_attempts=6):
+        """
+        Args:
+            limits: Callable returning (max requests/second, burst) for new and existing buckets
+            deadline: Callable returning the retry deadline in seconds
+            max_attempts: Maximum tries per call, including the first
+        """
+        self._limits = limits
+        self._deadline = deadline
+        self.max_attempts = max_attempts
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+        self._stats = {'calls': 0, 'waits': 0, 'wait_ms_total': 0.0, 'throttled': 0, 'retries': 0, 'gave_up': 0}
+        self._wait_histogram = LatencyHistogram()
+
+    @staticmethod
+    def _bucket_key(api_key, model):
+        return hashlib.sha256(api_key.encode()).hexdigest()[:12], model
+
+    def _reserve(self, api_key, model):
+        key = self._bucket_key(api_key, model)
+        max_rate, burst = self._limits()
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = _Bucket(max_rate, burst)
+        return bucket, bucket.reserve(max_rate, burst)
+
+    def _record_wait(self, wait):
+        with self._lock:
+            self._stats['calls'] += 1
+            if wait > 0:
+                self._stats['waits'] += 1
+                self._stats['wait_ms_total'] += wait * 1000
+            self._wait_histogram.record(wait * 1000)
+
+    def _backoff(self, attempt):
+        return random.uniform(0, min(self.BACKOFF_CAP_SECONDS, self.BACKOFF_BASE_SECONDS * 2 ** attempt))
+
+    def _handle_error(self, error, bucket, attempt, started, label):
+        """Decide whether to retry; returns the backoff delay or re-raises"""
+        if not is_retryable_error(error):
+            raise error
+
+        throttled = is_rate_limit_error(error)
+        if throttled:
+            bucket.on_throttled()
+
+        delay = self._backoff(attempt)
+        deadline = self._deadline()
+        with self._lock:
+            if throttled:
+                self._stats['throttled'] += 1
+            out_of_time = attempt + 1 >= self.max_attempts or time.monotonic() - started + delay > deadline
+            self._stats['gave_up' if out_of_time else 'retries'] += 1
+
+        if out_of_time:
+            if throttled:
+                raise RateLimitExceeded(f"{label}: still rate limited after {attempt + 1} attempts") from error
+            raise error
+
+        logger.warning(f"[RATE LIMIT] {label} failed ({error}); retry {attempt + 1} in {delay:.2f}s")
+        return delay
+
+    def call(self, fn, api_key, model):
+        """Call fn() under the (api_key, model) rate limit, retrying throttled/transient errors"""
+        started = time.monotonic()
+        for attempt in range(self.max_attempts):
+            bucket, wait = self._reserve(api_key, model)
+            self._record_wait(wait)
+            if wait > 0:
+                time.sleep(wait)
+            try:
+                result = fn()
+            except Exception as e:
+                time.sleep(self._handle_error(e, bucket, attempt, started, model))
+                continue
+            bucket.on_success()
+            return result
+
+    async def call_async(self, fn, api_key, model):
+        """Async call(): fn is a zero-argument coroutine function"""
+        started = time.monotonic()
+        for attempt in range(self.max_attempts):
+            bucket, wait = self._reserve(api_key, model)
+            self._record_wait(wait)
+            if wait > 0:
+                await asyncio.sleep(wait)
+            try:
+                result = await fn()
+            except Exception as e:
+                await asyncio.sleep(self._handle_error(e, bucket, attempt, started, model))
+                continue
+            bucket.on_success()
+            return result
+
+    def get_stats(self):
+        with self._lock:
+            max_rate, burst = self._limits()
+            return {
+                **self._stats,
+                'wait_ms_total': round(self._stats['wait_ms_total'], 2),
+                'wait_ms': self._wait_histogram.summary(),
+                'max_rate_per_second': max_rate,
+                'burst': burst,
+                'buckets': [
+                    {'key': key_hash, 'model': model, 'rate_per_second': round(bucket.rate, 3)}
+                    for (key_hash, model), bucket in self._buckets.items()
+                ]
+            }
+
+
+# Global limiter shared by LLM generation and embedding calls
+rate_limiter = RateLimiter(
+    limits=lambda: (config.get_llm_rate_limit(), config.get_llm_rate_burst()),
+    deadline=config.get_llm_retry_deadline
+)
@@ -0,0 +1,246 @@
+"""
+Incrementally maintained vector index for the semantic prompt cache
+
+Prompts are embedded once, on cache insert, with a stateless HashingVectorizer
+(L2-normalised term frequencies), so a lookup is a sparse dot product against
+the stored vectors instead of refitting a TF-IDF model over every cached prompt.
+
+Vectors are persisted next to the cache rows in the `semantic_index` table and
+loaded into memory lazily, one partition per operation type. Model and
+metadata are matched per candidate, only for entries that clear the
+similarity threshold.
+"""
+import logging
+import threading
+from collections import namedtuple
+
+import numpy as np
+from scipy import sparse
+from sklearn.feature_extraction.text import HashingVectorizer
+
+from utils import parse_metadata_json
+
+logger = logging.getLogger(__name__)
+
+IndexEntry = namedtuple('IndexEntry', [
+    'prompt_hash', 'operation_type', 'model', 'metadata', 'created_at', 'vector'
+])
+
+
+class _Partition:
+    """In-memory vectors for one operation type"""
+
+    def __init__(self):
+        self.entries = []
+        self.positions = {}
+        self._matrix = None
+
+    def upsert(self, entry):
+        position = self.positions.get(entry.prompt_hash)
+        if position is None:
+            self.positions[entry.prompt_hash] = len(self.entries)
+            self.entries.append(entry)
+        else:
+            self.entries[position] = entry
+        self._matrix = None
+
+    def remove(self, predicate):
+        kept = [entry for entry in self.entries if not predicate(entry)]
+        removed = len(self.entries) - len(kept)
+        if removed:
+            self.entries = kept
+            self.positions = {entry.prompt_hash: i for i, entry in enumerate(kept)}
+            self._matrix = None
+        return removed
+
+    def snapshot(self):
+        """Stacked vectors and the entries they belong to, rebuilt only after changes"""
+        if self._matrix is None and self.entries:
+            self._matrix = sparse.vstack([entry.vector for entry in self.entries], format='csr')
+        return self._matrix, list(self.entries)
+
+
+class SemanticIndex:
+    """Sparse-vector index over cached prompts, partitioned by operation type"""
+
+    N_FEATURES = 2 ** 18
+
+    def __init__(self, pool, decode=None):
+        self._pool = pool
+        # Cached prompts may be stored compressed; decode is applied before backfilling
+        self._decode = decode or (lambda value: value)
+        self._vectorizer = HashingVectorizer(
+            n_features=self.N_FEATURES,
+            lowercase=True,
+            stop_words='english',
+            alternate_sign=False,
+            norm='l2'
+        )
+        self._partitions = {}
+        self._lock = threading.RLock()
+
+    @staticmethod
+    def create_schema(cursor):
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS semantic_index (
+                prompt_hash TEXT PRIMARY KEY,
+                operation_type TEXT NOT NULL,
+                model TEXT,
+                metadata TEXT,
+                created_at TIMESTAMP NOT NULL,
+                feature_indices BLOB NOT NULL,
+                feature_values BLOB NOT NULL
+            )
+        ''')
+
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_semantic_operation ON semantic_index(operation_type)
+        ''')
+
+    def _vectorize(self, text):
+        return self._vectorizer.transform([text]).tocsr()
+
+    def _to_vector(self, indices_blob, values_blob):
+        indices = np.frombuffer(indices_blob, dtype=np.int32)
+        values = np.frombuffer(values_blob, dtype=np.float32)
+        return sparse.csr_matrix(
+            (values, indices, np.array([0, len(indices)], dtype=np.int32)),
+            shape=(1, self.N_FEATURES)
+        )
+
+    def build_entry(self, prompt_hash, prompt, operation_type, model, metadata_json, created_at):
+        """Vectorize a prompt for insertion; cheap enough to run on every cache set"""
+        return IndexEntry(
+            prompt_hash, operation_type, model, parse_metadata_json(metadata_json),
+            created_at, self._vectorize(prompt)
+        )
+
+    def persist(self, cursor, entry, metadata_json):
+        """Write an entry inside the caller's cache transaction"""
+        cursor.execute('''
+            INSERT OR REPLACE INTO semantic_index (
+                prompt_hash, operation_type, model, metadata, created_at,
+                feature_indices, feature_values
+            ) VALUES (?, ?, ?, ?, ?, ?, ?)
+        ''', (
+            entry.prompt_hash, entry.operation_type, entry.model, metadata_json, entry.created_at,
+            entry.vector.indices.astype(np.int32).tobytes(),
+            entry.vector.data.astype(np.float32).tobytes()
+        ))
+
+    def add(self, entry):
+        """Apply a committed entry to the loaded partition (unloaded ones pick it up from disk)"""
+        with self._lock:
+            partition = self._partitions.get(entry.operation_type)
+            if partition is not None:
+                partition.upsert(entry)
+
+    def remove(self, prompt_hashes):
+        """Drop entries from memory after their cache rows were deleted"""
+        prompt_hashes = set(prompt_hashes)
+        with self._lock:
+            for partition in self._partitions.values():
+                partition.remove(lambda entry: entry.prompt_hash in prompt_hashes)
+
+    def purge_before(self, not_before):
+        """Drop in-memory entries created before the given ISO timestamp"""
+        with self._lock:
+            for partition in self._partitions.values():
+                partition.remove(lambda entry: entry.created_at < not_before)
+
+    def clear(self):
+        with self._lock:
+            self._partitions.clear()
+
+    def _load_partition(self, operation_type):
+        """Load stored vectors for an operation type, backfilling rows cached before the index existed"""
+        partition = _Partition()
+
+        with self._pool.connection() as (conn, cursor):
+            cursor.execute('''
+                SELECT pc.prompt_hash, pc.prompt, pc.model, pc.metadata, pc.created_at
+                FROM prompt_cache pc
+                LEFT JOIN semantic_index si ON si.prompt_hash = pc.prompt_hash
+                WHERE pc.operation_type = ? AND si.prompt_hash IS NULL
+            ''', (operation_type,))
+            missing = cursor.fetchall()
+
+            for prompt_hash, prompt, model, metadata_json, created_at in missing:
+                entry = self.build_entry(
+                    prompt_hash, self._decode(prompt), operation_type, model, metadata_json, created_at
+                )
+                self.persist(cursor, entry, metadata_json)
+
+            cursor.execute('''
+                SELECT si.prompt_hash, si.model, si.metadata, si.created_at,
+                       si.feature_indices, si.feature_values
+                FROM semantic_index si
+                JOIN prompt_cache pc ON pc.prompt_hash = si.prompt_hash
+                WHERE si.operation_type = ?
+            ''', (operation_type,))
+
+            for prompt_hash, model, metadata_json, created_at, indices, values in cursor.fetchall():
+                partition.upsert(IndexEntry(
+                    prompt_hash, operation_type, model, parse_metadata_json(metadata_json),
+                    created_at, self._to_vector(indices, values)
+                ))
+
+        if missing:
+            logger.info(f"Backfilled {len(missing)} semantic index entries for {operation_type}")
+        return partition
+
+    def _get_partition(self, operation_type):
+        with self._lock:
+            partition = self._partitions.get(operation_type)
+            if partition is None:
+                partition = self._load_partition(operation_type)
+                self._partitions[operation_type] = partition
+            return partition
+
+    def search(self, prompt, operation_type, threshold, not_before, model=None, metadata=None):
+        """
+        Find the most similar cached prompt at or above the threshold.
+
+        Args:
+            prompt: Prompt to look up
+            operation_type: Partition to search
+            threshold: Minimum cosine similarity
+            not_before: ISO timestamp; older entries are treated as expired
+            model: Only match entries for this model (model-aware caching)
+            metadata: Only match entries whose metadata contains all of these fields
+
+        Returns:
+            (prompt_hash, similarity) or None
+        """
+        with self._lock:
+            matrix, entries = self._get_partition(operation_type).snapshot()
+
+        if matrix is None:
+            return None
+
+        query = self._vectorize(prompt)
+        similarities = np.asarray((matrix @ query.T).todense()).ravel()
+
+        candidates = np.flatnonzero(similarities >= threshold)
+        for idx in candidates[np.argsort(-similarities[candidates], kind='stable')]:
+            entry = entries[idx]
+            if entry.created_at <= not_before:
+                continue
+            if model and entry.model != model:
+                continue
+            if metadata:
+                if not entry.metadata or not isinstance(entry.metadata, dict):
+                    continue
+                if not all(entry.metadata.get(key) == value for key, value in metadata.items()):
+                    continue
+            return entry.prompt_hash, float(similarities[idx])
+
+        return None
+
+    def get_stats(self):
+        with self._lock:
+            return {
+                'loaded_partitions': len(self._partitions),
+                'indexed_entries': sum(len(p.entries) for p in self._partitions.values()),
+                'n_features': self.N_FEATURES
+            }
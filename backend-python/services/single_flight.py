@@ -0,0 +1,171 @@
+"""
+Single-flight coalescing of identical concurrent calls
+
+The first caller for a key (the leader) runs the function; callers arriving
+with the same key while it is in flight wait for the leader and share its
+result instead of repeating the work. A follower that waits longer than the
+timeout gives up on the leader and runs the function itself.
+
+do() serves threads; do_async() serves coroutines. Async calls only coalesce
+with other calls on the same event loop.
+"""
+import asyncio
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+class _AsyncCall:
+    def __init__(self, loop):
+        self.loop = loop
+        self.future = loop.create_future()
+        # Followers may all have timed out; don't warn about an unread exception
+        self.future.add_done_callback(lambda f: f.cancelled() or f.exception())
+        self.waiters = 0
+
+
+class SingleFlight:
+    """Deduplicates concurrent calls that share a key"""
+
+    def __init__(self, wait_timeout=120.0):
+        self.wait_timeout = wait_timeout
+        self._calls = {}
+        self._async_calls = {}
+        self._lock = threading.Lock()
+
+        self._executions = 0
+        self._coalesced = 0
+        self._timeouts = 0
+
+    def do(self, key, fn, timeout=None):
+        """
+        Run fn() once per key among concurrent callers.
+
+        Args:
+            key: Identity of the call (e.g. the prompt cache hash)
+            fn: Zero-argument callable producing the result
+            timeout: Seconds a follower waits for the leader (defaults to wait_timeout)
+
+        Returns:
+            (result, shared) where shared is True if the result came from another caller's call
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = _Call()
+                self._calls[key] = call
+                self._executions += 1
+            else:
+                call.waiters += 1
+
+        if leader:
+            try:
+                call.result = fn()
+                return call.result, False
+            except BaseException as e:
+                call.error = e
+                raise
+            finally:
+                with self._lock:
+                    self._calls.pop(key, None)
+                call.done.set()
+
+        wait_timeout = self.wait_timeout if timeout is None else timeout
+        if not call.done.wait(wait_timeout):
+            with self._lock:
+                self._timeouts += 1
+                self._executions += 1
+            logger.warning(f"Single-flight wait timed out after {wait_timeout}s, executing independently")
+            return fn(), False
+
+        with self._lock:
+            self._coalesced += 1
+        if call.error is not None:
+            raise call.error
+        return call.result, True
+
+    async def do_async(self, key, fn, timeout=None):
+        """
+        Coroutine version of do(): await fn() once per key among concurrent callers.
+
+        Args:
+            key: Identity of the call (e.g. the prompt cache hash)
+            fn: Zero-argument coroutine function producing the result
+            timeout: Seconds a follower waits for the leader (defaults to wait_timeout)
+
+        Returns:
+            (result, shared) where shared is True if the result came from another caller's call
+        """
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            call = self._async_calls.get(key)
+            leader = call is None or call.loop is not loop
+            if call is None:
+                call = _AsyncCall(loop)
+                self._async_calls[key] = call
+            elif leader:
+                # In flight on another event loop; can't await its future from here
+                call = None
+            else:
+                call.waiters += 1
+            if leader:
+                self._executions += 1
+
+        if leader:
+            if call is None:
+                return await fn(), False
+            try:
+                result = await fn()
+                call.future.set_result(result)
+                return result, False
+            except asyncio.CancelledError:
+                call.future.cancel()
+                raise
+            except BaseException as e:
+                call.future.set_exception(e)
+                raise
+            finally:
+                with self._lock:
+                    self._async_calls.pop(key, None)
+
+        wait_timeout = self.wait_timeout if timeout is None else timeout
+        try:
+            result = await asyncio.wait_for(asyncio.shield(call.future), wait_timeout)
+        except asyncio.TimeoutError:
+            with self._lock:
+                self._timeouts += 1
+                self._executions += 1
+            logger.warning(f"Single-flight wait timed out after {wait_timeout}s, executing independently")
+            return await fn(), False
+        except asyncio.CancelledError:
+            if not call.future.cancelled():
+                raise
+            # The leader was cancelled, not us: do the work ourselves
+            with self._lock:
+                self._executions += 1
+            return await fn(), False
+
+        with self._lock:
+            self._coalesced += 1
+        return result, True
+
+    def get_stats(self):
+        with self._lock:
+            calls = list(self._calls.values()) + list(self._async_calls.values())
+            return {
+                'in_flight': len(calls),
+                'waiting': sum(call.waiters for call in calls),
+                'executions': self._executions,
+                'coalesced': self._coalesced,
+                'timeouts': self._timeouts
+            }
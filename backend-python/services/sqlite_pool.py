@@ -0,0 +1,246 @@
+"""
+Pooled SQLite connections shared by the cache and metrics stores
+
+Each database file gets one bounded pool of long-lived connections. Connections
+are opened once in WAL mode with tuned pragmas and keep their compiled
+statement cache between requests, instead of paying a connect/teardown cycle
+and a rollback-journal fsync on every call.
+
+Concurrency model:
+- A thread checks out one connection per `with pool.connection()` block and
+  returns it to the idle stack afterwards, so connections outlive the
+  short-lived request threads of the Flask server.
+- Nested blocks on the same thread reuse the connection already checked out;
+  only the outermost block commits or rolls back.
+- WAL lets readers run alongside the single writer; `busy_timeout` makes
+  writers queue on the lock instead of failing with "database is locked".
+"""
+import atexit
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 5000,
+    'cache_size': -16000,  # negative = KiB, so 16 MB of page cache per connection
+    'mmap_size': 268435456,  # 256 MB
+    'temp_store': 'MEMORY',
+}
+
+
+class SQLitePool:
+    """Bounded pool of reusable SQLite connections for a single database file"""
+
+    def __init__(self, db_path, max_connections=8, acquire_timeout=30.0,
+                 pragmas=None, cached_statements=256):
+        self.db_path = db_path
+        self.max_connections = max_connections
+        self.acquire_timeout = acquire_timeout
+        self.pragmas = dict(DEFAULT_PRAGMAS if pragmas is None else pragmas)
+        self.cached_statements = cached_statements
+
+        self._idle = queue.LifoQueue()
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._all_connections = []
+        self._closed = False
+        self._journal_mode = None
+
+        self._stats = {
+            'connections_created': 0,
+            'checkouts': 0,
+            'reentrant_checkouts': 0,
+            'waits': 0,
+            'wait_time_ms': 0.0,
+            'commits': 0,
+            'rollbacks': 0,
+            'discarded': 0,
+        }
+
+    def _connect(self):
+        conn = sqlite3.connect(
+            self.db_path,
+            timeout=self.pragmas.get('busy_timeout', 5000) / 1000,
+            check_same_thread=False,
+            cached_statements=self.cached_statements
+        )
+        for name, value in self.pragmas.items():
+            row = conn.execute(f'PRAGMA {name}={value}').fetchone()
+            if name == 'journal_mode' and row:
+                self._journal_mode = row[0]
+        return conn
+
+    def _acquire(self):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+
+        with self._lock:
+            if self._closed:
+                raise sqlite3.ProgrammingError(f"Connection pool for {self.db_path} is closed")
+            if len(self._all_connections) < self.max_connections:
+                conn = self._connect()
+                self._all_connections.append(conn)
+                self._stats['connections_created'] += 1
+                return conn
+
+        # Pool exhausted - wait for another thread to return a connection
+        start = time.perf_counter()
+        try:
+            conn = self._idle.get(timeout=self.acquire_timeout)
+        except queue.Empty:
+            raise TimeoutError(
+                f"Timed out after {self.acquire_timeout}s waiting for a connection to {self.db_path}"
+            )
+        with self._lock:
+            self._stats['waits'] += 1
+            self._stats['wait_time_ms'] += (time.perf_counter() - start) * 1000
+        return conn
+
+    def _release(self, conn, healthy=True):
+        if healthy and not self._closed:
+            self._idle.put(conn)
+            return
+
+        with self._lock:
+            if conn in self._all_connections:
+                self._all_connections.remove(conn)
+            if not healthy:
+                self._stats['discarded'] += 1
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
+
+    @contextmanager
+    def connection(self, row_factory=None):
+        """
+        Check out a pooled connection for the duration of the block.
+
+        Mirrors `utils.sqlite_connection`: yields (conn, cursor), commits on
+        success and rolls back on error, but returns the connection to the
+        pool instead of closing it.
+
+        Usage:
+            with pool.connection(row_factory=sqlite3.Row) as (conn, cursor):
+                cursor.execute('SELECT * FROM table')
+                rows = cursor.fetchall()
+        """
+        held = getattr(self._local, 'conn', None)
+        if held is not None:
+            # Reentrant use on this thread - share the outer block's transaction
+            self._local.depth += 1
+            with self._lock:
+                self._stats['reentrant_checkouts'] += 1
+            cursor = held.cursor()
+            cursor.row_factory = row_factory
+            try:
+                yield held, cursor
+            finally:
+                cursor.close()
+                self._local.depth -= 1
+            return
+
+        conn = self._acquire()
+        self._local.conn = conn
+        self._local.depth = 1
+        with self._lock:
+            self._stats['checkouts'] += 1
+
+        cursor = conn.cursor()
+        cursor.row_factory = row_factory
+        healthy = True
+        try:
+            yield conn, cursor
+            conn.commit()
+            with self._lock:
+                self._stats['commits'] += 1
+        except Exception as e:
+            try:
+                conn.rollback()
+            except sqlite3.Error:
+                healthy = False
+            with self._lock:
+                self._stats['rollbacks'] += 1
+            logger.error(f"Database error in {self.db_path}, rolling back: {e}")
+            raise
+        finally:
+            cursor.close()
+            self._local.conn = None
+            self._local.depth = 0
+            self._release(conn, healthy)
+
+    def close(self):
+        """Close every pooled connection; later checkouts raise"""
+        with self._lock:
+            self._closed = True
+            connections = list(self._all_connections)
+            self._all_connections.clear()
+        for conn in connections:
+            try:
+                conn.close()
+            except sqlite3.Error:
+                pass
+        while True:
+            try:
+                self._idle.get_nowait()
+            except queue.Empty:
+                break
+
+    def get_stats(self):
+        """Pool usage counters for the admin/observability endpoints"""
+        with self._lock:
+            stats = dict(self._stats)
+            open_connections = len(self._all_connections)
+        idle = self._idle.qsize()
+        stats.update({
+            'db_path': self.db_path,
+            'journal_mode': self._journal_mode,
+            'max_connections': self.max_connections,
+            'open_connections': open_connections,
+            'idle_connections': idle,
+            'in_use_connections': max(open_connections - idle, 0),
+            'wait_time_ms': round(stats['wait_time_ms'], 2),
+        })
+        return stats
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(db_path, **kwargs):
+    """Return the shared pool for a database file, creating it on first use"""
+    key = db_path if db_path == ':memory:' else os.path.abspath(db_path)
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None or pool._closed:
+            pool = SQLitePool(db_path, **kwargs)
+            _pools[key] = pool
+        return pool
+
+
+def get_all_pool_stats():
+    """Stats for every pool created in this process"""
+    with _pools_lock:
+        pools = list(_pools.values())
+    return [pool.get_stats() for pool in pools]
+
+
+@atexit.register
+def close_all_pools():
+    """Close every pool; registered to run at interpreter shutdown"""
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.close()
@@ -0,0 +1,102 @@
+"""
+Local token estimation and token-budgeted prompt assembly
+
+The estimator approximates Gemini's tokenizer without a network round trip:
+words cost one token per ~4 characters, punctuation one token each and each
+line break (with its indentation) one token. It is used wherever the API's
+usage metadata isn't available, and to pack prompts.
+
+The assembler keeps the formatted template (with the user's code) intact and
+fills the rest of the model's budget with RAG chunks, highest similarity
+first. A chunk that doesn't fit is skipped and smaller, lower-ranked chunks
+may still be used.
+"""
+import math
+import re
+from typing import Dict, List, Tuple
+
+TOKEN_PATTERN = re.compile(r"\w+|[^\w\s]|\n[ \t]*")
+CHARS_PER_TOKEN = 4
+
+CONTEXT_HEADER = "## RELEVANT CONTEXT:\n"
+CONTEXT_SEPARATOR = "\n\n"
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimate how many tokens a text costs"""
+    if not text:
+        return 0
+    tokens = 0
+    for piece in TOKEN_PATTERN.findall(text):
+        if piece[0].isalnum() or piece[0] == '_':
+            tokens += math.ceil(len(piece) / CHARS_PER_TOKEN)
+        else:
+            tokens += 1
+    return tokens
+
+
+def _format_chunk(index: int, content: str) -> str:
+    return f"\n[{index}]\n{content}\n"
+
+
+def pack_context(documents: List[Dict], max_tokens: int) -> Tuple[str, List[Dict]]:
+    """
+    Format the best-ranked documents that fit in max_tokens.
+
+    Args:
+        documents: Retrieved documents with 'content' and 'similarity_score'
+        max_tokens: Token budget for the whole context block
+
+    Returns:
+        (context, included) where context is "" when nothing fits
+    """
+    ranked = sorted(documents, key=lambda doc: doc.get('similarity_score', 0), reverse=True)
+    remaining = max_tokens - estimate_tokens(CONTEXT_HEADER)
+
+    parts = []
+    included = []
+    for doc in ranked:
+        chunk = _format_chunk(len(included) + 1, doc.get('content', ''))
+        cost = estimate_tokens(chunk)
+        if cost > remaining:
+            continue
+        parts.append(chunk)
+        included.append(doc)
+        remaining -= cost
+
+    if not included:
+        return "", []
+    return CONTEXT_HEADER + "".join(parts), included
+
+
+def assemble_prompt(prompt: str, documents: List[Dict], budget: int) -> Tuple[str, List[Dict], Dict]:
+    """
+    Append as much RAG context to a prompt as the token budget allows.
+
+    The prompt itself is never cut; if it alone exceeds the budget no context
+    is added.
+
+    Args:
+        prompt: Formatted prompt (template plus code)
+        documents: Retrieved documents
+        budget: Token budget for the final prompt
+
+    Returns:
+        (prompt, included documents, info) where info has the budget, token
+        estimates and included/skipped chunk counts
+    """
+    prompt_tokens = estimate_tokens(prompt)
+    context_budget = budget - prompt_tokens - estimate_tokens(CONTEXT_SEPARATOR)
+    context, included = pack_context(documents, context_budget) if context_budget > 0 else ("", [])
+
+    if context:
+        prompt = f"{prompt}{CONTEXT_SEPARATOR}{context}"
+
+    return prompt, included, {
+        'budget': budget,
+        'prompt_tokens': prompt_tokens,
+        'context_tokens': estimate_tokens(context),
+        'estimated_tokens': estimate_tokens(prompt),
+        'chunks_included': len(included),
+        'chunks_skipped': len(documents) - len(included)
+    }
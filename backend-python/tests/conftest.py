@@ -29,6 +29,8 @@ def mock_services(monkeypatch):
     mock_logger.get_metrics.return_value = [{'id': 1, 'model': 'test'}]
     mock_logger.get_summary_stats.return_value = {'total_calls': 100}
     mock_logger.get_call_by_id.return_value = {'id': 1, 'prompt': 'test'}
+    mock_logger.latency.retention_minutes = 24 * 60
+    mock_logger.get_latency_stats.side_effect = lambda window_minutes=60: {'window_minutes': window_minutes, 'series': []}
 
     # Mock prompts loader
     mock_prompts = Mock()
@@ -49,10 +51,8 @@ def mock_services(monkeypatch):
     monkeypatch.setattr('services.logger', mock_logger)
     monkeypatch.setattr('prompts.loader.prompts', mock_prompts)
 
-    # Patch Google AI in code_routes
-    import sys
-    if 'routes.code_routes' in sys.modules:
-        monkeypatch.setattr('routes.code_routes.client', mock_genai_client)
+    # Patch the shared Google AI client registry (used by code_routes and the services)
+    monkeypatch.setattr('services.genai_clients.genai_clients.get', Mock(return_value=mock_genai_client))
 
 
 @pytest.fixture
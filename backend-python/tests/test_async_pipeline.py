@@ -0,0 +1,229 @@
+"""
+Tests for the async LLM pipeline and its ASGI entry point
+"""
+import asyncio
+import json
+from unittest.mock import AsyncMock, Mock
+
+import pytest
+
+import services.llm_service as llm_service
+
+
+@pytest.fixture
+def pipeline(monkeypatch):
+    mock_cache = Mock()
+    mock_cache.get.return_value = None
+    mock_cache._hash_prompt.return_value = 'flight-key'
+    mock_client = Mock()
+    response = Mock(text='```python\ndef f(): pass\n```')
+    response.usage_metadata.prompt_token_count = 5
+    response.usage_metadata.candidates_token_count = 3
+
+    async def generate(model, contents):
+        await asyncio.sleep(0.05)
+        return response
+
+    mock_client.aio.models.generate_content = AsyncMock(side_effect=generate)
+
+    monkeypatch.setattr(llm_service, 'cache', mock_cache)
+    monkeypatch.setattr(llm_service, 'observability_logger', Mock())
+    monkeypatch.setattr(llm_service.genai_clients, 'get', Mock(return_value=mock_client))
+    monkeypatch.setattr(llm_service.rag_service, 'is_enabled', Mock(return_value=False))
+    return mock_cache, mock_client
+
+
+def test_sync_wrapper_runs_async_pipeline(pipeline):
+    mock_cache, mock_client = pipeline
+
+    result = llm_service.process_test_cases('def f(): pass', 'key')
+
+    assert result['success'] is True
+    assert result['test_cases'] == 'def f(): pass'
+    assert result['tokens_sent'] == 5
+    mock_cache.set.assert_called_once()
+
+
+def test_concurrent_async_requests_share_the_event_loop(pipeline):
+    _, mock_client = pipeline
+
+    async def run():
+        return await asyncio.gather(*(
+            llm_service.process_code_modification_async('p', 'c', 'key') for _ in range(20)
+        ))
+
+    results = asyncio.run(run())
+
+    assert all(result['success'] for result in results)
+    # Identical requests coalesce into a single in-flight call
+    assert mock_client.aio.models.generate_content.await_count == 1
+    assert sum(1 for result in results if result.get('coalesced')) == 19
+
+
+def _asgi_post(path, payload, headers=()):
+    from asgi import application
+
+    messages = []
+    body = json.dumps(payload).encode()
+
+    async def receive():
+        return {'type': 'http.request', 'body': body, 'more_body': False}
+
+    async def send(message):
+        messages.append(message)
+
+    scope = {
+        'type': 'http', 'method': 'POST', 'path': path, 'query_string': b'',
+        'headers': [(b'content-type', b'application/json')] + list(headers),
+    }
+    asyncio.run(application(scope, receive, send))
+    status = messages[0]['status']
+    return status, json.loads(b''.join(m.get('body', b'') for m in messages[1:]))
+
+
+def test_asgi_job_endpoint(pipeline):
+    status, data = _asgi_post('/api/jobs/test-cases', {'code': 'def f(): pass'},
+                              headers=[(b'x-google-api-key', b'key')])
+
+    assert status == 200
+    assert data['result']['test_cases'] == 'def f(): pass'
+
+
+def test_asgi_job_endpoint_requires_api_key(pipeline):
+    status, data = _asgi_post('/api/jobs/leetcode', {'problem_number': '1'})
+
+    assert status == 400
+    assert data['success'] is False
+
+
+def test_asgi_falls_back_to_flask():
+    from asgi import application
+
+    messages = []
+
+    async def receive():
+        return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+    async def send(message):
+        messages.append(message)
+
+    scope = {'type': 'http', 'method': 'GET', 'path': '/health', 'query_string': b'', 'headers': [],
+             'http_version': '1.1', 'scheme': 'http', 'server': ('test', 80), 'root_path': ''}
+    asyncio.run(application(scope, receive, send))
+
+    assert messages[0]['status'] == 200
+    assert json.loads(b''.join(m.get('body', b'') for m in messages[1:])) == {'status': 'healthy'}
+
+
+@pytest.fixture
+def slow_retrieval(monkeypatch):
+    state = {'cancelled': False, 'completed': False}
+
+    async def retrieve_async(query, api_key, timings=None):
+        try:
+            await asyncio.sleep(0.3)
+        except asyncio.CancelledError:
+            state['cancelled'] = True
+            raise
+        state['completed'] = True
+        return [{'id': 1, 'content': 'doc', 'similarity_score': 0.9}]
+
+    monkeypatch.setattr(llm_service.rag_service, 'is_enabled', Mock(return_value=True))
+    monkeypatch.setattr(llm_service.rag_service, 'index_version', Mock(return_value='1:abc'))
+    monkeypatch.setattr(llm_service.rag_service, 'retrieve_async', retrieve_async)
+    return state
+
+
+def test_pre_rag_hit_cancels_retrieval(pipeline, slow_retrieval):
+    mock_cache, mock_client = pipeline
+    mock_cache.get_pre_rag.return_value = {
+        'response_text': 'cached', 'prompt': 'p', 'metadata': {}, 'rag_chunks': [], 'pre_rag_cache_hit': True
+    }
+
+    result = llm_service.process_leetcode('1', 'key')
+
+    assert result['pre_rag_cache_hit'] is True
+    assert result['retrieval_cancelled'] is True
+    assert all(isinstance(ms, (int, float)) for ms in result['stage_timings_ms'].values())
+    assert result['stage_timings_ms']['total'] < 300
+    assert slow_retrieval['cancelled'] and not slow_retrieval['completed']
+    mock_cache.get.assert_not_called()
+    mock_client.aio.models.generate_content.assert_not_called()
+
+
+def test_miss_reports_stage_timings(pipeline, slow_retrieval):
+    mock_cache, _ = pipeline
+    mock_cache.get_pre_rag.return_value = None
+
+    result = llm_service.process_leetcode('1', 'key')
+
+    timings = result['stage_timings_ms']
+    assert result['from_cache'] is False
+    assert result['rag_doc_count'] == 1
+    assert {'cache_probe', 'retrieval', 'cache_lookup', 'llm', 'total'} <= set(timings)
+    # The probe ran while retrieval was in flight, so it doesn't add to the critical path
+    assert timings['total'] < timings['retrieval'] + timings['cache_lookup'] + timings['llm'] + 100
+    assert mock_cache.get.call_args[0][0].endswith('## RELEVANT CONTEXT:\n\n[1]\ndoc\n')
+    assert result['prompt_budget']['chunks_included'] == 1
+
+
+def test_batch_dedups_and_only_fans_out_misses(pipeline):
+    mock_cache, mock_client = pipeline
+    in_flight = {'now': 0, 'peak': 0}
+
+    async def generate(model, contents):
+        in_flight['now'] += 1
+        in_flight['peak'] = max(in_flight['peak'], in_flight['now'])
+        await asyncio.sleep(0.05)
+        in_flight['now'] -= 1
+        return Mock(text=contents[-20:], usage_metadata=None)
+
+    mock_client.aio.models.generate_content = AsyncMock(side_effect=generate)
+    mock_cache._hash_prompt.side_effect = lambda prompt, *args: prompt
+    cached_prompt = llm_service._leetcode_task('1')['prompt']
+    mock_cache.get.side_effect = lambda prompt, *args, **kwargs: (
+        {'response_text': 'cached', 'prompt': prompt, 'metadata': {}} if prompt == cached_prompt else None
+    )
+
+    items = [{'type': 'leetcode', 'problem_number': str(n)} for n in (1, 2, 3, 4, 5, 2)]
+    items.append({'type': 'unknown'})
+    batch = llm_service.process_batch(items, 'key', concurrency=2)
+
+    results = batch['results']
+    assert batch['unique'] == 5
+    assert batch['duplicates'] == 1
+    assert batch['cache_hits'] == 1
+    assert batch['executed'] == 4
+    assert in_flight['peak'] <= 2
+    assert results[0]['from_cache'] is True
+    assert results[5]['duplicate_of'] == 1
+    assert results[5]['response'] == results[1]['response']
+    assert results[6]['success'] is False
+    assert mock_client.aio.models.generate_content.await_count == 4
+
+
+def test_missing_usage_count_falls_back_to_estimate(pipeline):
+    mock_cache, mock_client = pipeline
+    response = Mock(text='```python\ndef f(): pass\n```')
+    response.usage_metadata.prompt_token_count = 12
+    response.usage_metadata.candidates_token_count = None
+    mock_client.aio.models.generate_content = AsyncMock(return_value=response)
+
+    result = llm_service.process_test_cases('def f(): pass', 'key')
+
+    assert result['success'] is True
+    assert result['tokens_sent'] == 12
+    assert result['tokens_received'] == llm_service.estimate_tokens(response.text)
+    mock_cache.set.assert_called_once()
+    assert mock_cache.set.call_args.kwargs['tokens'] == 12 + result['tokens_received']
+    llm_service.observability_logger.log_llm_call.assert_called_once()
+
+
+def test_sync_wrapper_accepts_positional_arguments(pipeline):
+    mock_cache, _ = pipeline
+
+    result = llm_service._execute_llm_task('prompt', 'test_case_generation', 'gemini-2.5-flash', 'key', 'test_cases')
+
+    assert result['success'] is True
+    assert 'test_cases' in result
+    assert mock_cache.get.call_args[0][:2] == ('prompt', 'test_case_generation')
@@ -0,0 +1,162 @@
+"""
+Tests for PromptCache storage tiers
+"""
+import pytest
+
+from services.cache_service import PromptCache
+
+
+@pytest.fixture
+def prompt_cache(tmp_path):
+    return PromptCache(db_path=str(tmp_path / 'cache.db'), memory_max_entries=2)
+
+
+def test_exact_hit_served_from_memory(prompt_cache):
+    """set() writes through to the memory tier so the next get() skips SQLite"""
+    prompt_cache.set('solve 1', 'leetcode_solve', 'answer', metadata={'problem_number': '1'},
+                     model='m', use_cache=True, model_aware_cache=True)
+
+    result = prompt_cache.get('solve 1', 'leetcode_solve', 'm', use_cache=True, model_aware_cache=True)
+
+    assert result['response_text'] == 'answer'
+    assert result['metadata'] == {'problem_number': '1'}
+    memory_stats = prompt_cache.get_stats()['memory_tier']
+    assert memory_stats['hits'] == 1
+    assert memory_stats['misses'] == 0
+
+
+def test_memory_tier_is_bounded(prompt_cache):
+    """Least recently used entries are evicted but still served from SQLite"""
+    for i in range(3):
+        prompt_cache.set(f'p{i}', 'op', f'r{i}', model='m', use_cache=True, model_aware_cache=True)
+
+    assert prompt_cache.get_stats()['memory_tier']['evictions'] == 1
+
+    result = prompt_cache.get('p0', 'op', 'm', use_cache=True, model_aware_cache=True)
+    assert result['response_text'] == 'r0'
+    assert prompt_cache.get_stats()['memory_tier']['misses'] == 1
+
+
+def test_clear_all_invalidates_memory_tier(prompt_cache):
+    prompt_cache.set('p', 'op', 'r', model='m', use_cache=True, model_aware_cache=True)
+
+    prompt_cache.clear_all()
+
+    assert prompt_cache.get('p', 'op', 'm', use_cache=True, model_aware_cache=True) is None
+    assert prompt_cache.get_stats()['memory_tier']['entries'] == 0
+
+
+def test_semantic_lookup_uses_incremental_index(prompt_cache, monkeypatch):
+    """Near-duplicate prompts match through the index, filtered by metadata"""
+    from services.cache_service import config
+    monkeypatch.setattr(config, '_semantic_cache_enabled', True)
+    monkeypatch.setattr(config, '_semantic_similarity_threshold', 0.8)
+
+    base = 'Solve leetcode problem two sum using a hash map in python with comments'
+    prompt_cache.set(base, 'leetcode_solve', 'answer', metadata={'problem_number': '1'},
+                     model='m', use_cache=True, model_aware_cache=True)
+
+    # Loads the partition; later sets are applied to it in place
+    assert prompt_cache.get('unrelated text', 'leetcode_solve', 'm', use_cache=True,
+                            model_aware_cache=True) is None
+    prompt_cache.set(base + ' please', 'leetcode_solve', 'answer 2', metadata={'problem_number': '2'},
+                     model='m', use_cache=True, model_aware_cache=True)
+
+    result = prompt_cache.get(base + ' please and thanks', 'leetcode_solve', 'm', use_cache=True,
+                              model_aware_cache=True, metadata={'problem_number': '2'})
+
+    assert result['semantic_cache_hit'] is True
+    assert result['response_text'] == 'answer 2'
+    assert result['similarity_score'] >= 0.8
+    assert prompt_cache.get(base + ' thanks', 'leetcode_solve', 'm', use_cache=True,
+                            model_aware_cache=True, metadata={'problem_number': '3'}) is None
+
+
+def test_hit_bookkeeping_is_written_behind(prompt_cache):
+    """Hits are coalesced in memory and applied to access_count in one flush"""
+    prompt_cache.set('p', 'op', 'r', model='m', use_cache=True, model_aware_cache=True)
+    for _ in range(3):
+        prompt_cache.get('p', 'op', 'm', use_cache=True, model_aware_cache=True)
+
+    tracker_stats = prompt_cache._access_tracker.get_stats()
+    assert tracker_stats['pending_entries'] == 1
+    assert tracker_stats['pending_hits'] == 3
+
+    stats = prompt_cache.get_stats()
+    assert stats['total_accesses'] == 4
+    assert stats['access_tracker']['pending_entries'] == 0
+
+
+@pytest.mark.parametrize('policy,survivor', [
+    ('lru', 'p2'),
+    ('lfu', 'p0'),
+    ('cost', 'p1'),
+])
+def test_budget_eviction_policies(prompt_cache, monkeypatch, policy, survivor):
+    """Inserts past the entry budget evict the lowest-ranked entry for the policy"""
+    from services.cache_service import config
+    monkeypatch.setattr(config, '_cache_max_entries', 2)
+    monkeypatch.setattr(config, '_cache_eviction_policy', policy)
+
+    prompt_cache.set('p0', 'op', 'r0', model='m', use_cache=True, model_aware_cache=True, latency_ms=10)
+    prompt_cache.set('p1', 'op', 'r1', model='m', use_cache=True, model_aware_cache=True, latency_ms=90000)
+    for _ in range(5):
+        prompt_cache.get('p0', 'op', 'm', use_cache=True, model_aware_cache=True)
+    prompt_cache.set('p2', 'op', 'r2', model='m', use_cache=True, model_aware_cache=True, latency_ms=10)
+
+    stats = prompt_cache.get_stats()
+    assert stats['total_entries'] <= 2
+    assert stats['budget']['evictions'] >= 1
+    assert prompt_cache.get(survivor, 'op', 'm', use_cache=True, model_aware_cache=True) is not None
+
+
+def test_cost_policy_estimates_latency_from_tokens(prompt_cache, monkeypatch):
+    """Token-only entries are ranked by estimated milliseconds, not raw token counts"""
+    from services.cache_service import config
+    monkeypatch.setattr(config, '_cache_max_entries', 2)
+    monkeypatch.setattr(config, '_cache_eviction_policy', 'cost')
+
+    # ~2000ms of generation by the token estimate vs. a measured 1000ms
+    prompt_cache.set('p0', 'op', 'r0', model='m', use_cache=True, model_aware_cache=True, tokens=400)
+    prompt_cache.set('p1', 'op', 'r1', model='m', use_cache=True, model_aware_cache=True, latency_ms=1000)
+    prompt_cache.set('p2', 'op', 'r2', model='m', use_cache=True, model_aware_cache=True, latency_ms=1500)
+
+    assert prompt_cache.get('p0', 'op', 'm', use_cache=True, model_aware_cache=True) is not None
+    assert prompt_cache.get('p1', 'op', 'm', use_cache=True, model_aware_cache=True) is None
+
+
+def test_text_columns_are_stored_compressed(tmp_path):
+    """Rows round-trip through compression and legacy TEXT rows are migrated"""
+    db_path = str(tmp_path / 'legacy.db')
+    plain = PromptCache(db_path=db_path, compress=False)
+    plain.set('legacy prompt ' * 20, 'op', 'legacy response', model='m', use_cache=True, model_aware_cache=True)
+
+    compressed = PromptCache(db_path=db_path, memory_max_entries=0)
+    compressed.set('new prompt ' * 20, 'op', 'new response', model='m', use_cache=True, model_aware_cache=True)
+
+    with compressed._pool.connection() as (conn, cursor):
+        cursor.execute('SELECT DISTINCT typeof(prompt), typeof(response_text) FROM prompt_cache')
+        assert cursor.fetchall() == [('blob', 'blob')]
+
+    legacy = compressed.get('legacy prompt ' * 20, 'op', 'm', use_cache=True, model_aware_cache=True)
+    assert legacy['response_text'] == 'legacy response'
+    previews = {entry['prompt_preview'].split()[0] for entry in compressed.get_all_entries()}
+    assert previews == {'legacy', 'new'}
+
+
+def test_pre_rag_key_resolves_to_augmented_entry(prompt_cache):
+    """A pre-RAG alias serves the augmented entry until the RAG index version changes"""
+    augmented = 'solve 1\n\n## RELEVANT CONTEXT:\n[1]\nuse a hash map'
+    chunks = [{'id': 3, 'content': 'use a hash map', 'similarity_score': 0.9}]
+    prompt_cache.set(augmented, 'leetcode_solve', 'answer', model='m', use_cache=True, model_aware_cache=True)
+    prompt_cache.set_pre_rag('solve 1', 'leetcode_solve', 'v1', augmented, chunks, model='m',
+                             use_cache=True, model_aware_cache=True)
+
+    result = prompt_cache.get_pre_rag('solve 1', 'leetcode_solve', 'v1', model='m',
+                                      use_cache=True, model_aware_cache=True)
+    assert result['response_text'] == 'answer'
+    assert result['pre_rag_cache_hit'] is True
+    assert result['rag_chunks'] == chunks
+
+    assert prompt_cache.get_pre_rag('solve 1', 'leetcode_solve', 'v2', model='m',
+                                    use_cache=True, model_aware_cache=True) is None
@@ -0,0 +1,114 @@
+"""
+Tests for the long-lived Chroma collection handle
+"""
+import pytest
+
+from services.chroma_store import ChromaStore
+from services.config_service import config
+from services.providers.stub import StubProvider
+from services.rag_service import RAGService
+import services.rag_service as rag_module
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = ChromaStore(str(tmp_path / 'chroma'), 'test')
+    yield store
+    store.close()
+
+
+@pytest.fixture
+def stub_rag(monkeypatch):
+    stub = StubProvider(embedding_latency_ms=0)
+    monkeypatch.setattr(rag_module, 'get_provider', lambda: stub)
+    monkeypatch.setattr(config, '_embedding_cache_enabled', False)
+    monkeypatch.setattr(config, '_rag_doc_id_counter', 0)
+
+
+def test_operations_share_one_open(store):
+    store.write(lambda collection: collection.add(ids=['1'], embeddings=[[1.0, 0.0]], documents=['doc']))
+    for _ in range(3):
+        assert store.read(lambda collection: collection.get()['ids']) == ['1']
+
+    stats = store.get_stats()
+    assert stats['opens'] == 1
+    assert stats['reads'] == 3
+    assert stats['writes'] == 1
+    assert stats['in_flight'] == 0
+
+
+def test_failed_read_reopens_and_retries(store):
+    calls = []
+
+    def flaky(collection):
+        calls.append(collection)
+        if len(calls) == 1:
+            raise RuntimeError('connection lost')
+        return collection.count()
+
+    assert store.read(flaky) == 0
+    stats = store.get_stats()
+    assert stats['errors'] == 1
+    assert stats['reopens'] == 1
+    assert stats['opens'] == 2
+
+
+def test_failed_write_reopens_and_raises(store):
+    def broken(collection):
+        raise RuntimeError('disk full')
+
+    with pytest.raises(RuntimeError):
+        store.write(broken)
+    assert store.get_stats()['reopens'] == 1
+    assert store.get_stats()['open']
+
+
+def test_close_then_use_reopens(store):
+    store.open()
+    store.close()
+    assert not store.get_stats()['open']
+
+    assert store.read(lambda collection: collection.count()) == 0
+    assert store.get_stats()['opens'] == 2
+
+
+def test_rag_roundtrip_and_ids_after_restart(tmp_path, stub_rag):
+    path = str(tmp_path / 'chroma')
+    rag = RAGService(chroma_path=path)
+    doc_id = rag.add_document('def two_sum(nums, target): return []', 'key')
+    assert [doc['id'] for doc in rag.get_documents()] == [doc_id]
+    rag.close()
+
+    # A new process starts counting from zero; ids must continue after the stored ones
+    config._rag_doc_id_counter = 0
+    restarted = RAGService(chroma_path=path)
+    second_id = restarted.add_document('class LRUCache: pass', 'key')
+    assert second_id > doc_id
+
+    assert restarted.delete_document(doc_id)
+    assert [doc['id'] for doc in restarted.get_documents()] == [second_id]
+    assert restarted.store.get_stats()['opens'] == 1
+    restarted.close()
+
+
+def test_index_version_changes_on_writes_without_rescanning(tmp_path, stub_rag, monkeypatch):
+    rag = RAGService(chroma_path=str(tmp_path / 'chroma'))
+    base = rag.index_version()
+
+    scans = []
+    read = rag.store.read
+    monkeypatch.setattr(rag.store, 'read', lambda fn: scans.append(fn) or read(fn))
+
+    doc_id = rag.add_document('def two_sum(nums, target): return []', 'key')
+    after_add = rag.index_version()
+    rag.delete_document(doc_id)
+    after_delete = rag.index_version()
+
+    assert len({base, after_add, after_delete}) == 3
+    # Only the add's dedup check, id seeding and the delete's chunk lookup read the store
+    assert len(scans) == 3
+
+    # Once the TTL runs out the full fingerprint is recomputed and matches the stored ids again
+    monkeypatch.setattr(rag, 'INDEX_VERSION_TTL_SECONDS', -1)
+    assert rag.index_version() == base
+    rag.close()
@@ -0,0 +1,53 @@
+"""
+Tests for inline and process-pool chunking
+"""
+import pytest
+
+from services.chunk_pool import ChunkPool
+from services.config_service import config
+
+PARAGRAPH = ' '.join(f"Sentence {i} explains a sliding window step." for i in range(60))
+
+
+@pytest.fixture
+def pool():
+    pool = ChunkPool(chunk_size=512, chunk_overlap=128)
+    yield pool
+    pool.shutdown()
+
+
+def test_pool_matches_inline(pool, monkeypatch):
+    texts = [f"Note {i}. {PARAGRAPH}" for i in range(6)] + ['short note']
+    inline = [pool.chunk(text) for text in texts]
+
+    monkeypatch.setattr(config, '_chunking_workers', 2)
+    monkeypatch.setattr(config, '_chunking_inline_max_chars', 0)
+    pooled = pool.chunk_many(texts)
+
+    assert pooled == inline
+    assert all(isinstance(chunk, str) for chunks in pooled for chunk in chunks)
+    assert pooled[-1] == ['short note']
+    stats = pool.get_stats()
+    assert stats['pool_documents'] == 7
+    assert stats['pool_running']
+
+
+def test_small_or_single_documents_stay_inline(pool, monkeypatch):
+    monkeypatch.setattr(config, '_chunking_workers', 2)
+    monkeypatch.setattr(config, '_chunking_inline_max_chars', 1000)
+
+    assert len(pool.chunk_many([PARAGRAPH * 5])[0]) > 1
+    pool.chunk_many(['a', 'b', 'c'])
+
+    monkeypatch.setattr(config, '_chunking_workers', 0)
+    pool.chunk_many([PARAGRAPH] * 4)
+
+    stats = pool.get_stats()
+    assert stats['inline_documents'] == 8
+    assert stats['pool_documents'] == 0
+    assert not stats['pool_running']
+
+
+def test_negative_workers_rejected():
+    with pytest.raises(ValueError):
+        config.set_chunking_workers(-1)
@@ -0,0 +1,40 @@
+"""
+Tests for the content-addressed embedding cache
+"""
+import numpy as np
+
+from services.embedding_cache import EmbeddingCache
+
+
+def test_roundtrip_and_memory_tier(tmp_path):
+    cache = EmbeddingCache(str(tmp_path / 'embeddings.db'))
+    cache.set_many('model', ['a', 'b'], [[0.5, 1.5], [2.0, -1.0]])
+
+    assert cache.get_many('model', ['b', 'missing', 'a']) == [[2.0, -1.0], None, [0.5, 1.5]]
+    stats = cache.get_stats()
+    assert stats['memory_hits'] == 2
+    assert stats['misses'] == 1
+    assert stats['entries'] == 2
+    # float32 storage: 4 bytes per dimension
+    assert stats['size_bytes'] == 16
+
+
+def test_persists_across_instances(tmp_path):
+    path = str(tmp_path / 'embeddings.db')
+    EmbeddingCache(path).set_many('model', ['text'], [np.linspace(0, 1, 768)])
+
+    reopened = EmbeddingCache(path)
+    vector = reopened.get('model', 'text')
+
+    assert len(vector) == 768
+    assert abs(vector[-1] - 1.0) < 1e-6
+    assert reopened.get_stats()['disk_hits'] == 1
+
+
+def test_models_are_separate(tmp_path):
+    cache = EmbeddingCache(str(tmp_path / 'embeddings.db'))
+    cache.set_many('stub:model', ['text'], [[1.0]])
+
+    assert cache.get('gemini:model', 'text') is None
+    assert cache.clear() == 1
+    assert cache.get('stub:model', 'text') is None
@@ -0,0 +1,55 @@
+"""
+Tests for the shared GenAI client registry
+"""
+from unittest.mock import Mock
+
+import pytest
+
+from services import genai_clients as registry_module
+from services.genai_clients import GenAIClientRegistry
+
+
+@pytest.fixture
+def fake_client(monkeypatch):
+    factory = Mock(side_effect=lambda api_key: Mock(name=f'client-{len(factory.mock_calls)}'))
+    monkeypatch.setattr(registry_module.genai, 'Client', factory)
+    return factory
+
+
+def test_client_is_reused_per_key(fake_client):
+    registry = GenAIClientRegistry()
+
+    first = registry.get('key-a')
+    assert registry.get('key-a') is first
+    assert registry.get('key-b') is not first
+
+    stats = registry.get_stats()
+    assert stats['constructions'] == 2
+    assert stats['reuses'] == 1
+    assert 'key-a' not in repr(registry._clients)
+
+
+def test_bounded_lru(fake_client):
+    registry = GenAIClientRegistry(max_clients=2)
+
+    a = registry.get('a')
+    registry.get('b')
+    registry.get('a')
+    registry.get('c')
+
+    assert registry.get_stats()['clients'] == 2
+    assert registry.get('a') is a
+    registry.get('b')
+    assert registry.get_stats()['constructions'] == 4
+
+
+def test_idle_clients_are_dropped_without_closing(fake_client):
+    registry = GenAIClientRegistry(idle_ttl_seconds=0)
+
+    stale = registry.get('a')
+    registry.get('b')
+
+    # Whoever fetched it may still be using it
+    stale.close.assert_not_called()
+    assert registry.get_stats()['evictions'] >= 1
+    assert registry.get('a') is not stale
@@ -0,0 +1,109 @@
+"""
+Tests for hedged LLM requests
+"""
+import asyncio
+
+import pytest
+
+from services.hedging import Hedger, LLMDeadlineExceeded
+
+
+def _attempt(delays, calls, cancelled):
+    """attempt(model) that answers after delays[model] seconds"""
+    async def attempt(model):
+        calls.append(model)
+        try:
+            await asyncio.sleep(delays[model])
+        except asyncio.CancelledError:
+            cancelled.append(model)
+            raise
+        return f'answer from {model}'
+    return attempt
+
+
+def test_fast_primary_is_not_hedged():
+    hedger = Hedger()
+    calls, cancelled = [], []
+
+    response, info = asyncio.run(hedger.run(
+        _attempt({'primary': 0.01}, calls, cancelled), 'op', 'primary', 'fallback', 0.2, 1.0
+    ))
+
+    assert response == 'answer from primary'
+    assert info == {'hedged': False, 'winner': 'primary', 'model': 'primary'}
+    assert calls == ['primary']
+    assert hedger.get_stats()['hedge_rate'] == 0.0
+
+
+def test_slow_primary_is_hedged_and_loser_cancelled():
+    hedger = Hedger()
+    calls, cancelled = [], []
+
+    response, info = asyncio.run(hedger.run(
+        _attempt({'primary': 1.0, 'fallback': 0.01}, calls, cancelled), 'op', 'primary', 'fallback', 0.05, 2.0,
+        prompt_tokens_estimate=120
+    ))
+
+    assert response == 'answer from fallback'
+    assert info == {'hedged': True, 'winner': 'hedge', 'model': 'fallback'}
+    assert cancelled == ['primary']
+
+    stats = hedger.get_stats()
+    assert stats['hedged'] == 1
+    assert stats['hedge_wins'] == 1
+    assert stats['extra_prompt_tokens_estimate'] == 120
+    assert stats['by_operation']['op']['hedge_rate'] == 1.0
+
+
+def test_hedge_without_fallback_uses_primary_model():
+    hedger = Hedger()
+    calls, cancelled = [], []
+    delays = iter([1.0, 0.01])
+
+    async def attempt(model):
+        calls.append(model)
+        await asyncio.sleep(next(delays))
+        return model
+
+    _, info = asyncio.run(hedger.run(attempt, 'op', 'primary', None, 0.05, 2.0))
+
+    assert calls == ['primary', 'primary']
+    assert info['winner'] == 'hedge'
+
+
+def test_failed_primary_falls_through_to_hedge():
+    hedger = Hedger()
+
+    async def attempt(model):
+        if model == 'primary':
+            await asyncio.sleep(0.1)
+            raise RuntimeError('primary failed')
+        await asyncio.sleep(0.2)
+        return model
+
+    response, info = asyncio.run(hedger.run(attempt, 'op', 'primary', 'fallback', 0.05, 2.0))
+    assert response == 'fallback'
+    assert info['winner'] == 'hedge'
+
+
+def test_all_attempts_failing_reraises():
+    hedger = Hedger()
+
+    async def attempt(model):
+        raise ValueError(model)
+
+    with pytest.raises(ValueError):
+        asyncio.run(hedger.run(attempt, 'op', 'primary', 'fallback', 0.05, 2.0))
+
+
+def test_deadline_exceeded():
+    hedger = Hedger()
+    calls, cancelled = [], []
+
+    with pytest.raises(LLMDeadlineExceeded):
+        asyncio.run(hedger.run(
+            _attempt({'primary': 1.0, 'fallback': 1.0}, calls, cancelled), 'op', 'primary', 'fallback', 0.02, 0.1
+        ))
+
+    assert sorted(cancelled) == ['fallback', 'primary']
+    assert hedger.get_stats()['deadline_exceeded'] == 1
@@ -0,0 +1,100 @@
+"""
+Tests for the in-process job queue
+"""
+import threading
+import time
+
+import pytest
+
+from services.job_queue import JobQueue, QueueFull
+
+
+def _wait(jobs, job_id, timeout=5):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        job = jobs.get(job_id)
+        if job['state'] in ('SUCCESS', 'FAILURE'):
+            return job
+        time.sleep(0.005)
+    raise AssertionError('job did not finish')
+
+
+def test_job_runs_in_background():
+    jobs = JobQueue(max_workers=2)
+    release = threading.Event()
+
+    job_id = jobs.submit('test', lambda: release.wait(5) and 'done')
+    assert jobs.get(job_id)['state'] in ('PENDING', 'STARTED')
+
+    release.set()
+    job = _wait(jobs, job_id)
+    assert job['state'] == 'SUCCESS'
+    assert job['result'] == 'done'
+    assert job['status'] == 'Job completed successfully'
+    jobs.shutdown()
+
+
+def test_failed_job_reports_error():
+    jobs = JobQueue(max_workers=1)
+
+    def fail():
+        raise ValueError('boom')
+
+    job = _wait(jobs, jobs.submit('test', fail))
+    assert job['state'] == 'FAILURE'
+    assert job['error'] == 'boom'
+    assert jobs.get_stats()['failed'] == 1
+    jobs.shutdown()
+
+
+def test_full_queue_rejects_jobs():
+    jobs = JobQueue(max_workers=1, max_queue=2)
+    release = threading.Event()
+
+    running = jobs.submit('test', release.wait, 5)
+    deadline = time.time() + 5
+    while jobs.get(running)['state'] != 'STARTED' and time.time() < deadline:
+        time.sleep(0.005)
+
+    jobs.submit('test', release.wait, 5)
+    jobs.submit('test', release.wait, 5)
+    with pytest.raises(QueueFull):
+        jobs.submit('test', release.wait, 5)
+    assert jobs.get_stats()['rejected'] == 1
+
+    release.set()
+    jobs.shutdown()
+
+
+def test_finished_jobs_expire():
+    jobs = JobQueue(max_workers=1, result_ttl_seconds=0.05)
+
+    job_id = jobs.submit('test', lambda: 1)
+    _wait(jobs, job_id)
+    time.sleep(0.1)
+
+    assert jobs.get(job_id) is None
+    assert jobs.get_stats()['expired'] == 1
+    jobs.shutdown()
+
+
+def test_shutdown_cancels_backlog_instead_of_running_it():
+    jobs = JobQueue(max_workers=1, max_queue=5)
+
+    running = jobs.submit('test', time.sleep, 0.2)
+    deadline = time.time() + 5
+    while jobs.get(running)['state'] != 'STARTED' and time.time() < deadline:
+        time.sleep(0.005)
+    pending = [jobs.submit('test', time.sleep, 1) for _ in range(5)]
+
+    start = time.time()
+    jobs.shutdown()
+
+    # Only the running job is waited for, not 5 more seconds of backlog
+    assert time.time() - start < 1
+    assert jobs.get(running)['state'] == 'SUCCESS'
+    for job_id in pending:
+        job = jobs.get(job_id)
+        assert job['state'] == 'FAILURE'
+        assert job['error'] == 'Cancelled at shutdown'
+    assert jobs.get_stats()['cancelled'] == 5
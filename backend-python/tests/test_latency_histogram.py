@@ -0,0 +1,72 @@
+"""
+Tests for streaming latency histograms
+"""
+from services.latency_histogram import LatencyHistogram, LatencyRecorder
+
+
+def test_percentiles_within_bucket_error():
+    histogram = LatencyHistogram()
+    for value in range(1, 1001):
+        histogram.record(value)
+
+    summary = histogram.summary()
+    assert summary['count'] == 1000
+    assert summary['max'] == 1000
+    for q, expected in ((50, 500), (90, 900), (99, 990)):
+        assert abs(summary[f'p{q}'] - expected) / expected <= LatencyHistogram.GROWTH - 1
+
+
+def test_window_only_merges_recent_minutes():
+    recorder = LatencyRecorder(retention_minutes=60)
+    now = 1_000_000 * 60
+    recorder.record('llm', 'leetcode_solve', 'm', 5000, now=now - 30 * 60)
+    recorder.record('llm', 'leetcode_solve', 'm', 100, now=now)
+    recorder.record('rag', 'leetcode_solve', 'm', 20, now=now)
+
+    recent = {s['metric']: s for s in recorder.snapshot(window_minutes=5, now=now)}
+    assert recent['llm']['count'] == 1
+    assert recent['llm']['max'] == 100
+    assert recent['rag']['count'] == 1
+
+    hour = {s['metric']: s for s in recorder.snapshot(window_minutes=60, now=now)}
+    assert hour['llm']['count'] == 2
+    assert hour['llm']['max'] == 5000
+
+
+def test_slots_older_than_retention_are_dropped():
+    recorder = LatencyRecorder(retention_minutes=10)
+    now = 1_000_000 * 60
+    recorder.record('total', 'code_modification', None, 50, now=now - 20 * 60)
+    recorder.record('total', 'code_modification', None, 60, now=now)
+
+    assert len(recorder._slots) == 1
+
+
+def test_minutes_past_the_last_hour_roll_up():
+    recorder = LatencyRecorder(retention_minutes=24 * 60)
+    now = 1_000_000 * 60
+    for minutes_ago in range(3 * 60, -1, -1):
+        recorder.record('llm', 'leetcode_solve', 'm', 100 + minutes_ago, now=now - minutes_ago * 60)
+
+    assert len(recorder._slots) == 60
+    assert len(recorder._coarse) <= 2 * 60 // 15 + 1
+
+    day = recorder.snapshot(window_minutes=24 * 60, now=now)[0]
+    assert day['count'] == 3 * 60 + 1
+    assert day['max'] == 100 + 3 * 60
+    hour = recorder.snapshot(window_minutes=60, now=now)[0]
+    assert hour['count'] == 60
+
+
+def test_snapshot_does_not_hold_the_lock_while_merging(monkeypatch):
+    recorder = LatencyRecorder()
+    recorder.record('llm', 'leetcode_solve', 'm', 100)
+
+    held = []
+    merge = LatencyHistogram.merge
+    monkeypatch.setattr(LatencyHistogram, 'merge',
+                        lambda self, other: held.append(recorder._lock.locked()) or merge(self, other))
+    recorder.snapshot(window_minutes=60)
+
+    # The live minute is copied under the lock; the window itself is merged outside it
+    assert held.count(False) == 1
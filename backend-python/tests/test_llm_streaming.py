@@ -0,0 +1,106 @@
+"""
+Tests for streaming LLM responses
+"""
+import random
+import time
+from unittest.mock import Mock
+
+import pytest
+
+import services.llm_service as llm_service
+from services.config_service import config
+from services.hedging import hedger
+from services.providers.stub import StubProvider
+from services.llm_service import _MarkdownStripper, _strip_markdown_code_blocks
+
+
+RESPONSES = [
+    "```python\ndef solve():\n    return 1\n```\nExplanation after the block",
+    "  \n```\nassert f(2) == 4\n```",
+    "```py\nprint('not a python fence')\n```",
+    "plain text answer  \n\n",
+    "```python\nunterminated block\n",
+    "``",
+    "",
+]
+
+
+@pytest.mark.parametrize('text', RESPONSES)
+def test_incremental_stripper_matches_full_strip(text):
+    rng = random.Random(len(text))
+    for _ in range(20):
+        cuts = sorted(rng.sample(range(len(text) + 1), min(len(text), 4)))
+        pieces = [text[i:j] for i, j in zip([0] + cuts, cuts + [len(text)])]
+        stripper = _MarkdownStripper()
+        streamed = ''.join(stripper.feed(piece) for piece in pieces) + stripper.finish()
+        assert streamed == _strip_markdown_code_blocks(text)
+
+
+def _chunk(text, usage=None):
+    return Mock(text=text, usage_metadata=usage)
+
+
+@pytest.fixture
+def pipeline(monkeypatch):
+    mock_cache = Mock()
+    mock_cache.get.return_value = None
+    mock_logger = Mock()
+    mock_client = Mock()
+    usage = Mock(prompt_token_count=7, candidates_token_count=4)
+    mock_client.models.generate_content_stream.return_value = iter([
+        _chunk('```python\ndef f():'), _chunk('\n    return 1\n'), _chunk('```', usage)
+    ])
+
+    monkeypatch.setattr(llm_service, 'cache', mock_cache)
+    monkeypatch.setattr(llm_service, 'observability_logger', mock_logger)
+    monkeypatch.setattr(llm_service.genai_clients, 'get', Mock(return_value=mock_client))
+    monkeypatch.setattr(llm_service.rag_service, 'is_enabled', Mock(return_value=False))
+    return mock_cache, mock_logger
+
+
+def test_stream_forwards_chunks_and_records_at_end(pipeline):
+    mock_cache, mock_logger = pipeline
+
+    events = list(llm_service.stream_test_cases('def f(): pass', 'key'))
+
+    chunks = ''.join(data['text'] for event, data in events if event == 'chunk')
+    assert chunks == 'def f():\n    return 1'
+    event, result = events[-1]
+    assert event == 'done'
+    assert result['from_cache'] is False
+    assert result['tokens_sent'] == 7
+    assert result['ttft_ms'] is not None
+
+    stored_response = mock_cache.set.call_args[0][2]
+    assert stored_response == '```python\ndef f():\n    return 1\n```'
+    assert mock_logger.log_llm_call.call_args.kwargs['response_text'] == stored_response
+    assert any(call.args[0] == 'ttft' for call in mock_logger.record_latency.call_args_list)
+
+
+def test_cached_response_streams_immediately(pipeline):
+    mock_cache, _ = pipeline
+    mock_cache.get.return_value = {'response_text': '```\ncached\n```', 'prompt': 'p', 'metadata': {}}
+
+    events = list(llm_service.stream_test_cases('def f(): pass', 'key'))
+
+    assert events[0] == ('chunk', {'text': 'cached'})
+    assert events[1][0] == 'done'
+    assert events[1][1]['from_cache'] is True
+    mock_cache.set.assert_not_called()
+
+
+def test_stream_fails_at_the_slo_deadline(pipeline, monkeypatch):
+    _, mock_logger = pipeline
+    monkeypatch.setattr(llm_service, 'get_provider', lambda: StubProvider(latency_ms=5000, latency_sigma=0))
+    monkeypatch.setitem(config._llm_slos, 'test_case_generation',
+                        {'hedge_delay_seconds': None, 'deadline_seconds': 0.2})
+    before = hedger.get_stats()['by_operation'].get('test_case_generation', {}).get('deadline_exceeded', 0)
+
+    start = time.monotonic()
+    events = list(llm_service.stream_test_cases('def f(): pass', 'key'))
+
+    assert time.monotonic() - start < 2
+    assert events[-1][0] == 'error'
+    assert 'deadline' in events[-1][1]['error']
+    assert hedger.get_stats()['by_operation']['test_case_generation']['deadline_exceeded'] == before + 1
+    assert mock_logger.log_llm_call.call_args.kwargs['error'] == events[-1][1]['error']
@@ -0,0 +1,73 @@
+"""
+Tests for the asynchronous metrics writer
+"""
+from services.metrics_writer import AsyncBatchWriter
+from services.observability_service import ObservabilityLogger
+from services.sqlite_pool import SQLitePool
+
+
+def _table_pool(tmp_path):
+    pool = SQLitePool(str(tmp_path / 'writer.db'))
+    with pool.connection() as (conn, cursor):
+        cursor.execute('CREATE TABLE events (value INTEGER)')
+    return pool
+
+
+def _count(pool):
+    with pool.connection() as (conn, cursor):
+        cursor.execute('SELECT COUNT(*) FROM events')
+        return cursor.fetchone()[0]
+
+
+def test_logged_calls_are_visible_to_reads(tmp_path):
+    metrics = ObservabilityLogger(db_path=str(tmp_path / 'metrics.db'))
+
+    for i in range(5):
+        metrics.log_llm_call('leetcode_solve', f'prompt {i}', f'response {i}', 3, 2, 10.0)
+
+    assert len(metrics.get_metrics()) == 5
+    stats = metrics.get_summary_stats()
+    assert stats['total_calls'] == 5
+    assert stats['metrics_writer']['queued'] == 5
+    assert stats['metrics_writer']['written'] == 5
+    assert stats['metrics_writer']['dropped'] == 0
+    metrics._writer.close()
+
+
+def test_rows_are_group_committed(tmp_path):
+    pool = _table_pool(tmp_path)
+    writer = AsyncBatchWriter(pool, 'INSERT INTO events (value) VALUES (?)', batch_size=50, flush_interval=60)
+
+    for i in range(120):
+        writer.submit((i,))
+    writer.flush()
+
+    assert _count(pool) == 120
+    # The background thread may pick up a partial batch, but rows never commit one by one
+    assert 3 <= writer.get_stats()['batches'] <= 6
+    writer.close()
+
+
+def test_full_queue_drops_and_counts(tmp_path):
+    pool = _table_pool(tmp_path)
+    writer = AsyncBatchWriter(pool, 'INSERT INTO events (value) VALUES (?)', max_queue=2,
+                              batch_size=100, flush_interval=60, overflow_policy='drop_newest')
+
+    accepted = [writer.submit((i,)) for i in range(5)]
+    writer.flush()
+
+    assert accepted == [True, True, False, False, False]
+    assert _count(pool) == 2
+    assert writer.get_stats()['dropped'] == 3
+    writer.close()
+
+
+def test_close_flushes_pending_rows(tmp_path):
+    pool = _table_pool(tmp_path)
+    writer = AsyncBatchWriter(pool, 'INSERT INTO events (value) VALUES (?)', flush_interval=60)
+
+    for i in range(10):
+        writer.submit((i,))
+    writer.close()
+
+    assert _count(pool) == 10
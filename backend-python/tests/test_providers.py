@@ -0,0 +1,80 @@
+"""
+Tests for the offline stub provider
+"""
+import asyncio
+import math
+
+import pytest
+
+from services.providers import StubProvider, ProviderError, get_provider
+
+
+def _cosine(a, b):
+    return sum(x * y for x, y in zip(a, b))
+
+
+def test_generation_is_deterministic():
+    provider = StubProvider(latency_ms=0, output_tokens=50)
+
+    first = asyncio.run(provider.generate_async('key', 'model', 'two sum'))
+    second = asyncio.run(provider.generate_async('key', 'model', 'two sum'))
+    other = asyncio.run(provider.generate_async('key', 'model', 'three sum'))
+
+    assert first.text == second.text != other.text
+    assert len(first.text.split()) == 50
+    assert first.usage_metadata.candidates_token_count == 50
+
+
+def test_stream_reassembles_to_full_response():
+    provider = StubProvider(latency_ms=0, stream_chunks=4)
+
+    chunks = list(provider.generate_stream('key', 'model', 'prompt'))
+    full = asyncio.run(provider.generate_async('key', 'model', 'prompt'))
+
+    assert len(chunks) == 4
+    assert ''.join(chunk.text for chunk in chunks) == full.text
+    assert chunks[-1].usage_metadata is not None
+    assert all(chunk.usage_metadata is None for chunk in chunks[:-1])
+
+
+def test_latency_follows_configured_median():
+    provider = StubProvider(latency_ms=20, latency_sigma=0.1, seed=1)
+    delays = sorted(provider._sample(20)[0] for _ in range(101))
+    assert 0.015 < delays[50] < 0.025
+
+
+def test_error_rate():
+    provider = StubProvider(latency_ms=0, error_rate=1.0)
+    with pytest.raises(ProviderError) as exc_info:
+        asyncio.run(provider.generate_async('key', 'model', 'prompt'))
+    assert exc_info.value.code == 503
+
+    provider.configure(error_rate=0.25, seed=3)
+    failures = sum(provider._sample(0)[1] for _ in range(400))
+    assert 60 < failures < 140
+
+
+def test_embeddings_reflect_word_overlap():
+    provider = StubProvider(embedding_latency_ms=0, embedding_dim=256)
+
+    binary_search, binary_tree, cooking = provider.embed('key', 'model', [
+        'binary search over a sorted array',
+        'binary search tree over sorted keys',
+        'slow roasted tomato soup',
+    ])
+
+    assert len(binary_search) == 256
+    assert math.isclose(_cosine(binary_search, binary_search), 1.0)
+    assert _cosine(binary_search, binary_tree) > _cosine(binary_search, cooking)
+    assert provider.embed('key', 'model', ['binary search over a sorted array'])[0] == binary_search
+
+
+def test_configure_rejects_unknown_settings():
+    with pytest.raises(ValueError):
+        StubProvider().configure(latency=5)
+
+
+def test_get_provider_rejects_unknown_name():
+    assert get_provider('stub').name == 'stub'
+    with pytest.raises(ValueError):
+        get_provider('nope')
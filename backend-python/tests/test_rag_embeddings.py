@@ -0,0 +1,96 @@
+"""
+Tests for batched embedding generation
+"""
+import asyncio
+
+import pytest
+
+from services.config_service import config
+from services.embedding_cache import EmbeddingCache
+from services.rag_service import rag_service
+import services.rag_service as rag_module
+
+
+class FakeProvider:
+    name = 'fake'
+
+    def __init__(self, fail_on=None):
+        self.batches = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.fail_on = fail_on
+
+    async def embed_async(self, api_key, model, texts):
+        self.batches.append(list(texts))
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(0.02)
+            if self.fail_on in texts:
+                raise ValueError('bad text')
+            return [[float(text.split()[-1])] for text in texts]
+        finally:
+            self.in_flight -= 1
+
+
+@pytest.fixture
+def provider(monkeypatch):
+    fake = FakeProvider()
+    monkeypatch.setattr(rag_module, 'get_provider', lambda: fake)
+    monkeypatch.setattr(config, '_embedding_batch_size', 3)
+    monkeypatch.setattr(config, '_embedding_concurrency', 2)
+    monkeypatch.setattr(config, '_embedding_cache_enabled', False)
+    return fake
+
+
+def test_batches_respect_count_and_token_limits(monkeypatch):
+    monkeypatch.setattr(config, '_embedding_batch_size', 3)
+    monkeypatch.setattr(config, '_embedding_batch_max_tokens', 10)
+
+    batches = rag_service._embedding_batches(['a'] * 7 + ['word ' * 20, 'b'])
+
+    assert [len(batch) for batch in batches] == [3, 3, 1, 1, 1]
+
+
+def test_embeddings_are_batched_concurrent_and_ordered(provider):
+    texts = [f'text {i}' for i in range(10)]
+
+    embeddings = rag_service._generate_embeddings(texts, 'key')
+
+    assert embeddings == [[float(i)] for i in range(10)]
+    assert [len(batch) for batch in provider.batches] == [3, 3, 3, 1]
+    assert provider.max_in_flight == 2
+
+
+def test_failed_batch_raises(provider):
+    provider.fail_on = 'text 4'
+
+    with pytest.raises(ValueError):
+        rag_service._generate_embeddings([f'text {i}' for i in range(10)], 'key')
+
+
+@pytest.fixture
+def cached_provider(provider, monkeypatch, tmp_path):
+    monkeypatch.setattr(config, '_embedding_cache_enabled', True)
+    monkeypatch.setattr(rag_module, 'embedding_cache', EmbeddingCache(str(tmp_path / 'embeddings.db')))
+    return provider
+
+
+def test_cached_texts_are_not_embedded_again(cached_provider):
+    stats = {}
+    rag_service._generate_embeddings(['text 1', 'text 2', 'text 1'], 'key', stats)
+    assert cached_provider.batches == [['text 1', 'text 2']]
+    assert stats == {'requests': 1, 'cached': 0}
+
+    embeddings = rag_service._generate_embeddings(['text 2', 'text 3', 'text 1'], 'key', stats)
+    assert embeddings == [[2.0], [3.0], [1.0]]
+    assert cached_provider.batches[-1] == ['text 3']
+    assert stats == {'requests': 1, 'cached': 2}
+
+
+def test_query_embedding_is_cached(cached_provider):
+    first = asyncio.run(rag_service._generate_embedding_async('query 7', 'key'))
+    second = asyncio.run(rag_service._generate_embedding_async('query 7', 'key'))
+
+    assert first == second == [7.0]
+    assert len(cached_provider.batches) == 1
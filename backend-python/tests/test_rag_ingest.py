@@ -0,0 +1,111 @@
+"""
+Tests for the streaming bulk ingestion pipeline
+"""
+import json
+
+import pytest
+
+from services.config_service import config
+from services.providers.stub import StubProvider
+from services.rag_ingest import BulkIngestor, IngestCheckpoint, iter_jsonl, iter_source, ingest_path
+from services.rag_service import RAGService
+import services.rag_service as rag_module
+
+LONG_NOTE = ' '.join(f"Sentence {i} about sliding windows and two pointers." for i in range(200))
+
+
+@pytest.fixture
+def rag(tmp_path, monkeypatch):
+    stub = StubProvider(embedding_latency_ms=0)
+    monkeypatch.setattr(rag_module, 'get_provider', lambda: stub)
+    monkeypatch.setattr(config, '_embedding_cache_enabled', False)
+    monkeypatch.setattr(config, '_rag_doc_id_counter', 0)
+    rag = RAGService(chroma_path=str(tmp_path / 'chroma'))
+    yield rag
+    rag.close()
+
+
+def test_directory_ingest_dedups_and_chunks(tmp_path, rag):
+    notes = tmp_path / 'notes'
+    (notes / 'graphs').mkdir(parents=True)
+    (notes / 'a.md').write_text('Use a hash map for two sum.')
+    (notes / 'b.txt').write_text('Use a hash map for two sum.')
+    (notes / 'graphs' / 'bfs.md').write_text(LONG_NOTE)
+    (notes / 'empty.md').write_text('   ')
+    (notes / 'image.png').write_bytes(b'\x89PNG')
+
+    report = ingest_path(str(notes), 'key', rag=rag, embed_group_texts=4)
+
+    assert report['success']
+    assert report['documents'] == 2
+    assert report['duplicates'] == 1
+    assert report['empty'] == 1
+    assert report['position'] == 4
+    stored = rag.get_documents()
+    assert len(stored) == 2
+    assert report['chunks'] == sum(doc['chunk_count'] for doc in stored) > 2
+    assert report['documents_per_second'] > 0
+
+    # Everything is already stored, so a second run adds nothing
+    again = ingest_path(str(notes), 'key', rag=rag)
+    assert again['documents'] == 0
+    assert again['duplicates'] == 3
+
+
+def test_failed_write_resumes_from_checkpoint(tmp_path, rag, monkeypatch):
+    documents = [(str(i), f"Note {i} on dynamic programming.") for i in range(10)]
+    checkpoint = IngestCheckpoint(str(tmp_path / 'checkpoint.json'), 'notes')
+
+    write_records = rag._write_records
+    writes = []
+
+    def flaky_write(records):
+        writes.append(records)
+        if len(writes) == 2:
+            raise RuntimeError('disk full')
+        write_records(records)
+
+    monkeypatch.setattr(rag, '_write_records', flaky_write)
+    ingestor = BulkIngestor(rag=rag, queue_size=2, dedup_batch=1, embed_group_texts=3)
+    report = ingestor.run(documents, 'key', checkpoint)
+
+    assert not report['success']
+    assert 'disk full' in report['error']
+    # Only the first write landed; how many documents it held depends on timing
+    position = checkpoint.load()
+    assert position == report['position'] == report['documents']
+    assert 0 < position < 10
+
+    monkeypatch.setattr(rag, '_write_records', write_records)
+    resumed = ingestor.run(documents, 'key', checkpoint)
+
+    assert resumed['success']
+    assert resumed['resumed_from'] == position
+    assert resumed['documents'] == 10 - position
+    assert len(rag.get_documents()) == 10
+    # A finished run leaves no checkpoint behind
+    assert checkpoint.load() == 0
+
+
+def test_jsonl_source(tmp_path):
+    path = tmp_path / 'notes.jsonl'
+    path.write_text('\n'.join([
+        json.dumps({'content': 'first'}),
+        '',
+        '{not json',
+        json.dumps('second'),
+        json.dumps({'text': 'third'})
+    ]))
+
+    assert list(iter_jsonl(str(path))) == [('1', 'first'), ('4', 'second'), ('5', 'third')]
+    assert list(iter_source(str(path))) == list(iter_jsonl(str(path)))
+    with pytest.raises(FileNotFoundError):
+        iter_source(str(tmp_path / 'missing'))
+
+
+def test_checkpoint_ignores_other_sources(tmp_path):
+    path = str(tmp_path / 'checkpoint.json')
+    IngestCheckpoint(path, 'a.jsonl').save(5, {'documents': 5, 'chunks': 9})
+
+    assert IngestCheckpoint(path, 'a.jsonl').load() == 5
+    assert IngestCheckpoint(path, 'b.jsonl').load() == 0
@@ -0,0 +1,105 @@
+"""
+Tests for the adaptive rate limiter
+"""
+import asyncio
+import time
+
+import pytest
+
+from services.rate_limiter import RateLimiter, RateLimitExceeded
+
+
+class QuotaError(Exception):
+    code = 429
+
+
+class BadRequest(Exception):
+    code = 400
+
+
+def _limiter(rate=100.0, burst=1, deadline=5.0, max_attempts=6):
+    limiter = RateLimiter(limits=lambda: (rate, burst), deadline=lambda: deadline, max_attempts=max_attempts)
+    limiter.BACKOFF_BASE_SECONDS = 0.001
+    return limiter
+
+
+def test_bucket_spaces_out_calls():
+    limiter = _limiter(rate=20.0, burst=1)
+
+    start = time.monotonic()
+    for _ in range(5):
+        limiter.call(lambda: 'ok', 'key', 'model')
+    elapsed = time.monotonic() - start
+
+    # One token up front, then 4 more at 20/s
+    assert elapsed >= 0.18
+    assert limiter.get_stats()['waits'] == 4
+
+
+def test_throttled_calls_are_retried_and_slow_the_bucket():
+    limiter = _limiter(rate=100.0, burst=5)
+    attempts = []
+
+    def flaky():
+        attempts.append(1)
+        if len(attempts) < 3:
+            raise QuotaError('RESOURCE_EXHAUSTED')
+        return 'ok'
+
+    assert limiter.call(flaky, 'key', 'model') == 'ok'
+
+    stats = limiter.get_stats()
+    assert stats['throttled'] == 2
+    assert stats['retries'] == 2
+    # Halved twice, then one additive step back up
+    assert stats['buckets'][0]['rate_per_second'] == pytest.approx(100 * 0.25 + 5)
+
+
+def test_gives_up_after_max_attempts():
+    limiter = _limiter(max_attempts=3)
+
+    def always_throttled():
+        raise QuotaError('quota')
+
+    with pytest.raises(RateLimitExceeded):
+        limiter.call(always_throttled, 'key', 'model')
+    assert limiter.get_stats()['gave_up'] == 1
+
+
+def test_non_retryable_errors_raise_immediately():
+    limiter = _limiter()
+    attempts = []
+
+    def bad():
+        attempts.append(1)
+        raise BadRequest('invalid argument')
+
+    with pytest.raises(BadRequest):
+        limiter.call(bad, 'key', 'model')
+    assert len(attempts) == 1
+
+
+def test_buckets_are_per_key_and_model():
+    limiter = _limiter(rate=1.0, burst=1)
+
+    start = time.monotonic()
+    limiter.call(lambda: 'ok', 'key-a', 'model')
+    limiter.call(lambda: 'ok', 'key-b', 'model')
+    limiter.call(lambda: 'ok', 'key-a', 'other-model')
+
+    assert time.monotonic() - start < 0.5
+    assert len(limiter.get_stats()['buckets']) == 3
+
+
+def test_async_retry():
+    limiter = _limiter()
+    attempts = []
+
+    async def flaky():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise QuotaError('quota')
+        return 'ok'
+
+    assert asyncio.run(limiter.call_async(flaky, 'key', 'model')) == 'ok'
+    assert len(attempts) == 2
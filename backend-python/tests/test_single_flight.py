@@ -0,0 +1,95 @@
+"""
+Tests for single-flight request coalescing
+"""
+import asyncio
+import threading
+import time
+
+from services.single_flight import SingleFlight
+
+
+def test_concurrent_calls_share_one_execution():
+    flights = SingleFlight()
+    calls = []
+    started = threading.Event()
+
+    def slow_call():
+        calls.append(1)
+        started.set()
+        time.sleep(0.2)
+        return {'response': 'shared'}
+
+    results = []
+
+    def worker():
+        results.append(flights.do('key', slow_call))
+
+    leader = threading.Thread(target=worker)
+    leader.start()
+    started.wait()
+    followers = [threading.Thread(target=worker) for _ in range(4)]
+    for t in followers:
+        t.start()
+    for t in [leader] + followers:
+        t.join()
+
+    assert len(calls) == 1
+    assert sorted(shared for _, shared in results) == [False, True, True, True, True]
+    assert all(result == {'response': 'shared'} for result, _ in results)
+    assert flights.get_stats()['coalesced'] == 4
+
+
+def test_follower_runs_itself_after_timeout():
+    flights = SingleFlight(wait_timeout=0.05)
+    release = threading.Event()
+    started = threading.Event()
+
+    def blocked():
+        started.set()
+        release.wait()
+        return 'leader'
+
+    leader = threading.Thread(target=flights.do, args=('key', blocked))
+    leader.start()
+    started.wait()
+
+    result, shared = flights.do('key', lambda: 'follower')
+    release.set()
+    leader.join()
+
+    assert (result, shared) == ('follower', False)
+    assert flights.get_stats()['timeouts'] == 1
+
+
+def test_async_calls_share_one_execution():
+    flights = SingleFlight()
+    calls = []
+
+    async def slow_call():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return 'shared'
+
+    async def run():
+        return await asyncio.gather(*(flights.do_async('key', slow_call) for _ in range(5)))
+
+    results = asyncio.run(run())
+
+    assert len(calls) == 1
+    assert sorted(shared for _, shared in results) == [False, True, True, True, True]
+    assert flights.get_stats()['in_flight'] == 0
+
+
+def test_async_follower_reraises_leader_error():
+    flights = SingleFlight()
+
+    async def failing():
+        await asyncio.sleep(0.01)
+        raise ValueError('boom')
+
+    async def run():
+        return await asyncio.gather(*(flights.do_async('key', failing) for _ in range(3)), return_exceptions=True)
+
+    results = asyncio.run(run())
+
+    assert all(isinstance(result, ValueError) for result in results)
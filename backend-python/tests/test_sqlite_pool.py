@@ -0,0 +1,73 @@
+"""
+Tests for the pooled SQLite connection layer
+"""
+import sqlite3
+import threading
+
+import pytest
+
+from services.sqlite_pool import SQLitePool
+
+
+@pytest.fixture
+def pool(tmp_path):
+    pool = SQLitePool(str(tmp_path / 'pool.db'), max_connections=2)
+    with pool.connection() as (conn, cursor):
+        cursor.execute('CREATE TABLE items (id INTEGER PRIMARY KEY, name TEXT)')
+    yield pool
+    pool.close()
+
+
+def test_connections_are_reused(pool):
+    """Sequential checkouts should share one connection opened in WAL mode"""
+    for i in range(5):
+        with pool.connection() as (conn, cursor):
+            cursor.execute('INSERT INTO items (name) VALUES (?)', (f'item{i}',))
+
+    stats = pool.get_stats()
+    assert stats['connections_created'] == 1
+    assert stats['journal_mode'] == 'wal'
+    assert stats['idle_connections'] == 1
+
+
+def test_rollback_on_error(pool):
+    """Errors inside the block roll back and the connection stays usable"""
+    with pytest.raises(ValueError):
+        with pool.connection() as (conn, cursor):
+            cursor.execute("INSERT INTO items (name) VALUES ('lost')")
+            raise ValueError('boom')
+
+    with pool.connection(row_factory=sqlite3.Row) as (conn, cursor):
+        cursor.execute('SELECT COUNT(*) AS n FROM items')
+        assert cursor.fetchone()['n'] == 0
+
+    assert pool.get_stats()['rollbacks'] == 1
+
+
+def test_nested_blocks_share_connection(pool):
+    """A nested block on the same thread reuses the outer connection"""
+    with pool.connection() as (outer, _):
+        with pool.connection() as (inner, _):
+            assert inner is outer
+
+    assert pool.get_stats()['reentrant_checkouts'] == 1
+
+
+def test_pool_is_bounded_across_threads(pool):
+    """Concurrent writers never open more than max_connections"""
+    def worker(n):
+        for i in range(20):
+            with pool.connection() as (conn, cursor):
+                cursor.execute('INSERT INTO items (name) VALUES (?)', (f'{n}-{i}',))
+
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(6)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    with pool.connection() as (conn, cursor):
+        cursor.execute('SELECT COUNT(*) FROM items')
+        assert cursor.fetchone()[0] == 120
+
+    assert pool.get_stats()['open_connections'] <= 2
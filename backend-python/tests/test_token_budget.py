@@ -0,0 +1,57 @@
+"""
+Tests for token estimation and budgeted prompt assembly
+"""
+from services.token_budget import estimate_tokens, pack_context, assemble_prompt
+
+
+def _doc(doc_id, words, similarity):
+    return {'id': doc_id, 'content': ' '.join(['word'] * words), 'similarity_score': similarity}
+
+
+def test_estimate_tokens():
+    assert estimate_tokens('') == 0
+    assert estimate_tokens('hello world') == 4
+    assert estimate_tokens('a = b(c)') == 6
+    # Long identifiers cost more than one token
+    assert estimate_tokens('extraordinarily') == 4
+    # Line breaks with their indentation count once each
+    assert estimate_tokens('x\n    y\n    z') == 5
+
+
+def test_pack_context_prefers_highest_similarity():
+    docs = [_doc(1, 10, 0.6), _doc(2, 10, 0.9), _doc(3, 10, 0.7)]
+
+    context, included = pack_context(docs, 1000)
+
+    assert [doc['id'] for doc in included] == [2, 3, 1]
+    assert context.startswith('## RELEVANT CONTEXT:')
+
+
+def test_pack_context_skips_chunks_that_dont_fit():
+    docs = [_doc(1, 10, 0.9), _doc(2, 500, 0.8), _doc(3, 10, 0.7)]
+
+    _, included = pack_context(docs, 60)
+
+    # The oversized chunk is skipped, the smaller lower-ranked one still fits
+    assert [doc['id'] for doc in included] == [1, 3]
+
+
+def test_assemble_prompt_respects_budget():
+    prompt = 'Solve this problem ' * 10
+    docs = [_doc(i, 30, 1 - i / 10) for i in range(10)]
+
+    assembled, included, info = assemble_prompt(prompt, docs, 200)
+
+    assert assembled.startswith(prompt)
+    assert info['estimated_tokens'] <= 200
+    assert info['chunks_included'] == len(included) > 0
+    assert info['chunks_skipped'] == 10 - len(included)
+
+
+def test_assemble_prompt_never_cuts_the_prompt():
+    prompt = 'code ' * 500
+    assembled, included, info = assemble_prompt(prompt, [_doc(1, 5, 0.9)], 100)
+
+    assert assembled == prompt
+    assert included == []
+    assert info['chunks_skipped'] == 1